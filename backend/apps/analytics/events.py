@@ -0,0 +1,67 @@
+"""
+Activity events.
+
+Every UserActivity row is an event: saving one feeds the achievement
+engine (see apps.authentication.signals), so views only need to record
+what happened. Events reported by the client are stored for analytics
+only and never count towards achievements, XP or progress.
+"""
+import logging
+from . import word_stats
+from .models import UserActivity
+
+logger = logging.getLogger(__name__)
+
+# UI telemetry the frontend may report through the ingest endpoint. XP,
+# quiz answers, analyses and challenges are recorded by the server only:
+# a client could otherwise forge achievements and leaderboard XP.
+CLIENT_ACTIVITY_TYPES = frozenset({
+    'page_viewed',
+    'word_searched',
+    'word_viewed',
+    'bookmark_opened',
+    'share_clicked',
+    'session_started',
+    'session_ended',
+})
+
+
+def record_activity(user, activity_type, activity_data=None, session_id=''):
+    """Record an activity for a user; never fails the calling request."""
+    try:
+        activity = UserActivity.objects.create(
+            user=user,
+            activity_type=activity_type,
+            activity_data=activity_data or {},
+            session_id=session_id,
+        )
+        word_stats.track([activity])
+        return activity
+    except Exception as e:
+        logger.error(f"Failed to record {activity_type} for user {user.pk}: {str(e)}")
+        return None
+
+
+def record_activities(user, events, batch_size=500):
+    """
+    Insert a batch of client-reported ``{'type', 'data', 'session_id'}``
+    events in one go; types must be in ``CLIENT_ACTIVITY_TYPES``.
+
+    ``bulk_create`` skips signals, so these rows never reach the
+    achievement engine. Returns the number of events stored.
+    """
+    activities = UserActivity.objects.bulk_create(
+        [
+            UserActivity(
+                user=user,
+                activity_type=event['type'],
+                activity_data=event.get('data') or {},
+                session_id=event.get('session_id', ''),
+            )
+            for event in events
+            if event['type'] in CLIENT_ACTIVITY_TYPES
+        ],
+        batch_size=batch_size
+    )
+    word_stats.track(activities)
+    return len(activities)
@@ -0,0 +1,17 @@
+"""
+Fold live Redis word counters and sketches into WordActivityBucket rows.
+"""
+import time
+from django.core.management.base import BaseCommand
+from apps.analytics import word_stats
+
+
+class Command(BaseCommand):
+    help = 'Flush hourly word counters and daily unique-user sketches from Redis to the database'
+
+    def handle(self, *args, **options):
+        start_time = time.time()
+        touched = word_stats.flush()
+        self.stdout.write(self.style.SUCCESS(
+            f"Flushed word analytics for {touched} word-days in {time.time() - start_time:.1f}s"
+        ))
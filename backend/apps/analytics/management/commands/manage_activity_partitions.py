@@ -0,0 +1,39 @@
+"""
+Maintain the monthly UserActivity partitions: create ahead, expire old ones.
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from apps.analytics import partitions
+
+
+class Command(BaseCommand):
+    help = 'Create upcoming UserActivity partitions and drop (or archive) expired ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--convert',
+            action='store_true',
+            help='Convert the plain UserActivity table into a partitioned one first'
+        )
+        parser.add_argument('--months-ahead', type=int, default=settings.ACTIVITY_PARTITIONS_AHEAD)
+        parser.add_argument('--retention-months', type=int, default=settings.ACTIVITY_RETENTION_MONTHS)
+        parser.add_argument('--archive-dir', help='Archive expired partitions here (gzipped CSV) before dropping')
+
+    def handle(self, *args, **options):
+        if not partitions.is_supported():
+            # SQLite and friends: no partitions, retention is a plain delete
+            deleted = partitions.delete_expired_rows(options['retention_months'])
+            self.stdout.write(f"Partitioning requires PostgreSQL; deleted {deleted} expired activities")
+            return
+
+        if options['convert'] and partitions.convert_table():
+            self.stdout.write(self.style.SUCCESS("Converted UserActivity to a partitioned table"))
+        if not partitions.is_partitioned():
+            raise CommandError("UserActivity is not partitioned yet; run with --convert")
+
+        for name in partitions.create_partitions(options['months_ahead']):
+            self.stdout.write(f"Created partition {name}")
+        for name in partitions.drop_expired(options['retention_months'], options['archive_dir']):
+            self.stdout.write(f"Dropped partition {name}")
+
+        self.stdout.write(self.style.SUCCESS("Activity partitions are up to date"))
@@ -22,4 +22,26 @@ class WordAnalytics(BaseModel):
     last_searched = models.DateTimeField(auto_now=True)
     
     class Meta:
-        unique_together = ['word']
\ No newline at end of file
+        unique_together = ['word']
+
+
+class WordActivityBucket(models.Model):
+    """Search/analysis counts for one word in one hour or day, flushed from Redis."""
+    GRANULARITY_CHOICES = [
+        ('hour', 'Hour'),
+        ('day', 'Day'),
+    ]
+    
+    word = models.CharField(max_length=100)
+    granularity = models.CharField(max_length=5, choices=GRANULARITY_CHOICES)
+    bucket_start = models.DateTimeField()
+    search_count = models.IntegerField(default=0)
+    analysis_count = models.IntegerField(default=0)
+    unique_users = models.IntegerField(null=True, blank=True)  # HyperLogLog estimate (day buckets)
+    users_sketch = models.BinaryField(null=True, blank=True)  # Raw Redis HyperLogLog (day buckets)
+    
+    class Meta:
+        unique_together = ['word', 'granularity', 'bucket_start']
+        indexes = [
+            models.Index(fields=['granularity', 'bucket_start']),
+        ]
\ No newline at end of file
@@ -0,0 +1,203 @@
+"""
+Monthly range partitioning of the UserActivity table (PostgreSQL only).
+
+The table is partitioned by ``created_at``: one partition per month plus a
+default partition catching anything outside the prepared ranges. Future
+partitions are created ahead of time (monthly, from Celery beat) and expired
+ones are detached and dropped (optionally archived to a gzipped CSV first),
+which is much cheaper than deleting rows.
+"""
+import os
+import re
+import gzip
+import logging
+from datetime import date, datetime, timezone as dt_timezone
+from django.db import connection, transaction
+from .models import UserActivity
+
+logger = logging.getLogger(__name__)
+
+TABLE = UserActivity._meta.db_table
+DEFAULT_PARTITION = f'{TABLE}_default'
+LEGACY_PARTITION = f'{TABLE}_legacy'
+SEQUENCE = f'{TABLE}_id_seq'
+
+_UPPER_BOUND = re.compile(r"TO \('([^']+)'\)")
+
+
+def is_supported():
+    return connection.vendor == 'postgresql'
+
+
+def month_start(day, offset=0):
+    """First day of the month ``offset`` months after ``day``'s month."""
+    index = day.year * 12 + day.month - 1 + offset
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f'{TABLE}_p{month.year}_{month.month:02d}'
+
+
+def is_partitioned():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT relkind FROM pg_class WHERE relname = %s", [TABLE])
+        row = cursor.fetchone()
+    return row is not None and row[0] == 'p'
+
+
+def convert_table():
+    """
+    Turn the plain table created by Django into a partitioned one.
+
+    Existing rows stay in place: the old table is attached as a partition
+    covering everything before next month, and expires with the retention
+    policy like any other partition. Ids keep coming from one sequence.
+    """
+    if is_partitioned():
+        return False
+
+    boundary = month_start(date.today(), 1)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"LOCK TABLE {TABLE} IN ACCESS EXCLUSIVE MODE")
+        cursor.execute(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {TABLE}")
+        next_id = cursor.fetchone()[0]
+
+        cursor.execute(f"ALTER TABLE {TABLE} RENAME TO {LEGACY_PARTITION}")
+        cursor.execute(f"ALTER TABLE {LEGACY_PARTITION} ALTER COLUMN id DROP IDENTITY IF EXISTS")
+        cursor.execute(f"ALTER TABLE {LEGACY_PARTITION} ALTER COLUMN id DROP DEFAULT")
+        cursor.execute(f"DROP SEQUENCE IF EXISTS {SEQUENCE}")
+
+        cursor.execute(
+            f"CREATE TABLE {TABLE} (LIKE {LEGACY_PARTITION} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+            f"PARTITION BY RANGE (created_at)"
+        )
+        cursor.execute(f"CREATE SEQUENCE {SEQUENCE} START WITH {next_id} OWNED BY {TABLE}.id")
+        cursor.execute(f"ALTER TABLE {TABLE} ALTER COLUMN id SET DEFAULT nextval('{SEQUENCE}')")
+        # Unique constraints on a partitioned table must include the partition key
+        cursor.execute(f"ALTER TABLE {TABLE} ADD PRIMARY KEY (id, created_at)")
+        cursor.execute(
+            f"ALTER TABLE {TABLE} ADD FOREIGN KEY (user_id) "
+            f"REFERENCES {UserActivity._meta.get_field('user').related_model._meta.db_table} (id) "
+            f"DEFERRABLE INITIALLY DEFERRED"
+        )
+        cursor.execute(f"CREATE INDEX ON {TABLE} (user_id, created_at)")
+        cursor.execute(f"CREATE INDEX ON {TABLE} (activity_type, created_at)")
+
+        cursor.execute(
+            f"ALTER TABLE {TABLE} ATTACH PARTITION {LEGACY_PARTITION} "
+            f"FOR VALUES FROM (MINVALUE) TO (%s)",
+            [boundary.isoformat()]
+        )
+        cursor.execute(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT")
+
+    logger.info(f"Converted {TABLE} to a partitioned table (legacy rows before {boundary})")
+    return True
+
+
+def create_partitions(months_ahead, today=None):
+    """
+    Ensure partitions exist for the current month and ``months_ahead`` after it.
+
+    Rows of the month that landed in the default partition meanwhile are
+    moved into the new partition: PostgreSQL refuses to add a partition
+    whose range the default partition still holds rows for.
+    """
+    today = today or date.today()
+    created = []
+    with connection.cursor() as cursor:
+        for offset in range(months_ahead + 1):
+            start = month_start(today, offset)
+            name = partition_name(start)
+            cursor.execute("SELECT 1 FROM pg_class WHERE relname = %s", [name])
+            if cursor.fetchone():
+                continue
+            if start < _legacy_upper_bound(cursor):
+                # Still covered by the converted legacy table
+                continue
+            bounds = [start.isoformat(), month_start(start, 1).isoformat()]
+            with transaction.atomic():
+                cursor.execute(f"CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+                cursor.execute(
+                    f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+                    f"WHERE created_at >= %s AND created_at < %s RETURNING *) "
+                    f"INSERT INTO {name} SELECT * FROM moved",
+                    bounds
+                )
+                if cursor.rowcount:
+                    logger.info(f"Moved {cursor.rowcount} activities from {DEFAULT_PARTITION} to {name}")
+                cursor.execute(f"ALTER TABLE {TABLE} ATTACH PARTITION {name} FOR VALUES FROM (%s) TO (%s)", bounds)
+            created.append(name)
+    return created
+
+
+def list_partitions():
+    """Return ``[(name, upper_bound), ...]``; the default partition has no bound."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname, pg_get_expr(child.relpartbound, child.oid)
+            FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = %s
+            ORDER BY child.relname
+            """,
+            [TABLE]
+        )
+        rows = cursor.fetchall()
+
+    partitions = []
+    for name, bound in rows:
+        match = _UPPER_BOUND.search(bound or '')
+        upper = date.fromisoformat(match.group(1)[:10]) if match else None
+        partitions.append((name, upper))
+    return partitions
+
+
+def drop_expired(retention_months, archive_dir=None, today=None):
+    """
+    Detach and drop partitions whose rows are all older than the retention.
+
+    With ``archive_dir``, each partition is first copied to
+    ``<archive_dir>/<partition>.csv.gz``. Returns the dropped names.
+    """
+    cutoff = month_start(today or date.today(), -retention_months)
+    dropped = []
+    for name, upper in list_partitions():
+        if upper is None or upper > cutoff:
+            continue
+        if archive_dir:
+            archive_partition(name, archive_dir)
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"ALTER TABLE {TABLE} DETACH PARTITION {name}")
+            cursor.execute(f"DROP TABLE {name}")
+        dropped.append(name)
+    return dropped
+
+
+def archive_partition(name, archive_dir):
+    """Stream a partition to a gzipped CSV with COPY."""
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(archive_dir, f'{name}.csv.gz')
+    with gzip.open(path, 'wb') as archive, connection.cursor() as cursor:
+        cursor.copy_expert(f"COPY {name} TO STDOUT WITH (FORMAT csv, HEADER)", archive)
+    return path
+
+
+def delete_expired_rows(retention_months, today=None):
+    """Retention for databases without partitioning: plain delete."""
+    cutoff = month_start(today or date.today(), -retention_months)
+    cutoff = datetime(cutoff.year, cutoff.month, cutoff.day, tzinfo=dt_timezone.utc)
+    deleted, _ = UserActivity.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
+
+
+def _legacy_upper_bound(cursor):
+    cursor.execute(
+        "SELECT pg_get_expr(relpartbound, oid) FROM pg_class WHERE relname = %s",
+        [LEGACY_PARTITION]
+    )
+    row = cursor.fetchone()
+    match = _UPPER_BOUND.search(row[0] or '') if row else None
+    return date.fromisoformat(match.group(1)[:10]) if match else date.min
@@ -0,0 +1,21 @@
+"""
+Periodic analytics maintenance, scheduled in ``veritas_radix.celery``.
+"""
+import logging
+from celery import shared_task
+from django.core.management import call_command
+from . import word_stats
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def flush_word_analytics():
+    touched = word_stats.flush()
+    logger.info(f"Flushed word analytics for {touched} word-days")
+    return touched
+
+
+@shared_task
+def manage_activity_partitions():
+    call_command('manage_activity_partitions')
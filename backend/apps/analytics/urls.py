@@ -0,0 +1,6 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('events/', views.ingest_events, name='analytics-events'),
+]
\ No newline at end of file
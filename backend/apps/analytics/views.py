@@ -0,0 +1,70 @@
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
+from django.conf import settings
+from apps.core.db_router import replica_reads
+from . import word_stats
+from .events import CLIENT_ACTIVITY_TYPES, record_activities
+
+
+def _validate_event(event):
+    """Return an error message for a malformed event, or None."""
+    if not isinstance(event, dict):
+        return 'event must be an object'
+    if not isinstance(event.get('type'), str) or event['type'] not in CLIENT_ACTIVITY_TYPES:
+        return f"type must be one of {', '.join(sorted(CLIENT_ACTIVITY_TYPES))}"
+    if not isinstance(event.get('data', {}), dict):
+        return 'data must be an object'
+    if len(str(event.get('session_id', ''))) > 100:
+        return 'session_id is too long'
+    return None
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def ingest_events(request):
+    """Store a batch of activity events sent by the frontend."""
+    events = request.data.get('events') if isinstance(request.data, dict) else request.data
+    if not isinstance(events, list) or not events:
+        return Response({'error': 'events must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(events) > settings.ACTIVITY_BATCH_MAX_EVENTS:
+        return Response(
+            {'error': f'At most {settings.ACTIVITY_BATCH_MAX_EVENTS} events per batch'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    for index, event in enumerate(events):
+        error = _validate_event(event)
+        if error:
+            return Response({'error': f'events[{index}]: {error}'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    stored = record_activities(request.user, events)
+    return Response({'stored': stored}, status=status.HTTP_201_CREATED)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+@replica_reads
+def admin_dashboard(request):
+    """Word activity for the current week, with unique learners per word."""
+    try:
+        limit = min(int(request.query_params.get('limit', 20)), 100)
+    except ValueError:
+        return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    since = word_stats.week_start()
+    top = word_stats.top_words(since, limit)
+    learners = word_stats.unique_learners([row['word'] for row in top], since)
+    return Response({
+        'week_start': since,
+        'words': [
+            {
+                'word': row['word'],
+                'searches': row['searches'],
+                'analyses': row['analyses'],
+                'unique_learners': learners[row['word']]
+            }
+            for row in top
+        ]
+    })
@@ -0,0 +1,275 @@
+"""
+Time-bucketed word analytics.
+
+Searches and analyses are counted in Redis per word and hour, and unique
+users per word and day are kept as HyperLogLog sketches (PFADD). A periodic
+flush (``manage.py flush_word_analytics``) folds the counters into compact
+WordActivityBucket rows and stores each day's sketch alongside, so "unique
+learners this week" is a PFCOUNT over at most seven sketches instead of a
+scan over raw events.
+"""
+import logging
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.db import transaction
+from django.db.models import F, Q, Sum
+from django.utils import timezone
+from apps.authentication.leaderboards import get_redis
+from .models import WordActivityBucket, WordAnalytics
+
+logger = logging.getLogger(__name__)
+
+# Activity type -> counter it feeds
+TRACKED_ACTIVITIES = {
+    'word_searched': 'search',
+    'analysis_completed': 'analysis',
+}
+
+HOUR_KEY_TTL = 60 * 60 * 48  # counters survive two days without a flush
+DAY_SKETCH_TTL = 60 * 60 * 24 * 9  # a full week of sketches stays live in Redis
+SKETCH_RESTORE_TTL = 60
+
+
+def _hour_key(moment):
+    return f"wordstats:hour:{moment:%Y%m%d%H}"
+
+
+def _sketch_key(day, word):
+    return f"wordstats:users:{day:%Y%m%d}:{word}"
+
+
+def _normalize(word):
+    return (word or '').strip().lower()[:100]
+
+
+def track(activities):
+    """Count word activities (UserActivity instances) into the live Redis buckets."""
+    tracked = [
+        (activity, _normalize(activity.activity_data.get('word')))
+        for activity in activities
+        if activity.activity_type in TRACKED_ACTIVITIES
+    ]
+    tracked = [(activity, word) for activity, word in tracked if word]
+    if not tracked:
+        return
+
+    redis = get_redis()
+    if redis is None:
+        _track_in_database(tracked)
+        return
+
+    try:
+        pipe = redis.pipeline(transaction=False)
+        for activity, word in tracked:
+            moment = activity.created_at.astimezone(dt_timezone.utc)
+            hour_key = _hour_key(moment)
+            pipe.hincrby(hour_key, f"{TRACKED_ACTIVITIES[activity.activity_type]}:{word}", 1)
+            pipe.expire(hour_key, HOUR_KEY_TTL)
+            sketch_key = _sketch_key(moment.date(), word)
+            pipe.pfadd(sketch_key, activity.user_id)
+            pipe.expire(sketch_key, DAY_SKETCH_TTL)
+        pipe.execute()
+    except Exception as e:
+        # Analytics must never fail the request that produced them
+        logger.error(f"Failed to track word analytics: {str(e)}")
+
+
+def _track_in_database(tracked):
+    """Without Redis, write counters straight to the buckets (no unique users)."""
+    counts = {}
+    for activity, word in tracked:
+        hour = activity.created_at.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+        key = (word, hour, TRACKED_ACTIVITIES[activity.activity_type])
+        counts[key] = counts.get(key, 0) + 1
+    _apply_counts(counts)
+
+
+def flush():
+    """
+    Fold the Redis hour counters into WordActivityBucket rows.
+
+    Each hour hash is renamed before it is read, so increments arriving
+    during the flush land in a fresh key and are picked up next time; a
+    renamed hash left behind by an interrupted flush is processed first.
+    Returns the number of (word, day) pairs touched.
+    """
+    redis = get_redis()
+    if redis is None:
+        return 0
+
+    for key in list(redis.scan_iter(match='wordstats:hour:*', count=1000)):
+        key = key.decode() if isinstance(key, bytes) else key
+        redis.renamenx(key, f"wordstats:flushing:{key.rsplit(':', 1)[1]}")
+
+    touched_days = set()
+    for key in list(redis.scan_iter(match='wordstats:flushing:*', count=1000)):
+        key = key.decode() if isinstance(key, bytes) else key
+        hour = datetime.strptime(key.rsplit(':', 1)[1], '%Y%m%d%H').replace(tzinfo=dt_timezone.utc)
+        counts = {}
+        for field, value in redis.hgetall(key).items():
+            field = field.decode() if isinstance(field, bytes) else field
+            counter, word = field.split(':', 1)
+            counts[(word, hour, counter)] = int(value)
+            touched_days.add((word, hour.date()))
+        _apply_counts(counts)
+        redis.delete(key)
+
+    _store_sketches(redis, touched_days)
+    return len(touched_days)
+
+
+def _apply_counts(counts):
+    """
+    Add ``{(word, hour, counter): n}`` to the hour and day buckets and lifetime totals.
+
+    Missing rows are inserted with zero counts, then incremented in SQL
+    (``count = count + n``), so concurrent writers never lose increments.
+    Rows receiving the same increments share one UPDATE.
+    """
+    increments = {}
+    lifetime = {}
+    for (word, hour, counter), amount in counts.items():
+        day = hour.replace(hour=0)
+        for key in ((word, 'hour', hour), (word, 'day', day)):
+            increments.setdefault(key, {'search': 0, 'analysis': 0})[counter] += amount
+        lifetime.setdefault(word, {'search': 0, 'analysis': 0})[counter] += amount
+    if not increments:
+        return
+
+    now = timezone.now()
+    with transaction.atomic():
+        WordActivityBucket.objects.bulk_create(
+            [
+                WordActivityBucket(word=word, granularity=granularity, bucket_start=start)
+                for word, granularity, start in increments
+            ],
+            ignore_conflicts=True,
+        )
+        for (search, analysis), keys in _group_by_amounts(increments).items():
+            matches = Q()
+            for word, granularity, start in keys:
+                matches |= Q(word=word, granularity=granularity, bucket_start=start)
+            WordActivityBucket.objects.filter(matches).update(
+                search_count=F('search_count') + search,
+                analysis_count=F('analysis_count') + analysis,
+            )
+
+        WordAnalytics.objects.bulk_create(
+            [WordAnalytics(word=word, search_count=0) for word in lifetime],
+            ignore_conflicts=True,
+        )
+        for (search, analysis), words in _group_by_amounts(lifetime).items():
+            WordAnalytics.objects.filter(word__in=words).update(
+                search_count=F('search_count') + search,
+                analysis_count=F('analysis_count') + analysis,
+                last_searched=now,
+                updated_at=now,
+            )
+
+
+def _group_by_amounts(increments):
+    """``{key: {'search': s, 'analysis': a}}`` -> ``{(s, a): [key, ...]}``."""
+    groups = {}
+    for key, added in increments.items():
+        groups.setdefault((added['search'], added['analysis']), []).append(key)
+    return groups
+
+
+def _store_sketches(redis, word_days):
+    """Copy each day's HyperLogLog and its estimate into the day bucket."""
+    word_days = list(word_days)
+    if not word_days:
+        return
+    pipe = redis.pipeline(transaction=False)
+    for word, day in word_days:
+        pipe.get(_sketch_key(day, word))
+        pipe.pfcount(_sketch_key(day, word))
+    results = pipe.execute()
+
+    for index, (word, day) in enumerate(word_days):
+        sketch, estimate = results[2 * index], results[2 * index + 1]
+        if sketch is None:
+            continue
+        WordActivityBucket.objects.filter(
+            word=word,
+            granularity='day',
+            bucket_start=datetime(day.year, day.month, day.day, tzinfo=dt_timezone.utc),
+        ).update(users_sketch=sketch, unique_users=estimate)
+
+
+def week_start(now=None):
+    """Midnight UTC of the Monday starting the current ISO week."""
+    now = (now or timezone.now()).astimezone(dt_timezone.utc)
+    monday = now.date() - timedelta(days=now.weekday())
+    return datetime(monday.year, monday.month, monday.day, tzinfo=dt_timezone.utc)
+
+
+def top_words(since, limit=20):
+    """Most searched/analysed words since ``since``, from the day buckets."""
+    return list(
+        WordActivityBucket.objects
+        .filter(granularity='day', bucket_start__gte=since)
+        .values('word')
+        .annotate(searches=Sum('search_count'), analyses=Sum('analysis_count'))
+        .order_by('-analyses', '-searches')[:limit]
+    )
+
+
+def unique_learners(words, since, now=None):
+    """
+    Estimate distinct users per word since ``since`` (a day boundary).
+
+    Uses the live Redis sketches, restoring any expired day from the sketch
+    stored in its bucket, and PFCOUNTs them together (a union). Returns
+    ``{word: estimate}``; without Redis the largest daily estimate is used
+    as a lower bound.
+    """
+    now = now or timezone.now()
+    days = []
+    day = since.date()
+    while day <= now.astimezone(dt_timezone.utc).date():
+        days.append(day)
+        day += timedelta(days=1)
+
+    stored = {}
+    for word, start, sketch, estimate in (
+        WordActivityBucket.objects
+        .filter(granularity='day', word__in=words, bucket_start__gte=since)
+        .values_list('word', 'bucket_start', 'users_sketch', 'unique_users')
+    ):
+        stored[(word, start.date())] = (sketch, estimate)
+
+    redis = get_redis()
+    if redis is None:
+        return {
+            word: max((stored.get((word, day), (None, 0))[1] or 0 for day in days), default=0)
+            for word in words
+        }
+
+    pipe = redis.pipeline(transaction=False)
+    for word in words:
+        for day in days:
+            pipe.exists(_sketch_key(day, word))
+    live = iter(pipe.execute())
+
+    keys_by_word = {}
+    pipe = redis.pipeline(transaction=False)
+    for word in words:
+        keys = []
+        for day in days:
+            key = _sketch_key(day, word)
+            if not next(live):
+                sketch = stored.get((word, day), (None, None))[0]
+                if sketch is None:
+                    continue
+                key = f"wordstats:restored:{day:%Y%m%d}:{word}"
+                pipe.set(key, bytes(sketch), ex=SKETCH_RESTORE_TTL)
+            keys.append(key)
+        keys_by_word[word] = keys
+    pipe.execute()
+
+    pipe = redis.pipeline(transaction=False)
+    for word in words:
+        if keys_by_word[word]:
+            pipe.pfcount(*keys_by_word[word])
+    counts = iter(pipe.execute())
+    return {word: next(counts) if keys_by_word[word] else 0 for word in words}
@@ -0,0 +1,136 @@
+"""
+Event-driven achievement engine.
+
+Each activity event updates a small set of per-user running aggregates
+(UserStats) and evaluates only the rules registered for its event type,
+so the cost per event is constant no matter how long the user's history
+is. Awards are idempotent.
+"""
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import timedelta
+from django.db import transaction
+from django.utils import timezone
+from . import progress
+from .models import User, UserStats, UserWord, Achievement
+
+logger = logging.getLogger(__name__)
+
+# Events whose ``activity_data['word']`` counts towards distinct words
+WORD_EVENTS = {'analysis_completed', 'word_searched'}
+
+
+@dataclass(frozen=True)
+class Rule:
+    title: str
+    description: str
+    icon: str
+    events: tuple
+    check: object  # callable(UserStats) -> bool
+
+
+RULES = [
+    Rule('Primeira Análise', 'Analisou sua primeira palavra', 'scroll',
+         ('analysis_completed',), lambda stats: stats.count('analysis_completed') >= 1),
+    Rule('Etimologista Aprendiz', 'Analisou 25 palavras', 'book-open',
+         ('analysis_completed',), lambda stats: stats.count('analysis_completed') >= 25),
+    Rule('Colecionador de Palavras', 'Estudou 100 palavras diferentes', 'library',
+         tuple(WORD_EVENTS), lambda stats: stats.distinct_words >= 100),
+    Rule('Mestre do Quiz', 'Acertou 50 questões de quiz', 'trophy',
+         ('quiz_answered',), lambda stats: stats.count('quiz_correct') >= 50),
+    Rule('Desafiante', 'Concluiu 10 desafios', 'target',
+         ('challenge_completed',), lambda stats: stats.count('challenge_completed') >= 10),
+    Rule('Constância', 'Estudou 7 dias seguidos', 'flame',
+         ('*',), lambda stats: stats.current_streak >= 7),
+    Rule('Dedicação', 'Estudou 30 dias seguidos', 'crown',
+         ('*',), lambda stats: stats.current_streak >= 30),
+]
+
+RULES_BY_EVENT = defaultdict(list)
+for _rule in RULES:
+    for _event in _rule.events:
+        RULES_BY_EVENT[_event].append(_rule)
+
+
+def _update_streak(stats, day):
+    """Advance the streak for activity on ``day``; returns True if it changed."""
+    if stats.last_active_date == day:
+        return False
+    if stats.last_active_date == day - timedelta(days=1):
+        stats.current_streak += 1
+    else:
+        stats.current_streak = 1
+    stats.longest_streak = max(stats.longest_streak, stats.current_streak)
+    stats.last_active_date = day
+    return True
+
+
+def process_event(user_id, activity_type, activity_data=None, occurred_at=None):
+    """
+    Apply one activity event to the user's aggregates and award achievements.
+
+    Returns the list of newly awarded achievement titles.
+    """
+    activity_data = activity_data or {}
+    day = timezone.localdate(occurred_at or timezone.now())
+
+    with transaction.atomic():
+        stats, _ = UserStats.objects.select_for_update().get_or_create(user_id=user_id)
+
+        stats.counters[activity_type] = stats.count(activity_type) + 1
+        if activity_type == 'quiz_answered' and activity_data.get('correct'):
+            stats.counters['quiz_correct'] = stats.count('quiz_correct') + 1
+
+        new_word = False
+        word = (activity_data.get('word') or '').strip().lower()
+        if activity_type in WORD_EVENTS and word:
+            _, new_word = UserWord.objects.get_or_create(user_id=user_id, word=word[:200])
+            if new_word:
+                stats.distinct_words += 1
+
+        streak_changed = _update_streak(stats, day)
+
+        awarded = set(stats.awarded)
+        new_rules = [
+            rule for rule in RULES_BY_EVENT[activity_type] + RULES_BY_EVENT['*']
+            if rule.title not in awarded and rule.check(stats)
+        ]
+        if new_rules:
+            Achievement.objects.bulk_create(
+                [
+                    Achievement(
+                        user_id=user_id,
+                        title=rule.title,
+                        description=rule.description,
+                        icon=rule.icon,
+                    )
+                    for rule in new_rules
+                ],
+                ignore_conflicts=True
+            )
+            stats.awarded = stats.awarded + [rule.title for rule in new_rules]
+
+        stats.save()
+        
+        deltas = progress.event_deltas(activity_type, activity_data, new_word)
+        progress.apply_event(user_id, deltas, occurred_at)
+
+        if streak_changed:
+            User.objects.filter(pk=user_id).update(streak_days=stats.current_streak)
+
+    if streak_changed:
+        _sync_streak_leaderboards(user_id)
+
+    titles = [rule.title for rule in new_rules]
+    if titles:
+        logger.info(f"User {user_id} earned achievements: {', '.join(titles)}")
+    return titles
+
+
+def _sync_streak_leaderboards(user_id):
+    from . import leaderboards
+
+    user = User.objects.filter(pk=user_id).first()
+    if user is not None:
+        leaderboards.update_user(user)
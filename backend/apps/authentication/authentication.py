@@ -0,0 +1,67 @@
+"""
+JWT authentication with cached user resolution.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+TOKEN_VERSION_CLAIM = 'token_version'
+
+
+def user_cache_key(user_id, token_version):
+    return f"auth_user:{user_id}:{token_version}"
+
+
+def token_for_user(user):
+    """Issue a refresh token carrying the user's current token version."""
+    refresh = RefreshToken.for_user(user)
+    refresh[TOKEN_VERSION_CLAIM] = user.token_version
+    return refresh
+
+
+def touch_last_activity(user):
+    """
+    Update ``last_activity`` at most once per interval per user.
+
+    Uses a queryset update, so the row is not rewritten in full and no
+    save signals (and cache invalidation) are triggered.
+    """
+    interval = settings.LAST_ACTIVITY_UPDATE_INTERVAL
+    if cache.add(f"last_activity:{user.pk}", 1, interval):
+        now = timezone.now()
+        type(user).objects.filter(pk=user.pk).update(last_activity=now)
+        user.last_activity = now
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that resolves users from a short-TTL cache.
+
+    Entries are keyed by user id and token version and dropped whenever the
+    user is saved, so a warm request performs no users-table query.
+    """
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        token_version = validated_token.get(TOKEN_VERSION_CLAIM)
+        if user_id is None or token_version is None:
+            # Tokens issued before versioning: resolve from the database
+            user = super().get_user(validated_token)
+        else:
+            key = user_cache_key(user_id, token_version)
+            user = cache.get(key)
+            if user is None:
+                user = super().get_user(validated_token)
+                if user.token_version != token_version:
+                    raise AuthenticationFailed(
+                        _("Token is no longer valid"), code="token_version_mismatch"
+                    )
+                cache.set(key, user, settings.AUTH_USER_CACHE_TTL)
+
+        touch_last_activity(user)
+        return user
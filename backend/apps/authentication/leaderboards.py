@@ -0,0 +1,227 @@
+"""
+Leaderboards backed by Redis sorted sets.
+
+Scores are updated incrementally whenever XP, level or streak change, so
+"top N" and "my rank" are O(log n) reads. A board whose key was lost is
+rebuilt from the database on first access. Without Redis, reads fall back
+to ordered database queries.
+"""
+import logging
+from datetime import timedelta
+from django.core.cache import cache
+from django.db.models import IntegerField, Sum
+from django.db.models.fields.json import KT
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+METRICS = ('xp', 'level', 'streak_days')
+SCOPES = ('global', 'institution', 'turma', 'weekly')
+
+REBUILD_CHUNK_SIZE = 5000
+WEEKLY_RETENTION = timedelta(weeks=5)
+
+
+def get_redis():
+    """Return the raw Redis client, or None when the cache is not Redis-backed."""
+    try:
+        from django_redis import get_redis_connection
+        return get_redis_connection('default')
+    except (ImportError, NotImplementedError):
+        return None
+
+
+def current_week(moment=None):
+    # Local time (TIME_ZONE), the clock the database's __week lookups use
+    year, week, _ = timezone.localtime(moment).isocalendar()
+    return f'{year}-W{week:02d}'
+
+
+class Leaderboard:
+    """
+    One ranking: a metric within a scope (global, an institution, a class or a week).
+    """
+
+    def __init__(self, metric='xp', scope='global', scope_id=None):
+        if metric not in METRICS or scope not in SCOPES:
+            raise ValueError(f"Unknown leaderboard {metric}/{scope}")
+        if scope == 'weekly':
+            # Weekly boards only rank XP gained during the week
+            metric = 'xp'
+            scope_id = scope_id or current_week()
+        self.metric = metric
+        self.scope = scope
+        self.scope_id = scope_id
+
+    @property
+    def key(self):
+        key = f"leaderboard:{self.metric}:{self.scope}"
+        if self.scope_id is not None:
+            key += f":{self.scope_id}"
+        return key
+
+    def top(self, limit=100):
+        """Return ``[(user_id, score), ...]`` for the best ``limit`` users."""
+        redis = get_redis()
+        if redis is None:
+            return self._db_top(limit)
+
+        self.ensure_built(redis)
+        return [
+            (int(member), int(score))
+            for member, score in redis.zrevrange(self.key, 0, limit - 1, withscores=True)
+        ]
+
+    def rank(self, user_id):
+        """Return ``(rank, score)`` with a 1-based rank, or ``(None, 0)`` if unranked."""
+        redis = get_redis()
+        if redis is None:
+            return self._db_rank(user_id)
+
+        self.ensure_built(redis)
+        pipe = redis.pipeline(transaction=False)
+        pipe.zrevrank(self.key, user_id)
+        pipe.zscore(self.key, user_id)
+        rank, score = pipe.execute()
+        if rank is None:
+            return None, 0
+        return rank + 1, int(score)
+
+    def ensure_built(self, redis):
+        """Rebuild the sorted set from the database if its key is missing."""
+        if redis.exists(self.key):
+            return
+        # Only one process rebuilds; others serve the (possibly empty) board meanwhile
+        if cache.add(f"{self.key}:rebuilding", 1, 60):
+            try:
+                self.rebuild(redis)
+            finally:
+                cache.delete(f"{self.key}:rebuilding")
+
+    def rebuild(self, redis=None):
+        """Recompute the board from the database and swap it in atomically."""
+        redis = redis or get_redis()
+        if redis is None:
+            return
+
+        tmp_key = f"{self.key}:tmp"
+        redis.delete(tmp_key)
+        batch = {}
+        for user_id, score in self._db_scores().iterator(chunk_size=REBUILD_CHUNK_SIZE):
+            batch[user_id] = score
+            if len(batch) >= REBUILD_CHUNK_SIZE:
+                redis.zadd(tmp_key, batch)
+                batch = {}
+        if batch:
+            redis.zadd(tmp_key, batch)
+
+        if redis.exists(tmp_key):
+            redis.rename(tmp_key, self.key)
+            if self.scope == 'weekly':
+                redis.expire(self.key, int(WEEKLY_RETENTION.total_seconds()))
+
+    def _db_scores(self):
+        """Queryset of ``(user_id, score)`` for this board, straight from the database."""
+        if self.scope == 'weekly':
+            from apps.analytics.models import UserActivity
+
+            year, week = self.scope_id.split('-W')
+            return (
+                UserActivity.objects
+                .filter(
+                    activity_type='xp_gained',
+                    created_at__iso_year=int(year),
+                    created_at__week=int(week),
+                )
+                .order_by()
+                .values('user_id')
+                .annotate(score=Sum(Cast(KT('activity_data__amount'), IntegerField())))
+                .values_list('user_id', 'score')
+            )
+
+        from .models import User
+
+        users = User.objects.filter(is_active=True, user_type='student')
+        if self.scope == 'institution':
+            users = users.filter(institution=self.scope_id)
+        elif self.scope == 'turma':
+            users = users.filter(turmas__id=self.scope_id)
+        return users.values_list('id', self.metric)
+
+    def _db_top(self, limit):
+        return list(self._db_scores().order_by(f'-{self._score_column()}')[:limit])
+
+    def _db_rank(self, user_id):
+        scores = self._db_scores()
+        column = self._score_column()
+        own = list(scores.filter(**{self._user_column(): user_id}).values_list(column, flat=True)[:1])
+        if not own or own[0] is None:
+            return None, 0
+        return scores.filter(**{f'{column}__gt': own[0]}).count() + 1, own[0]
+
+    def _score_column(self):
+        return 'score' if self.scope == 'weekly' else self.metric
+
+    def _user_column(self):
+        return 'user_id' if self.scope == 'weekly' else 'id'
+
+
+def boards_for_user(user, turma_ids=None):
+    """All non-weekly boards a user appears on."""
+    if turma_ids is None:
+        turma_ids = list(user.turmas.values_list('id', flat=True))
+    for metric in METRICS:
+        yield Leaderboard(metric)
+        if user.institution:
+            yield Leaderboard(metric, 'institution', user.institution)
+        for turma_id in turma_ids:
+            yield Leaderboard(metric, 'turma', turma_id)
+
+
+def update_user(user, xp_gained=0):
+    """
+    Push a user's current scores to every board they belong to.
+
+    ``xp_gained`` is added to the current weekly board. Boards whose key is
+    missing are left alone: they are rebuilt from the database (which already
+    holds the new values) on their next read.
+    """
+    redis = get_redis()
+    if redis is None:
+        return
+
+    ranked = user.is_active and user.user_type == 'student'
+    boards = list(boards_for_user(user))
+    weekly = Leaderboard(scope='weekly')
+    try:
+        pipe = redis.pipeline(transaction=False)
+        for board in boards + [weekly]:
+            pipe.exists(board.key)
+        *exists, weekly_exists = pipe.execute()
+
+        pipe = redis.pipeline(transaction=False)
+        for board, board_exists in zip(boards, exists):
+            if not board_exists:
+                continue
+            if ranked:
+                pipe.zadd(board.key, {user.pk: getattr(user, board.metric)})
+            else:
+                pipe.zrem(board.key, user.pk)
+        if ranked and xp_gained and weekly_exists:
+            pipe.zincrby(weekly.key, xp_gained, user.pk)
+        pipe.execute()
+    except Exception as e:
+        # Boards are rebuilt from the database when inconsistent; never fail the write path
+        logger.error(f"Failed to update leaderboards for user {user.pk}: {str(e)}")
+
+
+def remove_user(user_id, turma_id):
+    """Drop a user from a class's boards (e.g. after leaving the class)."""
+    redis = get_redis()
+    if redis is None:
+        return
+    pipe = redis.pipeline(transaction=False)
+    for metric in METRICS:
+        pipe.zrem(Leaderboard(metric, 'turma', turma_id).key, user_id)
+    pipe.execute()
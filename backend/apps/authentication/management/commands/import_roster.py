@@ -0,0 +1,53 @@
+"""
+Create student accounts from a CSV roster (email,username[,password]).
+"""
+import csv
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from apps.authentication import roster
+from apps.authentication.models import Turma
+
+
+class Command(BaseCommand):
+    help = 'Bulk-create students from a CSV roster, optionally enrolling them in a class'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file with email, username and optional password columns')
+        parser.add_argument('--turma', help='Class code (codigo_turma) to enroll the students in')
+        parser.add_argument('--institution', default='')
+        parser.add_argument('--workers', type=int, help='Password hashing processes (default: ROSTER_HASH_WORKERS)')
+        parser.add_argument('--output', help='Write per-row results (including generated passwords) to this CSV')
+
+    def handle(self, *args, **options):
+        turma = None
+        if options['turma']:
+            turma = Turma.objects.filter(codigo_turma=options['turma']).first()
+            if turma is None:
+                raise CommandError(f"Class not found: {options['turma']}")
+
+        with open(options['path'], encoding='utf-8-sig') as roster_file:
+            rows = roster.parse_roster(roster_file.read())
+
+        start_time = time.time()
+        results = roster.import_roster(
+            rows,
+            turma=turma,
+            institution=options['institution'],
+            workers=options['workers'] or settings.ROSTER_HASH_WORKERS
+        )
+        elapsed = time.time() - start_time
+
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as output:
+                writer = csv.DictWriter(output, ['row', 'email', 'status', 'id', 'password', 'error'])
+                writer.writeheader()
+                writer.writerows(results)
+        for result in results:
+            if result['status'] == 'error':
+                self.stderr.write(f"Row {result['row']} ({result['email']}): {result['error']}")
+
+        created = sum(1 for result in results if result['status'] == 'created')
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {created} of {len(rows)} students in {elapsed:.1f}s"
+        ))
@@ -0,0 +1,25 @@
+"""
+Recompute the materialized class progress from the source tables.
+"""
+import time
+from django.core.management.base import BaseCommand
+from apps.authentication import progress
+
+
+class Command(BaseCommand):
+    help = 'Rebuild TurmaProgress/TurmaAlunoProgress for every class (or the given ones)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('turma_ids', nargs='*', type=int, help='Only these classes')
+
+    def handle(self, *args, **options):
+        start_time = time.time()
+        if options['turma_ids']:
+            for turma_id in options['turma_ids']:
+                progress.reconcile_turma(turma_id)
+            count = len(options['turma_ids'])
+        else:
+            count = progress.reconcile_all()
+        self.stdout.write(self.style.SUCCESS(
+            f"Reconciled progress of {count} classes in {time.time() - start_time:.1f}s"
+        ))
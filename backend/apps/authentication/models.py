@@ -3,6 +3,18 @@ from django.db import models
 from apps.core.models import BaseModel
 
 
+def calculate_level(total_xp):
+    """Level for a total XP; mirrors calculateLevel in the frontend's GamificationSystem."""
+    level = 1
+    xp_required = 100
+    total_required = 0
+    while total_xp >= total_required + xp_required:
+        total_required += xp_required
+        level += 1
+        xp_required += 50 + (level * 25)
+    return level
+
+
 class User(AbstractUser):
     """Custom user model for Veritas Radix."""
     email = models.EmailField(unique=True)
@@ -18,6 +30,9 @@ class User(AbstractUser):
     streak_days = models.IntegerField(default=0)
     last_activity = models.DateTimeField(auto_now=True)
     
+    # Bumped when the password is changed; JWTs carry it so old tokens stop resolving
+    token_version = models.PositiveIntegerField(default=0)
+    
     # Profile fields
     birth_date = models.DateField(null=True, blank=True)
     institution = models.CharField(max_length=200, blank=True)
@@ -27,6 +42,44 @@ class User(AbstractUser):
     
     def __str__(self):
         return self.email
+    
+    def add_xp(self, amount):
+        """
+        Atomically add XP, recompute the level and update the leaderboards.
+        """
+        from apps.analytics.models import UserActivity
+        from . import leaderboards
+        
+        User.objects.filter(pk=self.pk).update(xp=models.F('xp') + amount)
+        self.xp = User.objects.filter(pk=self.pk).values_list('xp', flat=True).get()
+        level = calculate_level(self.xp)
+        if level != self.level:
+            self.level = level
+            User.objects.filter(pk=self.pk).update(level=level)
+        
+        UserActivity.objects.create(
+            user=self,
+            activity_type='xp_gained',
+            activity_data={'amount': amount}
+        )
+        leaderboards.update_user(self, xp_gained=amount)
+    
+    def save(self, *args, **kwargs):
+        # A changed password (set_password then save: admin, changepassword,
+        # reset forms) revokes existing tokens. Hash upgrades on login clear
+        # _password before saving, so they keep the user's sessions.
+        if self._password is not None and self.pk is not None:
+            self.token_version += 1
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'token_version'}
+        super().save(*args, **kwargs)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['-xp']),
+            models.Index(fields=['institution', '-xp']),
+        ]
 
 
 class Achievement(BaseModel):
@@ -38,4 +91,70 @@ class Achievement(BaseModel):
     earned_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
-        unique_together = ['user', 'title']
\ No newline at end of file
+        unique_together = ['user', 'title']
+
+
+class UserStats(models.Model):
+    """Running per-user aggregates consumed by the achievement engine."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    counters = models.JSONField(default=dict)  # activity_type -> count
+    distinct_words = models.PositiveIntegerField(default=0)
+    current_streak = models.PositiveIntegerField(default=0)
+    longest_streak = models.PositiveIntegerField(default=0)
+    last_active_date = models.DateField(null=True, blank=True)
+    awarded = models.JSONField(default=list)  # achievement titles already earned
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def count(self, activity_type):
+        return self.counters.get(activity_type, 0)
+
+
+class UserWord(BaseModel):
+    """Distinct words a user has worked with (backs UserStats.distinct_words)."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    word = models.CharField(max_length=200)
+    
+    class Meta:
+        unique_together = ['user', 'word']
+
+
+class Turma(BaseModel):
+    """Class managed by a teacher; students join it with a code."""
+    nome = models.CharField(max_length=200)
+    codigo_turma = models.CharField(max_length=20, unique=True)
+    descricao = models.TextField(blank=True)
+    professor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='turmas_criadas')
+    alunos = models.ManyToManyField(User, related_name='turmas', blank=True)
+    
+    def __str__(self):
+        return f"{self.nome} ({self.codigo_turma})"
+
+
+class TurmaProgress(models.Model):
+    """Materialized class totals, kept in step incrementally (see progress.py)."""
+    turma = models.OneToOneField(Turma, on_delete=models.CASCADE, primary_key=True, related_name='progresso')
+    total_alunos = models.PositiveIntegerField(default=0)
+    xp = models.IntegerField(default=0)
+    desafios_concluidos = models.IntegerField(default=0)
+    palavras_estudadas = models.IntegerField(default=0)
+    analises = models.IntegerField(default=0)
+    ultima_atividade = models.DateTimeField(null=True, blank=True)
+    reconciled_at = models.DateTimeField(null=True, blank=True)
+
+
+class TurmaAlunoProgress(models.Model):
+    """Materialized progress of one student within a class."""
+    turma = models.ForeignKey(Turma, on_delete=models.CASCADE, related_name='progresso_alunos')
+    aluno = models.ForeignKey(User, on_delete=models.CASCADE, related_name='progresso_turmas')
+    xp = models.IntegerField(default=0)
+    nivel = models.IntegerField(default=1)
+    desafios_concluidos = models.IntegerField(default=0)
+    palavras_estudadas = models.IntegerField(default=0)
+    analises = models.IntegerField(default=0)
+    ultima_atividade = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        unique_together = ['turma', 'aluno']
+        indexes = [
+            models.Index(fields=['turma', '-xp']),
+        ]
\ No newline at end of file
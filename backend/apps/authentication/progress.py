@@ -0,0 +1,214 @@
+"""
+Materialized class progress for teacher dashboards.
+
+Every activity event adds its deltas to the student's rows in all of their
+classes and to those classes' totals with two UPDATE statements, so reading
+a class's progress is a lookup plus one indexed scan. Membership changes
+add or subtract only the joining or leaving students, and
+``manage.py reconcile_turma_progress`` (scheduled nightly) recomputes
+everything from the source tables to repair any drift.
+
+Student rows are computed from the source rows, never from the
+denormalized ``UserStats``: XP and level from the user, analyses,
+challenges and last activity from the event log (``UserActivity``, so
+only events within ``ACTIVITY_RETENTION_MONTHS`` count) and studied
+words from ``UserWord``.
+"""
+import logging
+from django.db import transaction
+from django.db.models import Count, F, Max, Q, Subquery
+from django.utils import timezone
+from apps.analytics.events import CLIENT_ACTIVITY_TYPES
+from apps.analytics.models import UserActivity
+from .models import User, UserWord, Turma, TurmaProgress, TurmaAlunoProgress
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_FIELDS = ['xp', 'desafios_concluidos', 'palavras_estudadas', 'analises']
+
+
+def event_deltas(activity_type, activity_data, new_word=False):
+    """Progress deltas produced by one activity event."""
+    deltas = {}
+    if activity_type == 'xp_gained':
+        deltas['xp'] = int(activity_data.get('amount', 0))
+    elif activity_type == 'analysis_completed':
+        deltas['analises'] = 1
+    elif activity_type == 'challenge_completed':
+        deltas['desafios_concluidos'] = 1
+    if new_word:
+        deltas['palavras_estudadas'] = 1
+    return {field: amount for field, amount in deltas.items() if amount}
+
+
+def apply_event(user_id, deltas, occurred_at=None):
+    """Add an event's deltas to the student's class rows and their class totals."""
+    occurred_at = occurred_at or timezone.now()
+    increments = {field: F(field) + amount for field, amount in deltas.items()}
+
+    student_updates = {**increments, 'ultima_atividade': occurred_at}
+    if 'xp' in deltas:
+        # The level was already recomputed on the user by add_xp
+        student_updates['nivel'] = Subquery(User.objects.filter(pk=user_id).values('level')[:1])
+    updated = TurmaAlunoProgress.objects.filter(aluno_id=user_id).update(**student_updates)
+    if updated:
+        TurmaProgress.objects.filter(turma__alunos__id=user_id).update(
+            **increments,
+            ultima_atividade=occurred_at
+        )
+
+
+def _student_rows(turma_id, members):
+    """Progress rows of ``members`` (``(id, xp, level)`` tuples) in one class, from the source rows."""
+    user_ids = [user_id for user_id, _, _ in members]
+    events = {
+        row['user_id']: row
+        for row in (
+            UserActivity.objects
+            .filter(user_id__in=user_ids)
+            .exclude(activity_type__in=CLIENT_ACTIVITY_TYPES)
+            .values('user_id')
+            .annotate(
+                analises=Count('id', filter=Q(activity_type='analysis_completed')),
+                desafios_concluidos=Count('id', filter=Q(activity_type='challenge_completed')),
+                ultima_atividade=Max('created_at'),
+            )
+            .order_by()
+        )
+    }
+    words = dict(
+        UserWord.objects
+        .filter(user_id__in=user_ids)
+        .values('user_id')
+        .annotate(count=Count('id'))
+        .values_list('user_id', 'count')
+        .order_by()
+    )
+
+    rows = []
+    for user_id, xp, level in members:
+        user_events = events.get(user_id, {})
+        rows.append(TurmaAlunoProgress(
+            turma_id=turma_id,
+            aluno_id=user_id,
+            xp=xp,
+            nivel=level,
+            desafios_concluidos=user_events.get('desafios_concluidos', 0),
+            palavras_estudadas=words.get(user_id, 0),
+            analises=user_events.get('analises', 0),
+            ultima_atividade=user_events.get('ultima_atividade'),
+        ))
+    return rows
+
+
+def _drifted(stored, rows):
+    """Students whose stored row is missing, extra or differs from the recomputed one."""
+    recomputed = {row.aluno_id: row for row in rows}
+    drifted = set(stored) ^ set(recomputed)
+    for aluno_id in set(stored) & set(recomputed):
+        if any(
+            getattr(stored[aluno_id], field) != getattr(recomputed[aluno_id], field)
+            for field in ['nivel', *PROGRESS_FIELDS]
+        ):
+            drifted.add(aluno_id)
+    return drifted
+
+
+def _latest_activity(rows):
+    return max((row.ultima_atividade for row in rows if row.ultima_atividade), default=None)
+
+
+def reconcile_turma(turma_id):
+    """
+    Recompute one class's materialized progress from the source tables,
+    compare it with the stored rows and replace them. Returns the number
+    of students whose stored progress had drifted.
+    """
+    members = list(
+        User.objects
+        .filter(turmas__id=turma_id)
+        .values_list('id', 'xp', 'level')
+    )
+    rows = _student_rows(turma_id, members)
+
+    with transaction.atomic():
+        stored = {
+            row.aluno_id: row
+            for row in TurmaAlunoProgress.objects.select_for_update().filter(turma_id=turma_id)
+        }
+        # A class without totals is being built for the first time: nothing to drift from
+        built = TurmaProgress.objects.filter(turma_id=turma_id).exists()
+        drifted = _drifted(stored, rows) if built else set()
+        if drifted:
+            logger.warning(f"Class {turma_id} progress drifted for {len(drifted)} students; repaired")
+        TurmaAlunoProgress.objects.filter(turma_id=turma_id).delete()
+        TurmaAlunoProgress.objects.bulk_create(rows)
+        TurmaProgress.objects.update_or_create(
+            turma_id=turma_id,
+            defaults={
+                'total_alunos': len(rows),
+                **{field: sum(getattr(row, field) for row in rows) for field in PROGRESS_FIELDS},
+                'ultima_atividade': _latest_activity(rows),
+                'reconciled_at': timezone.now(),
+            }
+        )
+    return len(drifted)
+
+
+def _shift_totals(totals, rows, sign):
+    totals.total_alunos += sign * len(rows)
+    for field in PROGRESS_FIELDS:
+        setattr(totals, field, getattr(totals, field) + sign * sum(getattr(row, field) for row in rows))
+
+
+def add_students(turma_id, user_ids):
+    """Add the rows of students who joined a class, and their share of its totals."""
+    with transaction.atomic():
+        # Locked, so concurrent events' increments land after this write
+        totals = TurmaProgress.objects.select_for_update().filter(turma_id=turma_id).first()
+        if totals is None:
+            reconcile_turma(turma_id)
+            return
+
+        existing = set(
+            TurmaAlunoProgress.objects
+            .filter(turma_id=turma_id, aluno_id__in=user_ids)
+            .values_list('aluno_id', flat=True)
+        )
+        members = list(
+            User.objects
+            .filter(pk__in=set(user_ids) - existing, turmas__id=turma_id)
+            .values_list('id', 'xp', 'level')
+        )
+        rows = TurmaAlunoProgress.objects.bulk_create(_student_rows(turma_id, members))
+
+        _shift_totals(totals, rows, 1)
+        latest = _latest_activity(rows)
+        if latest and (totals.ultima_atividade is None or latest > totals.ultima_atividade):
+            totals.ultima_atividade = latest
+        totals.save(update_fields=['total_alunos', *PROGRESS_FIELDS, 'ultima_atividade'])
+
+
+def remove_students(turma_id, user_ids=None):
+    """Drop the rows of students who left a class (all of them for None) from its totals."""
+    with transaction.atomic():
+        totals = TurmaProgress.objects.select_for_update().filter(turma_id=turma_id).first()
+        if totals is None:
+            return
+
+        rows = TurmaAlunoProgress.objects.filter(turma_id=turma_id)
+        if user_ids is not None:
+            rows = rows.filter(aluno_id__in=user_ids)
+        rows = list(rows)
+        TurmaAlunoProgress.objects.filter(pk__in=[row.pk for row in rows]).delete()
+
+        _shift_totals(totals, rows, -1)
+        totals.save(update_fields=['total_alunos', *PROGRESS_FIELDS])
+
+
+def reconcile_all():
+    """Recompute every class; returns how many were reconciled."""
+    turma_ids = list(Turma.objects.values_list('id', flat=True))
+    for turma_id in turma_ids:
+        reconcile_turma(turma_id)
+    return len(turma_ids)
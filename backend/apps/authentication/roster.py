@@ -0,0 +1,173 @@
+"""
+Bulk student onboarding from a CSV roster.
+
+Rows are validated one by one (email and username field validators,
+``AUTH_PASSWORD_VALIDATORS`` for provided passwords), existing emails and
+usernames are checked case-insensitively with one query each and users are
+inserted with a single ``bulk_create``, falling back to row-by-row inserts
+when the database rejects the batch. Every input row gets a result.
+Uploads of up to ``ROSTER_SYNC_MAX_ROWS`` hash on the request thread;
+larger ones (capped at ``ROSTER_MAX_ROWS``) are imported by the
+``import_turma_roster`` Celery task, and ``manage.py import_roster``
+takes rosters of any size. Both hash in a process pool (PBKDF2 is
+CPU-bound).
+"""
+import io
+import csv
+import secrets
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.password_validation import validate_password
+from django.core.exceptions import ValidationError
+from django.db import DataError, IntegrityError, transaction
+from django.db.models.functions import Lower
+from .models import User
+
+logger = logging.getLogger(__name__)
+
+ROSTER_FIELDS = ['email', 'username', 'password']
+GENERATED_PASSWORD_BYTES = 9  # 12 URL-safe characters
+
+
+def _init_worker():
+    # Spawned (non-forked) workers need Django configured to hash
+    import django
+    django.setup()
+
+
+def hash_passwords(passwords, workers=1):
+    """Hash passwords, in a pool of ``workers`` processes when there are more than one."""
+    # Daemonic processes (Celery's prefork children) may not start a pool
+    if workers <= 1 or len(passwords) < 2 or multiprocessing.current_process().daemon:
+        return [make_password(password) for password in passwords]
+    with ProcessPoolExecutor(max_workers=min(workers, len(passwords)), initializer=_init_worker) as pool:
+        return list(pool.map(make_password, passwords, chunksize=max(1, len(passwords) // (workers * 4))))
+
+
+def parse_roster(content):
+    """Read CSV text (header: email,username[,password]) into row dicts."""
+    reader = csv.DictReader(io.StringIO(content.lstrip('\ufeff')))
+    return [
+        {field: (row.get(field) or '').strip() for field in ROSTER_FIELDS}
+        for row in reader
+    ]
+
+
+def import_roster(rows, turma=None, user_type='student', institution='', workers=1):
+    """
+    Create users for roster rows and optionally enroll them in a class.
+
+    Returns one result per row: ``{'row', 'email', 'status', ...}`` where
+    status is ``created`` (with ``password`` when it was generated) or
+    ``error`` (with ``error``).
+    """
+    results = [{'row': index, 'email': row.get('email', '')} for index, row in enumerate(rows, start=1)]
+    email_field = User._meta.get_field('email')
+    username_field = User._meta.get_field('username')
+    seen_emails, seen_usernames = set(), set()
+    valid = []
+    for result, row in zip(results, rows):
+        email = row.get('email', '').strip().lower()
+        username = row.get('username', '')
+        password = row.get('password', '')
+        try:
+            email_field.run_validators(email)
+        except ValidationError:
+            result.update(status='error', error='Invalid email')
+            continue
+        if not username:
+            result.update(status='error', error='Username required')
+            continue
+        try:
+            username_field.run_validators(username)
+            if password:
+                validate_password(password, User(email=email, username=username))
+        except ValidationError as e:
+            result.update(status='error', error=' '.join(e.messages))
+            continue
+        if email in seen_emails:
+            result.update(status='error', error='Duplicate email in roster')
+        elif username.lower() in seen_usernames:
+            result.update(status='error', error='Duplicate username in roster')
+        else:
+            seen_emails.add(email)
+            seen_usernames.add(username.lower())
+            result['email'] = email
+            valid.append((result, email, username, password))
+
+    existing_emails = set(
+        User.objects
+        .annotate(email_lower=Lower('email'))
+        .filter(email_lower__in=[email for _, email, _, _ in valid])
+        .values_list('email_lower', flat=True)
+    )
+    existing_usernames = set(
+        User.objects
+        .annotate(username_lower=Lower('username'))
+        .filter(username_lower__in=[username.lower() for _, _, username, _ in valid])
+        .values_list('username_lower', flat=True)
+    )
+
+    pending = []
+    for result, email, username, password in valid:
+        if email in existing_emails:
+            result.update(status='error', error='Email already exists')
+        elif username.lower() in existing_usernames:
+            result.update(status='error', error='Username already exists')
+        else:
+            if not password:
+                password = secrets.token_urlsafe(GENERATED_PASSWORD_BYTES)
+                result['password'] = password
+            pending.append((result, email, username, password))
+
+    hashes = hash_passwords([password for _, _, _, password in pending], workers)
+    users = [
+        User(
+            email=email,
+            username=username,
+            password=password_hash,
+            user_type=user_type,
+            institution=institution,
+        )
+        for (_, email, username, _), password_hash in zip(pending, hashes)
+    ]
+
+    with transaction.atomic():
+        created = _create_users([result for result, _, _, _ in pending], users)
+        if turma is not None and created:
+            turma.alunos.add(*[user for _, user in created])
+
+    for result, user in created:
+        result.update(status='created', id=user.pk)
+    logger.info(f"Roster import: {len(created)} of {len(rows)} users created")
+    return results
+
+
+def _create_users(results, users):
+    """
+    Insert ``users`` in one batch; when the database rejects it (an email or
+    username registered meanwhile, a value it refuses) retry row by row and
+    record the failing rows. Returns ``(result, user)`` for the created ones.
+    """
+    try:
+        with transaction.atomic():
+            return list(zip(results, User.objects.bulk_create(users)))
+    except (IntegrityError, DataError) as e:
+        logger.warning(f"Roster batch insert failed, retrying row by row: {str(e)}")
+
+    created = []
+    for result, user in zip(results, users):
+        try:
+            with transaction.atomic():
+                user.save()
+        except IntegrityError:
+            result.update(status='error', error='Email or username already exists')
+            result.pop('password', None)
+        except DataError:
+            result.update(status='error', error='Invalid email or username')
+            result.pop('password', None)
+        else:
+            created.append((result, user))
+    return created
@@ -0,0 +1,69 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from . import achievements, leaderboards, progress
+from .authentication import user_cache_key
+from .models import User, Turma
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """Drop cached auth entries for the current and previous token version."""
+    versions = {instance.token_version, max(instance.token_version - 1, 0)}
+    cache.delete_many([user_cache_key(instance.pk, version) for version in versions])
+
+
+@receiver(post_save, sender=User)
+def sync_leaderboards(sender, instance, update_fields=None, **kwargs):
+    """Keep leaderboard scores in step with direct saves (admin edits, streak updates)."""
+    ranked_fields = {'xp', 'level', 'streak_days', 'institution', 'is_active', 'user_type'}
+    if update_fields is None or ranked_fields & set(update_fields):
+        leaderboards.update_user(instance)
+
+
+@receiver(m2m_changed, sender=Turma.alunos.through)
+def sync_turma_leaderboards(sender, instance, action, pk_set, **kwargs):
+    """Add or remove students from a class's boards as they join or leave."""
+    if action == 'post_add' and isinstance(instance, Turma):
+        for user in User.objects.filter(pk__in=pk_set):
+            leaderboards.update_user(user)
+    elif action == 'post_remove' and isinstance(instance, Turma):
+        for user_id in pk_set:
+            leaderboards.remove_user(user_id, instance.pk)
+
+
+@receiver(post_save, sender='analytics.UserActivity')
+def process_activity(sender, instance, created, **kwargs):
+    """Feed each new activity to the incremental achievement engine."""
+    if created:
+        achievements.process_event(
+            instance.user_id,
+            instance.activity_type,
+            instance.activity_data,
+            instance.created_at
+        )
+
+
+@receiver(m2m_changed, sender=Turma.alunos.through)
+def sync_turma_progress(sender, instance, action, reverse, pk_set, **kwargs):
+    """Add or subtract the students who joined or left a class in its materialized progress."""
+    if reverse and action == 'pre_clear':
+        # Remember the user's classes; post_clear does not say which they were
+        instance._cleared_turma_ids = list(instance.turmas.values_list('id', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    
+    if not reverse:
+        # pk_set is None on clear: every student left
+        changes = [(instance.pk, pk_set)]
+    elif action == 'post_clear':
+        changes = [(turma_id, {instance.pk}) for turma_id in getattr(instance, '_cleared_turma_ids', [])]
+    else:
+        changes = [(turma_id, {instance.pk}) for turma_id in pk_set or []]
+    apply_change = progress.add_students if action == 'post_add' else progress.remove_students
+    for turma_id, user_ids in changes:
+        transaction.on_commit(
+            lambda turma_id=turma_id, user_ids=user_ids: apply_change(turma_id, user_ids)
+        )
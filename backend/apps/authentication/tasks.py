@@ -0,0 +1,31 @@
+"""
+Class progress maintenance, scheduled in ``veritas_radix.celery``, and
+roster imports too large to hash on the request.
+"""
+import logging
+from celery import shared_task
+from django.conf import settings
+from . import progress, roster
+from .models import Turma
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def reconcile_turma_progress():
+    count = progress.reconcile_all()
+    logger.info(f"Reconciled progress of {count} classes")
+    return count
+
+
+@shared_task
+def import_turma_roster(turma_id, rows, institution=''):
+    """
+    Import an uploaded roster into a class. The result (with generated
+    passwords) stays in the result backend until the professor reads it.
+    """
+    turma = Turma.objects.get(pk=turma_id)
+    results = roster.import_roster(
+        rows, turma=turma, institution=institution, workers=settings.ROSTER_HASH_WORKERS
+    )
+    return {'turma_id': turma_id, 'results': results}
@@ -4,4 +4,22 @@ from . import views
 urlpatterns = [
     path('login/', views.login_view, name='login'),
     path('register/', views.register_view, name='register'),
+    path('ranking/', views.ranking_view, name='ranking'),
+    path('turmas/<int:turma_id>/progresso/', views.turma_progress_view, name='turma-progress'),
+    path('turmas/<int:turma_id>/alunos/importar/', views.import_turma_roster, name='turma-import-roster'),
+    path(
+        'turmas/<int:turma_id>/alunos/importar/<str:job_id>/',
+        views.turma_roster_import_status,
+        name='turma-import-roster-status'
+    ),
+    path(
+        'turmas/<int:turma_id>/exportar/analises/',
+        views.export_turma_analyses,
+        name='turma-export-analyses'
+    ),
+    path(
+        'turmas/<int:turma_id>/exportar/favoritos/',
+        views.export_turma_bookmarks,
+        name='turma-export-bookmarks'
+    ),
 ]
\ No newline at end of file
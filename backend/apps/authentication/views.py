@@ -1,10 +1,29 @@
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import RefreshToken
+from django.conf import settings
 from django.contrib.auth import authenticate
-from .models import User
+from django.db.models import Q
+from apps.core.db_router import replica_reads
+from apps.core.streaming import streaming_export, EXPORT_FORMATS
+from apps.etymology.models import EtymologyAnalysis, EtymologyBookmark
+from . import leaderboards, progress, roster
+from .authentication import token_for_user
+from .models import User, Turma, TurmaProgress
+
+EXPORT_CHUNK_SIZE = 2000
+
+ANALYSIS_EXPORT_FIELDS = [
+    'id', 'user__email', 'word', 'status', 'original_language', 'original_form',
+    'prefix', 'root', 'suffix', 'etymology_explanation', 'confidence_score',
+    'view_count', 'created_at',
+]
+
+BOOKMARK_EXPORT_FIELDS = [
+    'id', 'user__email', 'analysis__word', 'analysis__original_language',
+    'notes', 'created_at',
+]
 
 
 @api_view(['POST'])
@@ -22,7 +41,7 @@ def login_view(request):
     
     user = authenticate(email=email, password=password)
     if user:
-        refresh = RefreshToken.for_user(user)
+        refresh = token_for_user(user)
         return Response({
             'access': str(refresh.access_token),
             'refresh': str(refresh),
@@ -70,7 +89,7 @@ def register_view(request):
         user_type=user_type
     )
     
-    refresh = RefreshToken.for_user(user)
+    refresh = token_for_user(user)
     return Response({
         'access': str(refresh.access_token),
         'refresh': str(refresh),
@@ -82,4 +101,246 @@ def register_view(request):
             'xp': user.xp,
             'level': user.level
         }
-    }, status=status.HTTP_201_CREATED)
\ No newline at end of file
+    }, status=status.HTTP_201_CREATED)
+
+
+def _export(request, turma_id, queryset, fields, name):
+    """Stream a class export as NDJSON or CSV, optionally gzip-compressed."""
+    turma = Turma.objects.filter(id=turma_id, professor=request.user).first()
+    if turma is None:
+        return Response(
+            {'error': 'Class not found'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    export_format = request.query_params.get('output', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        return Response(
+            {'error': f"output must be one of: {', '.join(EXPORT_FORMATS)}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    rows = (
+        queryset
+        .filter(user__turmas=turma)
+        .order_by('id')
+        .values(*fields)
+    )
+    # Read while streaming, after the view has returned: route it now
+    rows = rows.using(rows.db).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    return streaming_export(
+        rows,
+        fields,
+        filename=f'{name}-{turma.codigo_turma}',
+        export_format=export_format,
+        compress=request.query_params.get('compress') == 'gzip'
+    )
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@replica_reads
+def export_turma_analyses(request, turma_id):
+    """Export the etymology analyses of a class's students."""
+    return _export(request, turma_id, EtymologyAnalysis.objects, ANALYSIS_EXPORT_FIELDS, 'analises')
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@replica_reads
+def export_turma_bookmarks(request, turma_id):
+    """Export the bookmarks of a class's students."""
+    return _export(request, turma_id, EtymologyBookmark.objects, BOOKMARK_EXPORT_FIELDS, 'favoritos')
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@replica_reads
+def ranking_view(request):
+    """Leaderboard top 100 plus the current user's rank."""
+    metric = request.query_params.get('metric', 'xp')
+    scope = request.query_params.get('scope', 'global')
+    scope_id = None
+    if scope == 'institution':
+        scope_id = request.user.institution
+    elif scope == 'turma':
+        try:
+            scope_id = int(request.query_params.get('turma_id'))
+        except (TypeError, ValueError):
+            return Response({'error': 'turma_id must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        # Only the class's teacher and students see its ranking
+        member = Q(professor=request.user) | Q(alunos=request.user)
+        if not Turma.objects.filter(member, id=scope_id).exists():
+            return Response({'error': 'Class not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    try:
+        board = leaderboards.Leaderboard(metric, scope, scope_id)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    if scope in ('institution', 'turma') and not scope_id:
+        return Response(
+            {'error': f'No {scope} to rank'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    top = board.top(100)
+    usernames = dict(
+        User.objects.filter(id__in=[user_id for user_id, _ in top]).values_list('id', 'username')
+    )
+    rank, score = board.rank(request.user.id)
+    return Response({
+        'metric': board.metric,
+        'scope': board.scope,
+        'ranking': [
+            {
+                'rank': position,
+                'user_id': user_id,
+                'username': usernames.get(user_id, ''),
+                'score': user_score
+            }
+            for position, (user_id, user_score) in enumerate(top, start=1)
+        ],
+        'me': {'rank': rank, 'score': score}
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@replica_reads
+def turma_progress_view(request, turma_id):
+    """Materialized progress of a class and its students, for its teacher."""
+    turma = Turma.objects.filter(id=turma_id, professor=request.user).first()
+    if turma is None:
+        return Response(
+            {'error': 'Class not found'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    totals = TurmaProgress.objects.filter(turma=turma).first()
+    if totals is None:
+        # Never materialized (class created before progress tracking)
+        progress.reconcile_turma(turma.id)
+        totals = TurmaProgress.objects.get(turma=turma)
+    
+    alunos = (
+        turma.progresso_alunos
+        .order_by('-xp')
+        .values(
+            'aluno_id', 'aluno__username', 'xp', 'nivel', 'desafios_concluidos',
+            'palavras_estudadas', 'analises', 'ultima_atividade'
+        )
+    )
+    count = max(totals.total_alunos, 1)
+    return Response({
+        'turma': {'id': turma.id, 'nome': turma.nome, 'codigo_turma': turma.codigo_turma},
+        'numeroAlunos': totals.total_alunos,
+        'totais': {
+            'xp': totals.xp,
+            'desafiosConcluidos': totals.desafios_concluidos,
+            'palavrasEstudadas': totals.palavras_estudadas,
+            'analises': totals.analises,
+        },
+        'medias': {
+            'xp': round(totals.xp / count, 1),
+            'desafiosConcluidos': round(totals.desafios_concluidos / count, 1),
+            'palavrasEstudadas': round(totals.palavras_estudadas / count, 1),
+            'analises': round(totals.analises / count, 1),
+        },
+        'ultimaAtividade': totals.ultima_atividade,
+        'alunos': [
+            {
+                'id': aluno['aluno_id'],
+                'username': aluno['aluno__username'],
+                'progresso': {
+                    'nivel': aluno['nivel'],
+                    'xp': aluno['xp'],
+                    'desafiosConcluidos': aluno['desafios_concluidos'],
+                    'palavrasEstudadas': aluno['palavras_estudadas'],
+                    'analises': aluno['analises'],
+                },
+                'ultimaAtividade': aluno['ultima_atividade']
+            }
+            for aluno in alunos
+        ]
+    })
+
+
+def _roster_summary(results):
+    return {
+        'created': sum(1 for result in results if result['status'] == 'created'),
+        'errors': sum(1 for result in results if result['status'] == 'error'),
+        'results': results
+    }
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def import_turma_roster(request, turma_id):
+    """Create student accounts from a CSV roster and enroll them in the class."""
+    turma = Turma.objects.filter(id=turma_id, professor=request.user).first()
+    if turma is None:
+        return Response(
+            {'error': 'Class not found'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    upload = request.FILES.get('file')
+    try:
+        content = upload.read().decode('utf-8-sig') if upload else request.data.get('csv', '')
+    except UnicodeDecodeError:
+        return Response(
+            {'error': 'CSV roster must be UTF-8 encoded'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    rows = roster.parse_roster(content) if content else []
+    if not rows:
+        return Response(
+            {'error': 'CSV roster required (columns: email, username, password)'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if len(rows) > settings.ROSTER_MAX_ROWS:
+        return Response(
+            {'error': f'At most {settings.ROSTER_MAX_ROWS} students per import'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    if len(rows) > settings.ROSTER_SYNC_MAX_ROWS:
+        # Hashing this many passwords would hold the worker's event loop
+        from veritas_radix.celery import app
+        job = app.send_task(
+            'apps.authentication.tasks.import_turma_roster',
+            args=[turma.id, rows, request.user.institution]
+        )
+        return Response({'job_id': job.id, 'status': 'pending'}, status=status.HTTP_202_ACCEPTED)
+    
+    results = roster.import_roster(rows, turma=turma, institution=request.user.institution)
+    return Response(_roster_summary(results), status=status.HTTP_201_CREATED)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def turma_roster_import_status(request, turma_id, job_id):
+    """Outcome of a roster import handed to Celery by ``import_turma_roster``."""
+    turma = Turma.objects.filter(id=turma_id, professor=request.user).first()
+    if turma is None:
+        return Response(
+            {'error': 'Class not found'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    from veritas_radix.celery import app
+    job = app.AsyncResult(job_id)
+    if not job.ready():
+        return Response({'job_id': job_id, 'status': 'pending'}, status=status.HTTP_202_ACCEPTED)
+    if job.failed():
+        return Response(
+            {'job_id': job_id, 'status': 'failed', 'error': 'Roster import failed'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+    outcome = job.result
+    if outcome['turma_id'] != turma.id:
+        return Response(
+            {'error': 'Import not found'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    return Response({'job_id': job_id, 'status': 'done', **_roster_summary(outcome['results'])})
@@ -0,0 +1,31 @@
+"""
+Mine stored etymology analyses into the quiz question bank.
+"""
+import time
+from django.core.management.base import BaseCommand
+from django.db.models.functions import Random
+from apps.challenges.models import QuizQuestion
+from apps.challenges.question_bank import rebuild_question_bank
+
+
+class Command(BaseCommand):
+    help = 'Generate multiple-choice and matching quiz questions from etymology analyses'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, help='Random seed for reproducible distractors')
+        parser.add_argument(
+            '--reshuffle',
+            action='store_true',
+            help='Reassign random sampling keys so quizzes draw new question neighbourhoods'
+        )
+
+    def handle(self, *args, **options):
+        start_time = time.time()
+        generated = rebuild_question_bank(seed=options['seed'])
+        if options['reshuffle']:
+            QuizQuestion.objects.update(random_key=Random())
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {generated} questions ({QuizQuestion.objects.count()} in bank) "
+            f"in {time.time() - start_time:.1f}s"
+        ))
@@ -1,7 +1,11 @@
+import math
+import random
 from django.db import models
 from apps.core.models import BaseModel
 from apps.authentication.models import User
 
+QUIZ_SAMPLE_PROBES = 5  # random starting points merged into one quiz
+
 
 class Challenge(BaseModel):
     """Etymology challenges for gamification."""
@@ -36,4 +40,85 @@ class UserChallenge(BaseModel):
     completed_at = models.DateTimeField(null=True, blank=True)
     
     class Meta:
-        unique_together = ['user', 'challenge']
\ No newline at end of file
+        unique_together = ['user', 'challenge']
+
+
+class QuizQuestionQuerySet(models.QuerySet):
+    def sample(self, count):
+        """
+        Draw ``count`` random questions without ORDER BY RANDOM().
+        
+        Reads short runs of the indexed ``random_key`` from
+        ``QUIZ_SAMPLE_PROBES`` random points and merges them, so a quiz is
+        not one block of neighbouring questions. Overlapping runs are
+        topped up with up to as many extra probes.
+        """
+        run_length = math.ceil(count / QUIZ_SAMPLE_PROBES)
+        questions = {}
+        for _ in range(2 * QUIZ_SAMPLE_PROBES):
+            if len(questions) >= count:
+                break
+            for question in self._run(random.random(), min(run_length, count - len(questions))):
+                questions.setdefault(question.pk, question)
+        questions = list(questions.values())
+        random.shuffle(questions)
+        return questions
+    
+    def _run(self, pivot, length):
+        """``length`` questions from ``pivot`` forward, wrapping around to the start."""
+        questions = list(self.filter(random_key__gte=pivot).order_by('random_key')[:length])
+        if len(questions) < length:
+            questions += list(
+                self.filter(random_key__lt=pivot).order_by('random_key')[:length - len(questions)]
+            )
+        return questions
+
+
+class QuizQuestion(BaseModel):
+    """Precomputed quiz question mined from stored etymology analyses."""
+    question_type = models.CharField(
+        max_length=20,
+        choices=[('multiple_choice', 'Multiple Choice'), ('matching', 'Matching')]
+    )
+    element = models.CharField(
+        max_length=20,
+        choices=[
+            ('root', 'Root'),
+            ('prefix', 'Prefix'),
+            ('suffix', 'Suffix'),
+            ('origin', 'Origin'),
+        ]
+    )
+    difficulty = models.CharField(
+        max_length=20,
+        choices=[('easy', 'Easy'), ('medium', 'Medium'), ('hard', 'Hard')]
+    )
+    prompt = models.TextField()
+    # multiple_choice: {"options": [...], "answer": "..."}
+    # matching: {"left": [...], "right": [...], "answer": {left: right}}
+    payload = models.JSONField(default=dict)
+    word = models.CharField(max_length=200, blank=True)
+    fingerprint = models.CharField(max_length=64, unique=True)
+    random_key = models.FloatField(default=random.random)
+    is_active = models.BooleanField(default=True)
+    
+    objects = QuizQuestionQuerySet.as_manager()
+    
+    def __str__(self):
+        return self.prompt
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['is_active', 'random_key']),
+            models.Index(fields=['is_active', 'difficulty', 'random_key']),
+        ]
+
+
+class QuizAnswer(BaseModel):
+    """A user's first answer to a quiz question; only this one counts."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    question = models.ForeignKey(QuizQuestion, on_delete=models.CASCADE)
+    correct = models.BooleanField(default=False)
+    
+    class Meta:
+        unique_together = ['user', 'question']
@@ -0,0 +1,143 @@
+"""
+Offline generation of quiz questions from stored etymology analyses.
+
+Analyses are mined once into QuizQuestion rows, so serving a quiz never
+needs an LLM call.
+"""
+import random
+import hashlib
+from apps.etymology.models import EtymologyAnalysis
+from .models import QuizQuestion
+
+OPTION_COUNT = 4
+MATCHING_SIZE = 4
+MIN_CONFIDENCE = 0.6
+
+FALLBACK_LANGUAGES = ['Latim', 'Grego Antigo', 'Árabe', 'Francês', 'Germânico', 'Tupi']
+
+ELEMENT_TEMPLATES = {
+    'root': ('root', 'root_meaning', 'Qual é o significado da raiz "{part}" em "{word}"?', 'medium'),
+    'prefix': ('prefix', 'prefix_meaning', 'Qual é o significado do prefixo "{part}" em "{word}"?', 'easy'),
+    'suffix': ('suffix', 'suffix_meaning', 'Qual é o significado do sufixo "{part}" em "{word}"?', 'medium'),
+}
+
+
+def _fingerprint(*parts):
+    return hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest()
+
+
+def _options(answer, pool, rng):
+    """Answer plus distinct distractors from the pool, shuffled; None if too few."""
+    distractors = [value for value in pool if value.lower() != answer.lower()]
+    if len(distractors) < OPTION_COUNT - 1:
+        return None
+    options = rng.sample(distractors, OPTION_COUNT - 1) + [answer]
+    rng.shuffle(options)
+    return options
+
+
+def _load_analyses():
+    fields = [
+        'word', 'original_language', 'prefix', 'prefix_meaning',
+        'root', 'root_meaning', 'suffix', 'suffix_meaning',
+    ]
+    rows = (
+        EtymologyAnalysis.objects
+        .filter(status__in=['completed', 'cached'], confidence_score__gte=MIN_CONFIDENCE)
+        .order_by('word', '-confidence_score')
+        .values(*fields)
+    )
+    # One analysis per word: the most confident one
+    analyses = {}
+    for row in rows.iterator(chunk_size=2000):
+        analyses.setdefault(row['word'].lower(), row)
+    return list(analyses.values())
+
+
+def generate_questions(seed=None):
+    """
+    Build QuizQuestion instances (unsaved) from the stored analyses.
+    """
+    rng = random.Random(seed)
+    analyses = _load_analyses()
+
+    pools = {
+        element: sorted({a[meaning_field] for a in analyses if a[part_field] and a[meaning_field]})
+        for element, (part_field, meaning_field, _, _) in ELEMENT_TEMPLATES.items()
+    }
+    languages = sorted({a['original_language'] for a in analyses if a['original_language']})
+    languages = sorted(set(languages) | set(FALLBACK_LANGUAGES))
+
+    questions = []
+    for analysis in analyses:
+        word = analysis['word']
+
+        for element, (part_field, meaning_field, template, difficulty) in ELEMENT_TEMPLATES.items():
+            part, meaning = analysis[part_field], analysis[meaning_field]
+            if not part or not meaning:
+                continue
+            options = _options(meaning, pools[element], rng)
+            if options:
+                questions.append(QuizQuestion(
+                    question_type='multiple_choice',
+                    element=element,
+                    difficulty=difficulty,
+                    prompt=template.format(part=part, word=word),
+                    payload={'options': options, 'answer': meaning},
+                    word=word,
+                    fingerprint=_fingerprint('mc', element, word, part, meaning),
+                ))
+
+        language = analysis['original_language']
+        if language:
+            options = _options(language, languages, rng)
+            if options:
+                questions.append(QuizQuestion(
+                    question_type='multiple_choice',
+                    element='origin',
+                    difficulty='easy',
+                    prompt=f'De qual língua vem a palavra "{word}"?',
+                    payload={'options': options, 'answer': language},
+                    word=word,
+                    fingerprint=_fingerprint('mc', 'origin', word, language),
+                ))
+
+    questions.extend(_matching_questions(analyses, rng))
+    return questions
+
+
+def _matching_questions(analyses, rng):
+    """Group words with distinct root meanings into hard matching questions."""
+    candidates = [a for a in analyses if a['root'] and a['root_meaning']]
+    rng.shuffle(candidates)
+
+    questions = []
+    group = {}
+    for analysis in candidates:
+        if analysis['root_meaning'] in group.values():
+            continue
+        group[analysis['word']] = analysis['root_meaning']
+        if len(group) == MATCHING_SIZE:
+            right = list(group.values())
+            rng.shuffle(right)
+            questions.append(QuizQuestion(
+                question_type='matching',
+                element='root',
+                difficulty='hard',
+                prompt='Associe cada palavra ao significado da sua raiz.',
+                payload={'left': list(group), 'right': right, 'answer': group},
+                fingerprint=_fingerprint('match', *sorted(group)),
+            ))
+            group = {}
+    return questions
+
+
+def rebuild_question_bank(seed=None, batch_size=1000):
+    """
+    Insert newly mined questions and return how many were generated.
+
+    Existing questions (same fingerprint) are kept untouched.
+    """
+    questions = generate_questions(seed)
+    QuizQuestion.objects.bulk_create(questions, batch_size=batch_size, ignore_conflicts=True)
+    return len(questions)
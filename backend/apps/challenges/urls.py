@@ -0,0 +1,7 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('quiz/', views.quiz_view, name='quiz'),
+    path('quiz/answer/', views.quiz_answer_view, name='quiz-answer'),
+]
\ No newline at end of file
@@ -0,0 +1,85 @@
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from apps.analytics.events import record_activity
+from apps.core.db_router import replica_reads
+from .models import QuizAnswer, QuizQuestion
+
+MAX_QUIZ_SIZE = 50
+
+
+def _public_payload(question):
+    """Question payload without the answer."""
+    return {key: value for key, value in question.payload.items() if key != 'answer'}
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@replica_reads
+def quiz_view(request):
+    """Draw a random quiz from the precomputed question bank."""
+    try:
+        count = max(1, min(int(request.query_params.get('count', 10)), MAX_QUIZ_SIZE))
+    except ValueError:
+        return Response({'error': 'count must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    questions = QuizQuestion.objects.filter(is_active=True)
+    difficulty = request.query_params.get('difficulty')
+    if difficulty:
+        difficulties = [value for value, _ in QuizQuestion._meta.get_field('difficulty').choices]
+        if difficulty not in difficulties:
+            return Response(
+                {'error': f"difficulty must be one of: {', '.join(difficulties)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        questions = questions.filter(difficulty=difficulty)
+    
+    return Response({
+        'questions': [
+            {
+                'id': question.id,
+                'type': question.question_type,
+                'element': question.element,
+                'difficulty': question.difficulty,
+                'prompt': question.prompt,
+                **_public_payload(question)
+            }
+            for question in questions.sample(count)
+        ]
+    })
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def quiz_answer_view(request):
+    """
+    Check an answer to a quiz question. Only the first answer to each
+    question is recorded, so repeating one cannot farm quiz achievements.
+    """
+    try:
+        question_id = int(request.data.get('question_id'))
+    except (TypeError, ValueError):
+        return Response({'error': 'question_id must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    question = QuizQuestion.objects.filter(id=question_id).first()
+    if question is None:
+        return Response({'error': 'Question not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    correct_answer = question.payload['answer']
+    correct = request.data.get('answer') == correct_answer
+    _, first_answer = QuizAnswer.objects.get_or_create(
+        user=request.user,
+        question=question,
+        defaults={'correct': correct}
+    )
+    if first_answer:
+        record_activity(request.user, 'quiz_answered', {
+            'question_id': question.id,
+            'word': question.word,
+            'correct': correct
+        })
+    return Response({
+        'correct': correct,
+        'correct_answer': correct_answer
+    })
\ No newline at end of file
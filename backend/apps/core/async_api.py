@@ -0,0 +1,99 @@
+"""
+Minimal async JSON views.
+
+DRF's ``api_view`` runs synchronously, which would pin an ASGI worker
+thread for the whole of a slow provider call. ``async_api_view`` gives
+native coroutine views the parts of DRF the API relies on: method checks,
+a parsed JSON ``request.data``, JWT authentication with the same
+authenticator and error format, and the default throttles plus an
+optional scoped one (``DEFAULT_THROTTLE_RATES``).
+"""
+import math
+import orjson
+import functools
+from asgiref.sync import sync_to_async
+from rest_framework.exceptions import AuthenticationFailed, Throttled
+from rest_framework.settings import api_settings
+from rest_framework.throttling import ScopedRateThrottle
+from apps.authentication.authentication import CachedJWTAuthentication
+from apps.core.renderers import JsonResponse
+
+
+def _authenticate(request):
+    authenticator = CachedJWTAuthentication()
+    result = authenticator.authenticate(request)
+    return result[0] if result else None
+
+
+def _throttle_wait(request, view):
+    """
+    Run the throttles like DRF's ``check_throttles``: False when the request
+    may go on, otherwise the seconds to wait (None when unknown).
+    """
+    throttles = [throttle_class() for throttle_class in api_settings.DEFAULT_THROTTLE_CLASSES]
+    if getattr(view, 'throttle_scope', None):
+        throttles.append(ScopedRateThrottle())
+    durations = [throttle.wait() for throttle in throttles if not throttle.allow_request(request, view)]
+    if not durations:
+        return False
+    durations = [duration for duration in durations if duration is not None]
+    return max(durations, default=None)
+
+
+def async_api_view(methods, authenticated=True, throttle_scope=None):
+    """
+    Decorate an ``async def view(request, ...)`` returning a dict or response.
+    ``throttle_scope`` adds a ``ScopedRateThrottle`` rate on top of the defaults.
+    """
+    methods = [method.upper() for method in methods]
+
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                return JsonResponse(
+                    {'detail': f'Method "{request.method}" not allowed.'},
+                    status=405,
+                    headers={'Allow': ', '.join(methods)}
+                )
+
+            if request.method == 'GET':
+                request.data = request.GET
+            else:
+                try:
+                    request.data = orjson.loads(request.body or b'{}')
+                except ValueError:
+                    return JsonResponse({'detail': 'JSON parse error'}, status=400)
+                if not isinstance(request.data, dict):
+                    return JsonResponse({'detail': 'Expected a JSON object'}, status=400)
+
+            try:
+                user = await sync_to_async(_authenticate)(request)
+            except AuthenticationFailed as e:
+                return JsonResponse(
+                    {'detail': e.detail},
+                    status=401,
+                    headers={'WWW-Authenticate': 'Bearer realm="api"'}
+                )
+            if user is not None:
+                request.user = user
+            if authenticated and (user is None or not user.is_active):
+                return JsonResponse(
+                    {'detail': 'Authentication credentials were not provided.'},
+                    status=401,
+                    headers={'WWW-Authenticate': 'Bearer realm="api"'}
+                )
+
+            wait = await sync_to_async(_throttle_wait)(request, wrapper)
+            if wait is not False:
+                headers = {'Retry-After': str(math.ceil(wait))} if wait is not None else {}
+                return JsonResponse({'detail': Throttled(wait).detail}, status=429, headers=headers)
+
+            return await view(request, *args, **kwargs)
+
+        wrapper.throttle_scope = throttle_scope
+        # Token-authenticated like the DRF views; django's csrf_exempt would
+        # wrap the coroutine in a sync function on Django 4.2
+        wrapper.csrf_exempt = True
+        return wrapper
+    return decorator
@@ -0,0 +1,344 @@
+"""
+Cache backends that count hits and misses per key namespace.
+
+Each is the stock backend with ``get`` reporting to ``apps.core.metrics``
+and every round trip timed into the request profile
+(``apps.core.profiling``). The async ``aget``/``aset``/... of these
+backends delegate to the sync methods, so they are covered too.
+
+``TieredCache`` puts a bounded per-process LRU in front of a shared
+Redis cache, so hot keys are read without a network round trip; writes
+are broadcast over Redis pub/sub to evict the key in every other process.
+"""
+import os
+import json
+import time
+import uuid
+import pickle
+import logging
+import threading
+from collections import OrderedDict
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+from django.core.cache.backends.base import BaseCache, DEFAULT_TIMEOUT
+from django.core.cache.backends.dummy import DummyCache as BaseDummyCache
+from django.core.cache.backends.locmem import LocMemCache as BaseLocMemCache
+from apps.core import profiling
+from apps.core.metrics import observe_cache, observe_cache_tier
+
+try:
+    from django_redis.cache import RedisCache as BaseRedisCache
+except ImportError:  # only needed with REDIS_URL
+    BaseRedisCache = None
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+ROUND_TRIPS = [
+    'add', 'set', 'set_many', 'touch', 'delete', 'delete_many',
+    'has_key', 'incr', 'decr', 'get_many', 'clear',
+]
+
+
+class CacheMetricsMixin:
+    def get(self, key, default=None, version=None, **kwargs):
+        with profiling.span('cache'):
+            value = super().get(key, _MISSING, version=version, **kwargs)
+        observe_cache(key, value is not _MISSING)
+        return default if value is _MISSING else value
+
+
+def _round_trip(name):
+    def method(self, *args, **kwargs):
+        with profiling.span('cache'):
+            return getattr(super(CacheMetricsMixin, self), name)(*args, **kwargs)
+    method.__name__ = name
+    return method
+
+
+for _name in ROUND_TRIPS:
+    setattr(CacheMetricsMixin, _name, _round_trip(_name))
+
+
+class DummyCache(CacheMetricsMixin, BaseDummyCache):
+    pass
+
+
+class LocMemCache(CacheMetricsMixin, BaseLocMemCache):
+    pass
+
+
+if BaseRedisCache is not None:
+    class RedisCache(CacheMetricsMixin, BaseRedisCache):
+        def get_many(self, keys, version=None, **kwargs):
+            # One MGET rather than BaseCache's get per key, so count here
+            keys = list(keys)
+            with profiling.span('cache'):
+                found = super().get_many(keys, version=version, **kwargs)
+            for key in keys:
+                observe_cache(key, key in found)
+            return found
+
+
+class _LocalTier:
+    """
+    Process-wide LRU of pickled values with an expiry per entry, kept in
+    step with other processes by a thread subscribed to ``channel``.
+
+    Invalidations missed while the subscription is down cannot be
+    replayed, so the tier is emptied on every (re)subscribe and not used
+    until then (``ready``).
+    """
+    RETRY_SECONDS = 5
+
+    def __init__(self, client, channel, max_entries):
+        self.client = client
+        self.channel = channel
+        self.max_entries = max_entries
+        self.origin = uuid.uuid4().hex
+        self.entries = OrderedDict()  # key -> (expires_at, pickled value)
+        # Bumped by every eviction; a fill that raced one is dropped
+        self.generation = 0
+        self.lock = threading.Lock()
+        self.subscribed = threading.Event()
+        threading.Thread(target=self._listen, name='cache-invalidation', daemon=True).start()
+
+    @property
+    def ready(self):
+        return self.subscribed.is_set()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return _MISSING
+            if entry[0] <= time.monotonic():
+                del self.entries[key]
+                return _MISSING
+            self.entries.move_to_end(key)
+        # Unpickled per read, like LocMemCache: callers may mutate what they get
+        return pickle.loads(entry[1])
+
+    def fill(self, key, value, timeout, generation):
+        """Store a value read from the shared tier, unless evictions happened since ``generation``."""
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self.lock:
+            if generation != self.generation:
+                return
+            self.entries[key] = (time.monotonic() + timeout, pickled)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def evict(self, keys=None):
+        """Drop ``keys`` (every key when None) from this process."""
+        with self.lock:
+            self.generation += 1
+            if keys is None:
+                self.entries.clear()
+            else:
+                for key in keys:
+                    self.entries.pop(key, None)
+
+    def publish(self, keys=None):
+        """Evict ``keys`` here and in every other process."""
+        self.evict(keys)
+        self.client.publish(self.channel, json.dumps([self.origin, keys]))
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                self.evict()
+                self.subscribed.set()
+                for message in pubsub.listen():
+                    origin, keys = json.loads(message['data'])
+                    if origin != self.origin:
+                        self.evict(keys)
+            except Exception as e:
+                logger.warning(f"Cache invalidation channel lost, local cache tier off: {e}")
+            finally:
+                self.subscribed.clear()
+            time.sleep(self.RETRY_SECONDS)
+
+
+_local_tiers = {}
+_local_tiers_lock = threading.Lock()
+
+
+def _local_tier(cache):
+    """The ``_LocalTier`` of this process for ``cache``, started on first use (after fork)."""
+    key = (os.getpid(), cache.shared_alias)
+    tier = _local_tiers.get(key)
+    if tier is None:
+        with _local_tiers_lock:
+            tier = _local_tiers.get(key)
+            if tier is None:
+                tier = _local_tiers[key] = _LocalTier(
+                    cache.client.get_client(write=True), cache.channel, cache.local_max_entries
+                )
+    return tier
+
+
+class TieredCache(BaseCache):
+    """
+    A per-process LRU in front of a shared django_redis cache.
+
+    ``LOCATION`` is the alias of the shared cache in ``CACHES``. Options:
+
+    - ``LOCAL_MAX_ENTRIES``: entries kept per process (default 2048).
+    - ``LOCAL_TIMEOUT``: seconds an entry lives locally (default 60). This
+      bounds staleness when an invalidation is delayed or lost, and keys
+      expiring in Redis.
+    - ``LOCAL_EXCLUDE``: key prefixes that always go to Redis, for counters
+      and locks that must be read fresh across processes.
+    - ``CHANNEL``: the pub/sub channel for invalidations.
+
+    Reads hit the local tier and fall back to Redis, filling the local
+    tier on the way back. Writes go to Redis and then evict the key
+    everywhere; the next read refills it.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.shared_alias = location
+        self.local_max_entries = options.get('LOCAL_MAX_ENTRIES', 2048)
+        self.local_timeout = options.get('LOCAL_TIMEOUT', 60)
+        self.local_exclude = tuple(options.get('LOCAL_EXCLUDE', ()))
+        self.channel = options.get('CHANNEL', 'cache:invalidate')
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias]
+
+    @property
+    def client(self):
+        # django_redis.get_redis_connection('default') still reaches Redis
+        return self.shared.client
+
+    def _is_local(self, key):
+        return not str(key).startswith(self.local_exclude)
+
+    def _tier(self, key):
+        """The local tier if ``key`` may be read from it now, else None."""
+        if not self._is_local(key):
+            return None
+        tier = _local_tier(self)
+        return tier if tier.ready else None
+
+    def _get_local(self, key, version):
+        tier = self._tier(key)
+        if tier is None:
+            return None, _MISSING, None
+        generation = tier.generation
+        value = tier.get(self.make_key(key, version))
+        observe_cache_tier(key, 'local', value is not _MISSING)
+        if value is not _MISSING:
+            observe_cache(key, True)
+        return tier, value, generation
+
+    def _get_shared(self, key, default, version, tier, generation):
+        with profiling.span('cache'):
+            value = self.shared.get(key, _MISSING, version=version)
+        observe_cache_tier(key, 'shared', value is not _MISSING)
+        observe_cache(key, value is not _MISSING)
+        if value is _MISSING:
+            return default
+        if tier is not None:
+            tier.fill(self.make_key(key, version), value, self.local_timeout, generation)
+        return value
+
+    def get(self, key, default=None, version=None):
+        tier, value, generation = self._get_local(key, version)
+        if value is not _MISSING:
+            return value
+        return self._get_shared(key, default, version, tier, generation)
+
+    async def aget(self, key, default=None, version=None):
+        # Local hits are answered on the event loop, without a thread hop
+        tier, value, generation = self._get_local(key, version)
+        if value is not _MISSING:
+            return value
+        return await sync_to_async(self._get_shared)(key, default, version, tier, generation)
+
+    def get_many(self, keys, version=None):
+        found = {}
+        remote = []
+        fills = {}
+        for key in keys:
+            tier, value, generation = self._get_local(key, version)
+            if value is _MISSING:
+                remote.append(key)
+                fills[key] = (tier, generation)
+            else:
+                found[key] = value
+        if remote:
+            with profiling.span('cache'):
+                fetched = self.shared.get_many(remote, version=version)
+            for key in remote:
+                hit = key in fetched
+                observe_cache_tier(key, 'shared', hit)
+                observe_cache(key, hit)
+                tier, generation = fills[key]
+                if hit and tier is not None:
+                    tier.fill(self.make_key(key, version), fetched[key], self.local_timeout, generation)
+            found.update(fetched)
+        return found
+
+    def has_key(self, key, version=None):
+        return self.get(key, _MISSING, version=version) is not _MISSING
+
+    def _changed(self, keys, version):
+        # Published even while this process's own tier is off: others may be on
+        local_keys = [self.make_key(key, version) for key in keys if self._is_local(key)]
+        if local_keys:
+            _local_tier(self).publish(local_keys)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        with profiling.span('cache'):
+            added = self.shared.add(key, value, timeout, version=version)
+        if added:
+            self._changed([key], version)
+        return added
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        with profiling.span('cache'):
+            self.shared.set(key, value, timeout, version=version)
+        self._changed([key], version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        with profiling.span('cache'):
+            failed = self.shared.set_many(data, timeout, version=version)
+        self._changed(list(data), version)
+        return failed
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        with profiling.span('cache'):
+            return self.shared.touch(key, timeout, version=version)
+
+    def delete(self, key, version=None):
+        with profiling.span('cache'):
+            deleted = self.shared.delete(key, version=version)
+        self._changed([key], version)
+        return deleted
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        with profiling.span('cache'):
+            self.shared.delete_many(keys, version=version)
+        self._changed(keys, version)
+
+    def incr(self, key, delta=1, version=None):
+        # Atomic in Redis; BaseCache.decr calls this with -delta
+        with profiling.span('cache'):
+            value = self.shared.incr(key, delta, version=version)
+        self._changed([key], version)
+        return value
+
+    def clear(self):
+        with profiling.span('cache'):
+            self.shared.clear()
+        _local_tier(self).publish(None)
@@ -0,0 +1,48 @@
+"""
+Content-encoding negotiation and compression for response bodies.
+
+Shared by ``CompressionMiddleware``, which compresses responses on the
+way out, and the response cache (``apps.core.response_cache``), which
+stores bodies already compressed. Brotli is used when the package is
+installed, otherwise only gzip is offered.
+"""
+import gzip
+from django.conf import settings
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+
+def available_encodings():
+    """The encodings this server can produce, preferred first."""
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def negotiate(accept_encoding):
+    """``'br'``, ``'gzip'`` or None from an ``Accept-Encoding`` header."""
+    weights = {}
+    for part in accept_encoding.split(','):
+        coding, _, params = part.strip().partition(';')
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        weights[coding.strip().lower()] = quality
+
+    candidates = [(encoding, weights.get(encoding, weights.get('*', 0.0))) for encoding in available_encodings()]
+    # max() keeps the first of equal weights, so brotli wins ties
+    encoding, quality = max(candidates, key=lambda candidate: candidate[1])
+    return encoding if quality > 0 else None
+
+
+def compress(content, encoding):
+    config = settings.COMPRESSION
+    if encoding == 'br':
+        return brotli.compress(content, quality=config['BROTLI_QUALITY'])
+    if encoding == 'gzip':
+        return gzip.compress(content, compresslevel=config['GZIP_LEVEL'], mtime=0)
+    raise ValueError(f"Unsupported content encoding: {encoding}")
@@ -0,0 +1,195 @@
+"""
+Route read-only ORM work to read replicas.
+
+Reads go to a replica only inside ``use_replica`` (``replica_reads`` for
+views): list, search, leaderboard and dashboard reads that tolerate a
+replica's few seconds of lag. Everything else, every write and every
+read inside a transaction stays on ``default``.
+
+Read-your-writes: once a request writes, its remaining reads go to the
+primary, and ``ReplicaPinningMiddleware`` pins the user to the primary
+for ``REPLICA_ROUTING['STICKY_SECONDS']`` so the next requests see the
+write too. Each process checks its replicas every
+``CHECK_INTERVAL_SECONDS``; one that is down or more than
+``MAX_LAG_SECONDS`` behind is skipped until a later check passes. A
+replica that fails between checks is re-checked at once: when it is down,
+``replica_reads`` takes it out and runs the view again on the primary.
+"""
+import time
+import random
+import logging
+import functools
+import threading
+import contextvars
+from contextlib import contextmanager
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, OperationalError, connections
+from apps.core import metrics
+
+logger = logging.getLogger(__name__)
+
+_active_routing = contextvars.ContextVar('active_db_routing', default=None)
+
+# Seconds since the last replayed transaction, or 0 when the replica has
+# replayed everything it received (an idle primary is not lag)
+POSTGRES_LAG_SQL = """
+    SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END
+"""
+
+
+class RequestRouting:
+    def __init__(self):
+        self.replica = None  # alias reads go to, None for the primary
+        self.wrote = False
+
+
+@contextmanager
+def activate(routing):
+    token = _active_routing.set(routing)
+    try:
+        yield routing
+    finally:
+        _active_routing.reset(token)
+
+
+def sticky_key(user_id):
+    return f"db_sticky:{user_id}"
+
+
+def pin_to_primary(user_id):
+    """Send ``user_id``'s replica reads to the primary for a while, after a write."""
+    cache.set(sticky_key(user_id), 1, settings.REPLICA_ROUTING['STICKY_SECONDS'])
+
+
+class ReplicaHealth:
+    """Per-process replica status, refreshed at most every ``CHECK_INTERVAL_SECONDS``."""
+
+    def __init__(self):
+        self.checked = {}  # alias -> (monotonic time, healthy)
+        self.lock = threading.Lock()
+
+    def healthy(self, alias):
+        checked_at, healthy = self.checked.get(alias, (None, False))
+        if checked_at is not None and time.monotonic() - checked_at < settings.REPLICA_ROUTING['CHECK_INTERVAL_SECONDS']:
+            return healthy
+        # One thread checks; the others keep the last result meanwhile
+        if not self.lock.acquire(blocking=False):
+            return healthy
+        try:
+            now_healthy = self.check(alias)
+            if now_healthy != healthy and checked_at is not None:
+                logger.warning(f"Read replica {alias} is {'back' if now_healthy else 'out of rotation'}")
+            self.checked[alias] = (time.monotonic(), now_healthy)
+            return now_healthy
+        finally:
+            self.lock.release()
+
+    def recheck(self, alias):
+        """Check ``alias`` now, after one of its queries failed; True when it is still healthy."""
+        healthy = self.check(alias)
+        if not healthy:
+            logger.warning(f"Read replica {alias} is out of rotation")
+        self.checked[alias] = (time.monotonic(), healthy)
+        return healthy
+
+    def check(self, alias):
+        connection = connections[alias]
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(POSTGRES_LAG_SQL if connection.vendor == 'postgresql' else 'SELECT 0')
+                lag = float(cursor.fetchone()[0])
+        except DatabaseError as e:
+            logger.warning(f"Read replica {alias} check failed: {e}")
+            return False
+        finally:
+            # Under ASGI this thread's connection would outlive the request
+            # and never be reused
+            connection.close()
+        metrics.DB_REPLICA_LAG.labels(alias).set(lag)
+        return lag <= settings.REPLICA_ROUTING['MAX_LAG_SECONDS']
+
+
+health = ReplicaHealth()
+
+
+def choose_replica(user_id=None):
+    """A healthy replica alias, or None when reads should go to the primary."""
+    replicas = settings.DATABASE_REPLICAS
+    if not replicas or (user_id is not None and cache.get(sticky_key(user_id))):
+        return None
+    healthy = [alias for alias in replicas if health.healthy(alias)]
+    return random.choice(healthy) if healthy else None
+
+
+@contextmanager
+def use_replica(user_id=None):
+    """
+    Route reads in this block to a replica, unless ``user_id`` wrote
+    recently or no replica is healthy; yields the replica alias or None.
+    Sync code only: the health check runs queries.
+    """
+    routing = _active_routing.get()
+    if routing is None:
+        with activate(RequestRouting()):
+            with use_replica(user_id) as replica:
+                yield replica
+        return
+    previous = routing.replica
+    routing.replica = choose_replica(user_id)
+    try:
+        yield routing.replica
+    finally:
+        routing.replica = previous
+
+
+def replica_reads(view):
+    """
+    Serve a (sync) view's GET and HEAD requests from a replica. Goes under
+    ``api_view``/``permission_classes`` so the user is authenticated.
+
+    When a query fails and the replica turns out to be down, the view runs
+    again on the primary (it only reads, so repeating it is safe).
+    """
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return view(request, *args, **kwargs)
+        user_id = request.user.pk if request.user.is_authenticated else None
+        replica = None
+        try:
+            with use_replica(user_id) as replica:
+                return view(request, *args, **kwargs)
+        except OperationalError:
+            # A healthy replica means the primary failed: nothing to retry on
+            if replica is None or health.recheck(replica):
+                raise
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        routing = _active_routing.get()
+        if routing is None or routing.replica is None or routing.wrote:
+            return None
+        if connections['default'].in_atomic_block:
+            # Reads in a transaction must see its writes
+            return None
+        return routing.replica
+
+    def db_for_write(self, model, **hints):
+        routing = _active_routing.get()
+        if routing is not None:
+            routing.wrote = True
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
@@ -0,0 +1,5 @@
+"""
+Offline load testing: fake provider APIs, scenarios and a runner.
+
+See ``manage.py loadtest`` and ``manage.py fake_providers``.
+"""
@@ -0,0 +1,341 @@
+"""
+Fake Gemini, OpenAI and Unsplash APIs for offline load tests.
+
+One threaded HTTP server answers the endpoints the providers call:
+
+- Gemini ``models/<model>:generateContent`` and ``:streamGenerateContent``
+  (server-sent events with ``alt=sse``, a JSON array otherwise)
+- OpenAI ``/v1/chat/completions`` (streamed or not) and
+  ``/v1/images/generations``
+- Unsplash ``/search/photos``
+
+Each response's latency, failure and token count are drawn from a
+per-service profile, so runs exercise hedging, retries and fallbacks
+without spending quota. Point the app at it with ``GEMINI_API_BASE_URL``,
+``OPENAI_BASE_URL`` (``<url>/v1``) and ``UNSPLASH_API_URL``.
+"""
+import re
+import json
+import time
+import random
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+SERVICES = ['gemini', 'openai', 'dalle', 'unsplash']
+
+DEFAULT_PROFILES = {
+    'gemini': {'latency': 'lognormal:1500:0.5', 'error_rate': 0.0, 'tokens': (400, 900)},
+    'openai': {'latency': 'lognormal:900:0.4', 'error_rate': 0.0, 'tokens': (300, 700)},
+    'dalle': {'latency': 'lognormal:6000:0.3', 'error_rate': 0.0, 'tokens': (0, 0)},
+    'unsplash': {'latency': 'lognormal:150:0.3', 'error_rate': 0.0, 'tokens': (0, 0)},
+}
+
+STREAM_CHUNKS = 4
+
+_GEMINI_PATH = re.compile(r'^/v1beta/models/(?P<model>[^/:]+):(?P<method>streamGenerateContent|generateContent)$')
+_PROMPT_WORD = re.compile(r'palavra "([^"]+)"')
+
+
+class Latency:
+    """
+    A latency distribution in milliseconds.
+
+    Specs: ``fixed:800``, ``uniform:200:1500`` or ``lognormal:900:0.5``
+    (median and sigma, the usual shape of provider latency).
+    """
+
+    def __init__(self, spec):
+        kind, *args = spec.split(':')
+        try:
+            args = [float(arg) for arg in args]
+        except ValueError:
+            raise ValueError(f"Invalid latency spec: {spec}")
+        expected = {'fixed': 1, 'uniform': 2, 'lognormal': 2}
+        if kind not in expected or len(args) != expected[kind]:
+            raise ValueError(f"Invalid latency spec: {spec}")
+        self.spec = spec
+        self.kind = kind
+        self.args = args
+
+    def sample(self, rng=random):
+        if self.kind == 'fixed':
+            return self.args[0]
+        if self.kind == 'uniform':
+            return rng.uniform(*self.args)
+        median, sigma = self.args
+        return median * rng.lognormvariate(0, sigma)
+
+
+def parse_profiles(latencies=(), error_rates=(), tokens=()):
+    """
+    Build service profiles from ``service=value`` overrides.
+
+    ``latencies`` take Latency specs, ``error_rates`` a 0-1 fraction and
+    ``tokens`` a ``min:max`` range.
+    """
+    profiles = {service: dict(profile) for service, profile in DEFAULT_PROFILES.items()}
+    for option, values in (('latency', latencies), ('error_rate', error_rates), ('tokens', tokens)):
+        for value in values:
+            service, _, setting = value.partition('=')
+            if service not in profiles or not setting:
+                raise ValueError(f"Expected <service>=<value> with service in {SERVICES}: {value}")
+            if option == 'error_rate':
+                setting = float(setting)
+            elif option == 'tokens':
+                low, _, high = setting.partition(':')
+                setting = (int(low), int(high or low))
+            profiles[service][option] = setting
+
+    for profile in profiles.values():
+        profile['latency'] = Latency(profile['latency']) if isinstance(profile['latency'], str) else profile['latency']
+    return profiles
+
+
+def analysis_text(prompt):
+    """A plausible analysis in the JSON shape the analyze prompt asks for."""
+    match = _PROMPT_WORD.search(prompt)
+    word = match.group(1) if match else 'palavra'
+    root = word[:max(3, len(word) // 2)]
+    return json.dumps({
+        'origem': f'Do latim {root}us, atestado no português desde o século XIII.',
+        'raizes': f'{root}- (raiz latina)',
+        'morfologia': f'{root} + -{word[len(root):] or "o"}',
+        'relacionadas': [f'{root}al', f'{root}ismo', f'{root}izar'],
+        'significado': f'Sentido atual de "{word}", ampliado ao longo do tempo.',
+    }, ensure_ascii=False)
+
+
+def _split(text, parts):
+    size = max(1, -(-len(text) // parts))
+    return [text[index:index + size] for index in range(0, len(text), size)]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'FakeProviders/1.0'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def _dispatch(self, method):
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length) or b'{}') if length else {}
+
+        gemini = _GEMINI_PATH.match(url.path)
+        if method == 'POST' and gemini:
+            route, service = self._gemini, 'gemini'
+        elif method == 'POST' and url.path == '/v1/chat/completions':
+            route, service = self._chat, 'openai'
+        elif method == 'POST' and url.path == '/v1/images/generations':
+            route, service = self._image, 'dalle'
+        elif method == 'GET' and url.path == '/search/photos':
+            route, service = self._photos, 'unsplash'
+        else:
+            self._json(404, {'error': {'message': f'No fake for {method} {url.path}'}})
+            return
+
+        profile = self.server.profiles[service]
+        self.server.count(service)
+        latency = profile['latency'].sample() / 1000
+        try:
+            if random.random() < profile['error_rate']:
+                time.sleep(latency)
+                self.server.count(f'{service}:error')
+                self._json(503, {'error': {
+                    'code': 503,
+                    'message': 'The model is overloaded (injected by the fake server)',
+                    'status': 'UNAVAILABLE',
+                    'type': 'server_error',
+                }})
+                return
+            tokens = random.randint(*profile['tokens'])
+            route(body, query, latency, tokens, gemini)
+        except (BrokenPipeError, ConnectionResetError):
+            # The caller cancelled (e.g. lost a hedge race) and hung up
+            self.server.count(f'{service}:disconnected')
+            self.close_connection = True
+
+    # Routes
+
+    def _gemini(self, body, query, latency, tokens, match):
+        prompt = ''.join(
+            part.get('text', '')
+            for content in body.get('contents', [])
+            for part in content.get('parts', [])
+        )
+        text = analysis_text(prompt)
+
+        def chunk(piece, last):
+            payload = {'candidates': [{
+                'content': {'parts': [{'text': piece}], 'role': 'model'},
+                'index': 0,
+                **({'finishReason': 'STOP'} if last else {}),
+            }]}
+            if last:
+                payload['usageMetadata'] = {
+                    'promptTokenCount': len(prompt) // 4,
+                    'candidatesTokenCount': max(tokens - len(prompt) // 4, 0),
+                    'totalTokenCount': tokens,
+                }
+            return payload
+
+        if match.group('method') == 'generateContent':
+            time.sleep(latency)
+            self._json(200, chunk(text, last=True))
+            return
+
+        pieces = _split(text, STREAM_CHUNKS)
+        sse = query.get('alt', [''])[0] == 'sse'
+        self._start_chunked('text/event-stream' if sse else 'application/json')
+        if not sse:
+            self._write_chunk(b'[')
+        for index, piece in enumerate(pieces):
+            time.sleep(latency / len(pieces))
+            event = json.dumps(chunk(piece, last=index == len(pieces) - 1))
+            if sse:
+                self._write_chunk(f'data: {event}\r\n\r\n'.encode())
+            else:
+                self._write_chunk(((',' if index else '') + event).encode())
+        if not sse:
+            self._write_chunk(b']')
+        self._end_chunked()
+
+    def _chat(self, body, query, latency, tokens, match):
+        prompt = ' '.join(message.get('content', '') for message in body.get('messages', []))
+        text = analysis_text(prompt)
+        model = body.get('model', 'gpt-fake')
+        base = {'id': f'chatcmpl-fake{random.getrandbits(32):x}', 'created': int(time.time()), 'model': model}
+
+        if not body.get('stream'):
+            time.sleep(latency)
+            self._json(200, {
+                **base,
+                'object': 'chat.completion',
+                'choices': [{
+                    'index': 0,
+                    'message': {'role': 'assistant', 'content': text},
+                    'finish_reason': 'stop',
+                }],
+                'usage': {
+                    'prompt_tokens': len(prompt) // 4,
+                    'completion_tokens': max(tokens - len(prompt) // 4, 0),
+                    'total_tokens': tokens,
+                },
+            })
+            return
+
+        pieces = _split(text, STREAM_CHUNKS)
+        self._start_chunked('text/event-stream')
+        for index, piece in enumerate(pieces):
+            time.sleep(latency / len(pieces))
+            event = {
+                **base,
+                'object': 'chat.completion.chunk',
+                'choices': [{'index': 0, 'delta': {'content': piece}, 'finish_reason': None}],
+            }
+            self._write_chunk(f'data: {json.dumps(event)}\n\n'.encode())
+        done = {**base, 'object': 'chat.completion.chunk', 'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]}
+        self._write_chunk(f'data: {json.dumps(done)}\n\ndata: [DONE]\n\n'.encode())
+        self._end_chunked()
+
+    def _image(self, body, query, latency, tokens, match):
+        time.sleep(latency)
+        self._json(200, {
+            'created': int(time.time()),
+            'data': [{
+                'url': f'{self.server.url}/images/fake-{random.getrandbits(32):x}.png',
+                'revised_prompt': body.get('prompt', '')[:200],
+            }],
+        })
+
+    def _photos(self, body, query, latency, tokens, match):
+        time.sleep(latency)
+        photo_id = f'{random.getrandbits(32):x}'
+        self._json(200, {
+            'total': 1,
+            'total_pages': 1,
+            'results': [{
+                'id': photo_id,
+                'description': query.get('query', [''])[0],
+                'urls': {
+                    'regular': f'{self.server.url}/photos/{photo_id}-regular.jpg',
+                    'small': f'{self.server.url}/photos/{photo_id}-small.jpg',
+                },
+                'user': {
+                    'name': 'Fake Photographer',
+                    'username': 'fake',
+                    'links': {'html': f'{self.server.url}/@fake'},
+                },
+            }],
+        })
+
+    # Response helpers
+
+    def _json(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _start_chunked(self, content_type):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+    def _write_chunk(self, data):
+        self.wfile.write(f'{len(data):X}\r\n'.encode() + data + b'\r\n')
+        self.wfile.flush()
+
+    def _end_chunked(self):
+        self.wfile.write(b'0\r\n\r\n')
+        self.wfile.flush()
+
+
+class FakeProviderServer(ThreadingHTTPServer):
+    """
+    The fake APIs on ``host:port`` (port 0 picks a free one).
+
+    ``stats`` counts requests per service, plus ``<service>:error`` for
+    injected failures and ``<service>:disconnected`` for callers that hung up.
+    """
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, host='127.0.0.1', port=0, profiles=None):
+        super().__init__((host, port), _Handler)
+        self.profiles = profiles or parse_profiles()
+        self.stats = Counter()
+        self._stats_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def count(self, key):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def start(self):
+        """Serve from a background thread; returns the base URL."""
+        self._thread = threading.Thread(target=self.serve_forever, name='fake-providers', daemon=True)
+        self._thread.start()
+        return self.url
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
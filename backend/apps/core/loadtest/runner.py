@@ -0,0 +1,126 @@
+"""
+Concurrent scenario runner with latency, throughput and query statistics.
+
+Virtual users loop over weighted scenarios until the duration (or the
+iteration cap) is reached. In-process runs drive the ASGI application
+directly through ``httpx.ASGITransport`` and count the database queries
+each request makes; runs against a ``--target`` URL go over real HTTP and
+report latency only.
+"""
+import time
+import random
+import asyncio
+from collections import Counter, defaultdict
+from contextlib import nullcontext
+from apps.core.queries import count_queries
+from .scenarios import SCENARIOS
+
+def percentile(samples, percent):
+    """Nearest-rank percentile of pre-sorted samples."""
+    if not samples:
+        return 0.0
+    return samples[min(int(len(samples) * percent / 100), len(samples) - 1)]
+
+
+class Stats:
+    """Samples per request name."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.queries = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+
+    def record(self, name, latency_ms, status, queries=None):
+        self.latencies[name].append(latency_ms)
+        self.statuses[name][status] += 1
+        if queries is not None:
+            self.queries[name].append(queries)
+
+    def summary(self, elapsed):
+        """One row per request name plus ``TOTAL``."""
+        rows = []
+        names = sorted(self.latencies)
+        for name in names + ['TOTAL']:
+            if name == 'TOTAL':
+                latencies = sorted(ms for values in self.latencies.values() for ms in values)
+                queries = [count for values in self.queries.values() for count in values]
+                statuses = sum(self.statuses.values(), Counter())
+            else:
+                latencies = sorted(self.latencies[name])
+                queries = self.queries[name]
+                statuses = self.statuses[name]
+            rows.append({
+                'name': name,
+                'requests': len(latencies),
+                # Transport failures are recorded with status 0
+                'errors': sum(count for status, count in statuses.items() if status == 0 or status >= 400),
+                'statuses': {str(status): count for status, count in sorted(statuses.items())},
+                'throughput_rps': len(latencies) / elapsed if elapsed else 0.0,
+                'p50_ms': percentile(latencies, 50),
+                'p95_ms': percentile(latencies, 95),
+                'p99_ms': percentile(latencies, 99),
+                'max_ms': latencies[-1] if latencies else 0.0,
+                'queries_per_request': sum(queries) / len(queries) if queries else None,
+            })
+        return rows
+
+
+class Session:
+    """One virtual user: an authenticated client that records every request."""
+
+    def __init__(self, client, user, token, stats, client_ip, count_queries):
+        self.client = client
+        self.user = user
+        self.stats = stats
+        self.count_queries = count_queries
+        self.headers = {
+            'Authorization': f'Bearer {token}',
+            # Each virtual user looks like its own client to the rate limiter
+            'X-Forwarded-For': client_ip,
+        }
+
+    async def request(self, name, method, path, json=None, authenticated=True):
+        headers = dict(self.headers)
+        if not authenticated:
+            headers.pop('Authorization')
+        start = time.perf_counter()
+        with count_queries() if self.count_queries else nullcontext() as counter:
+            try:
+                response = await self.client.request(method, path, json=json, headers=headers)
+            except Exception:
+                response = None
+        latency_ms = (time.perf_counter() - start) * 1000
+
+        self.stats.record(
+            name,
+            latency_ms,
+            response.status_code if response is not None else 0,
+            counter.count if counter is not None else None
+        )
+        return response
+
+
+async def run(client, users, weights, duration, iterations=None, count_queries=False):
+    """
+    Run one virtual user per ``(user, token)`` until ``duration`` seconds
+    pass or ``iterations`` scenarios have started. Returns ``(stats, elapsed)``.
+    """
+    stats = Stats()
+    names = list(weights)
+    deadline = time.monotonic() + duration
+    started = 0
+
+    async def virtual_user(session):
+        nonlocal started
+        while time.monotonic() < deadline and (iterations is None or started < iterations):
+            started += 1
+            scenario = random.choices(names, [weights[name] for name in names])[0]
+            await SCENARIOS[scenario](session)
+
+    sessions = [
+        Session(client, user, token, stats, f'10.{index // 65536 % 256}.{index // 256 % 256}.{index % 256}', count_queries)
+        for index, (user, token) in enumerate(users)
+    ]
+    start = time.monotonic()
+    await asyncio.gather(*(virtual_user(session) for session in sessions))
+    return stats, time.monotonic() - start
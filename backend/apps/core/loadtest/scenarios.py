@@ -0,0 +1,135 @@
+"""
+Load test scenarios and the data they need.
+
+A scenario is a coroutine taking a ``Session`` (one virtual user) and
+issuing one or more named requests through it.
+"""
+import random
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from apps.authentication.authentication import token_for_user
+from apps.authentication.models import User
+from apps.etymology.models import EtymologyAnalysis, EtymologyBookmark
+
+USER_EMAIL = 'loadtest-{index}@loadtest.invalid'
+USER_PASSWORD = 'loadtest-password'
+BOOKMARKS_PER_USER = 10
+
+# Mix of knowledge-base words and words that go to the (fake) provider
+ANALYZE_WORDS = [
+    'filosofia', 'democracia', 'biblioteca', 'psicologia', 'tecnologia', 'nostalgia',
+    'geografia', 'astronomia', 'telefone', 'fotografia', 'saudade', 'cafuné',
+    'desenrascar', 'xodó', 'muamba', 'quitute', 'cangaço', 'jangada',
+]
+
+
+async def analyze(session):
+    await session.request('analyze', 'POST', '/api/etymology/analyze/', json={
+        'word': random.choice(ANALYZE_WORDS)
+    })
+
+
+async def featured(session):
+    await session.request('featured', 'GET', '/api/etymology/featured/')
+
+
+async def bookmarks(session):
+    await session.request('bookmarks', 'GET', '/api/etymology/bookmarks/')
+
+
+async def login(session):
+    await session.request('login', 'POST', '/api/auth/login/', json={
+        'email': session.user.email,
+        'password': USER_PASSWORD,
+    }, authenticated=False)
+
+
+async def challenges(session):
+    response = await session.request('challenges:quiz', 'GET', '/api/challenges/quiz/?count=5')
+    if response is None or response.status_code != 200:
+        return
+    questions = response.json().get('questions', [])
+    if not questions:
+        return
+    question = random.choice(questions)
+    answer = random.choice(question.get('options') or [None]) if 'options' in question else question.get('left')
+    await session.request('challenges:answer', 'POST', '/api/challenges/quiz/answer/', json={
+        'question_id': question['id'],
+        'answer': answer,
+    })
+
+
+SCENARIOS = {
+    'analyze': analyze,
+    'featured': featured,
+    'bookmarks': bookmarks,
+    'login': login,
+    'challenges': challenges,
+}
+
+# Relative frequency in the default mix (reads dominate, as in production)
+DEFAULT_WEIGHTS = {
+    'analyze': 2,
+    'featured': 3,
+    'bookmarks': 3,
+    'login': 1,
+    'challenges': 3,
+}
+
+
+def prepare_users(count):
+    """
+    Create (or reuse) ``count`` load test users, each with bookmarks.
+
+    Returns ``[(user, access_token), ...]``. The password is hashed once
+    and shared, so setup stays fast at any user count.
+    """
+    emails = [USER_EMAIL.format(index=index) for index in range(count)]
+    password = make_password(USER_PASSWORD)
+    with transaction.atomic():
+        User.objects.bulk_create(
+            [
+                User(email=email, username=email.split('@')[0], password=password)
+                for email in emails
+            ],
+            ignore_conflicts=True
+        )
+        users = list(User.objects.filter(email__in=emails).order_by('email'))
+
+        bookmarked = set(
+            EtymologyBookmark.objects.filter(user__in=users).values_list('user_id', flat=True)
+        )
+        fresh = [user for user in users if user.pk not in bookmarked]
+        EtymologyAnalysis.objects.bulk_create([
+            EtymologyAnalysis(
+                word=word,
+                user=user,
+                status='completed',
+                original_language='Latim',
+                root=word[:4],
+                etymology_explanation=f'Análise de carga para "{word}".',
+                related_words=[f'{word[:4]}al'],
+                confidence_score=0.9,
+            )
+            for user in fresh
+            for word in ANALYZE_WORDS[:BOOKMARKS_PER_USER]
+        ], ignore_conflicts=True)
+        analyses = EtymologyAnalysis.objects.filter(
+            user__in=fresh, word__in=ANALYZE_WORDS[:BOOKMARKS_PER_USER]
+        )
+        EtymologyBookmark.objects.bulk_create(
+            [EtymologyBookmark(user_id=analysis.user_id, analysis=analysis) for analysis in analyses],
+            ignore_conflicts=True
+        )
+
+    return [(user, str(token_for_user(user).access_token)) for user in users]
+
+
+def cleanup_users():
+    """Delete every load test user (their analyses and bookmarks go with them)."""
+    users = User.objects.filter(email__endswith='@loadtest.invalid')
+    count = users.count()
+    # Analyses only lose their user on delete; remove them explicitly
+    EtymologyAnalysis.objects.filter(user__in=users).delete()
+    users.delete()
+    return count
@@ -0,0 +1,139 @@
+"""
+Run the hot-path micro-benchmarks and compare them with the stored baseline.
+
+The pytest-benchmark suite in ``benchmarks/`` runs in a child process
+(with ``benchmarks.settings``); a statistic per benchmark is compared with
+``benchmarks/baseline.json`` and the command fails when any benchmark is
+slower than the allowed regression. Baselines are machine specific:
+refresh them with ``--save-baseline`` on the machine that runs the check.
+"""
+import os
+import sys
+import json
+import tempfile
+import subprocess
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+STATS = ['min', 'median', 'mean']
+
+
+def load_results(path, stat):
+    """
+    ``({benchmark name: seconds}, {benchmark name: bytes})`` from a
+    pytest-benchmark JSON report; sizes come from benchmarks that record
+    ``extra_info['bytes']``.
+    """
+    with open(path) as results_file:
+        report = json.load(results_file)
+    results, sizes = {}, {}
+    for bench in report['benchmarks']:
+        name = bench['fullname'].split('::', 1)[-1]
+        results[name] = bench['stats'][stat]
+        if 'bytes' in bench.get('extra_info', {}):
+            sizes[name] = bench['extra_info']['bytes']
+    return results, sizes
+
+
+class Command(BaseCommand):
+    help = 'Run the micro-benchmarks and fail on regressions against the stored baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--baseline',
+            default=os.path.join(settings.BASE_DIR, 'benchmarks', 'baseline.json'),
+            help='Baseline JSON to compare against (and to write with --save-baseline)'
+        )
+        parser.add_argument('--save-baseline', action='store_true', help='Store this run as the baseline')
+        parser.add_argument('--results', help='Use an existing pytest-benchmark JSON instead of running')
+        parser.add_argument('--select', help='Only run benchmarks matching this pytest -k expression')
+        parser.add_argument(
+            '--stat',
+            choices=STATS,
+            default='min',
+            help='Statistic to compare (min is the least sensitive to machine noise)'
+        )
+        parser.add_argument(
+            '--max-regression',
+            type=float,
+            default=20.0,
+            help='Fail when a benchmark is this many percent slower than the baseline'
+        )
+        parser.add_argument(
+            '--min-delta-us',
+            type=float,
+            default=1.0,
+            help='Ignore regressions smaller than this many microseconds'
+        )
+        parser.add_argument(
+            '--ds',
+            default='benchmarks.settings',
+            help='Settings module for the benchmark run'
+        )
+
+    def handle(self, *args, **options):
+        if options['results']:
+            results, sizes = load_results(options['results'], options['stat'])
+        else:
+            results, sizes = self._run(options)
+        if sizes:
+            self._report_sizes(sizes)
+
+        if options['save_baseline']:
+            with open(options['baseline'], 'w') as baseline_file:
+                json.dump({'stat': options['stat'], 'benchmarks': results}, baseline_file, indent=2, sort_keys=True)
+            self.stdout.write(self.style.SUCCESS(f"Baseline written to {options['baseline']}"))
+            return
+
+        if not os.path.exists(options['baseline']):
+            raise CommandError(f"No baseline at {options['baseline']}; create one with --save-baseline")
+        self._compare(options['baseline'], results, options)
+
+    def _run(self, options):
+        with tempfile.TemporaryDirectory() as tmp:
+            report = os.path.join(tmp, 'benchmark.json')
+            command = [
+                sys.executable, '-m', 'pytest', 'benchmarks', '-q', '-p', 'no:cacheprovider',
+                f'--benchmark-json={report}',
+            ]
+            if options['select']:
+                command += ['-k', options['select']]
+            # manage.py exports the project settings; the suite needs its own
+            env = {**os.environ, 'DJANGO_SETTINGS_MODULE': options['ds']}
+            result = subprocess.run(command, cwd=settings.BASE_DIR, env=env)
+            if result.returncode != 0:
+                raise CommandError(f"Benchmark run failed (exit code {result.returncode})")
+            return load_results(report, options['stat'])
+
+    def _report_sizes(self, sizes):
+        self.stdout.write(f"\n{'benchmark':<48}{'bytes':>12}")
+        for name, size in sorted(sizes.items()):
+            self.stdout.write(f"{name:<48}{size:>12,}")
+
+    def _compare(self, baseline_path, results, options):
+        with open(baseline_path) as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline['stat'] != options['stat']:
+            raise CommandError(f"Baseline holds '{baseline['stat']}', not '{options['stat']}'; pass --stat {baseline['stat']}")
+
+        self.stdout.write(f"\n{'benchmark':<48}{'baseline':>12}{'current':>12}{'change':>9}")
+        regressions = []
+        for name, current in sorted(results.items()):
+            before = baseline['benchmarks'].get(name)
+            if before is None:
+                self.stdout.write(f"{name:<48}{'-':>12}{current * 1e6:>10.1f}us{'new':>9}")
+                continue
+            change = (current - before) / before * 100
+            self.stdout.write(f"{name:<48}{before * 1e6:>10.1f}us{current * 1e6:>10.1f}us{change:>+8.1f}%")
+            if change > options['max_regression'] and (current - before) * 1e6 >= options['min_delta_us']:
+                regressions.append(f"{name}: {before * 1e6:.1f}us -> {current * 1e6:.1f}us ({change:+.1f}%)")
+
+        missing = sorted(set(baseline['benchmarks']) - set(results))
+        if missing and not options['select']:
+            self.stdout.write(self.style.WARNING(f"Not run (in baseline): {', '.join(missing)}"))
+
+        if regressions:
+            raise CommandError("Benchmark regressions:\n  " + "\n  ".join(regressions))
+        self.stdout.write(self.style.SUCCESS(
+            f"No {options['stat']} regressions above {options['max_regression']:.0f}% vs {baseline_path}"
+        ))
@@ -0,0 +1,65 @@
+"""
+Serve the fake Gemini, OpenAI and Unsplash APIs in the foreground.
+
+Used when load testing a separately started server: run this, start
+gunicorn with the printed environment, then ``manage.py loadtest --target``.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from apps.core.loadtest.fakes import FakeProviderServer, parse_profiles
+
+
+def add_profile_arguments(parser):
+    parser.add_argument(
+        '--fake-latency',
+        action='append',
+        default=[],
+        metavar='SERVICE=SPEC',
+        help='Latency per service: fixed:MS, uniform:MIN:MAX or lognormal:MEDIAN:SIGMA'
+    )
+    parser.add_argument(
+        '--fake-error-rate',
+        action='append',
+        default=[],
+        metavar='SERVICE=RATE',
+        help='Fraction of requests answered with a 503'
+    )
+    parser.add_argument(
+        '--fake-tokens',
+        action='append',
+        default=[],
+        metavar='SERVICE=MIN:MAX',
+        help='Token counts reported per response'
+    )
+
+
+def profiles_from_options(options):
+    try:
+        return parse_profiles(
+            options['fake_latency'], options['fake_error_rate'], options['fake_tokens']
+        )
+    except ValueError as e:
+        raise CommandError(str(e))
+
+
+class Command(BaseCommand):
+    help = 'Serve fake Gemini/OpenAI/Unsplash APIs for offline load tests'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        add_profile_arguments(parser)
+
+    def handle(self, *args, **options):
+        server = FakeProviderServer(options['host'], options['port'], profiles_from_options(options))
+        url = server.url
+        self.stdout.write(self.style.SUCCESS(f"Fake providers listening on {url}"))
+        self.stdout.write("Point the app at them with:")
+        self.stdout.write(f"  export GEMINI_API_BASE_URL={url} OPENAI_BASE_URL={url}/v1 UNSPLASH_API_URL={url}")
+        self.stdout.write("  export GEMINI_API_KEY=fake OPENAI_API_KEY=fake UNSPLASH_ACCESS_KEY=fake")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(f"Requests served: {dict(server.stats)}")
@@ -0,0 +1,141 @@
+"""
+Load test the API offline.
+
+By default the ASGI application is driven in-process against fake provider
+APIs started on a free local port, so no quota is spent and database
+queries per request can be counted. With ``--target`` the requests go to a
+running server instead (start it against ``manage.py fake_providers``).
+Reports p50/p95/p99 latency, throughput and queries per request for each
+request type.
+"""
+import json
+import asyncio
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from apps.core.loadtest import runner
+from apps.core.queries import install_query_counter
+from apps.core.loadtest.fakes import FakeProviderServer
+from apps.core.loadtest.scenarios import SCENARIOS, DEFAULT_WEIGHTS, prepare_users, cleanup_users
+from .fake_providers import add_profile_arguments, profiles_from_options
+
+RATE_LIMIT_MIDDLEWARE = 'apps.core.middleware.RateLimitMiddleware'
+
+
+class Command(BaseCommand):
+    help = 'Run load scenarios offline and report latency percentiles, throughput and queries per request'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scenario',
+            action='append',
+            choices=sorted(SCENARIOS),
+            help='Scenario to run (repeatable); defaults to the weighted mix of all'
+        )
+        parser.add_argument('--concurrency', type=int, default=20, help='Virtual users')
+        parser.add_argument('--duration', type=float, default=30, help='Seconds to run')
+        parser.add_argument('--iterations', type=int, help='Stop after this many scenarios')
+        parser.add_argument('--target', help='Base URL of a running server (default: in-process)')
+        parser.add_argument(
+            '--keep-limits',
+            action='store_true',
+            help='Keep the per-IP rate limit and LLM token budget (in-process only)'
+        )
+        parser.add_argument('--output', help='Also write the results as JSON to this file')
+        parser.add_argument('--cleanup', action='store_true', help='Delete the load test users and exit')
+        add_profile_arguments(parser)
+
+    def handle(self, *args, **options):
+        try:
+            import httpx
+        except ImportError:
+            raise CommandError("httpx is required: pip install httpx")
+
+        if options['cleanup']:
+            self.stdout.write(self.style.SUCCESS(f"Deleted {cleanup_users()} load test users"))
+            return
+
+        weights = (
+            {name: 1 for name in options['scenario']} if options['scenario'] else DEFAULT_WEIGHTS
+        )
+        users = prepare_users(options['concurrency'])
+
+        fakes = None
+        if options['target']:
+            client = httpx.AsyncClient(
+                base_url=options['target'],
+                timeout=120,
+                limits=httpx.Limits(max_connections=options['concurrency'] * 2),
+            )
+        else:
+            fakes = FakeProviderServer(profiles=profiles_from_options(options))
+            self._configure_in_process(fakes.start(), options['keep_limits'])
+            from django.core.handlers.asgi import ASGIHandler
+            install_query_counter()
+            client = httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=ASGIHandler()),
+                # An allowed host over https, so production settings do not redirect
+                base_url='https://localhost',
+                timeout=120,
+            )
+
+        where = options['target'] or 'in-process ASGI app'
+        self.stdout.write(
+            f"Running {', '.join(sorted(weights))} against {where} "
+            f"with {options['concurrency']} users for {options['duration']:.0f}s..."
+        )
+        try:
+            stats, elapsed = asyncio.run(self._run(client, users, weights, options))
+        finally:
+            if fakes:
+                fakes.stop()
+
+        rows = stats.summary(elapsed)
+        self._report(rows, elapsed)
+        if fakes:
+            self.stdout.write(f"Fake provider requests: {dict(sorted(fakes.stats.items()))}")
+        if options['output']:
+            with open(options['output'], 'w') as output_file:
+                json.dump({'elapsed_s': elapsed, 'target': where, 'results': rows}, output_file, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+    async def _run(self, client, users, weights, options):
+        async with client:
+            return await runner.run(
+                client,
+                users,
+                weights,
+                options['duration'],
+                options['iterations'],
+                count_queries=not options['target']
+            )
+
+    def _configure_in_process(self, fakes_url, keep_limits):
+        """Point the providers at the fakes (before any client is built)."""
+        settings.GEMINI_API_BASE_URL = fakes_url
+        settings.OPENAI_BASE_URL = f'{fakes_url}/v1'
+        settings.UNSPLASH_API_URL = fakes_url
+        for key in ('GEMINI_API_KEY', 'OPENAI_API_KEY', 'UNSPLASH_ACCESS_KEY'):
+            setattr(settings, key, 'loadtest')
+        if not keep_limits:
+            # Every virtual user shares one process; the fakes cost nothing
+            settings.MIDDLEWARE = [name for name in settings.MIDDLEWARE if name != RATE_LIMIT_MIDDLEWARE]
+            for budget in settings.LLM_TOKEN_BUDGET.values():
+                budget['TOKENS_PER_MINUTE'] = budget['REQUESTS_PER_MINUTE'] = 10 ** 9
+
+    def _report(self, rows, elapsed):
+        self.stdout.write(f"\nCompleted in {elapsed:.1f}s")
+        self.stdout.write(
+            f"{'request':<20}{'count':>8}{'errors':>8}{'req/s':>9}"
+            f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}{'queries':>9}"
+        )
+        for row in rows:
+            queries = row['queries_per_request']
+            self.stdout.write(
+                f"{row['name']:<20}{row['requests']:>8}{row['errors']:>8}{row['throughput_rps']:>9.1f}"
+                f"{row['p50_ms']:>9.0f}{row['p95_ms']:>9.0f}{row['p99_ms']:>9.0f}{row['max_ms']:>9.0f}"
+                f"{'-' if queries is None else f'{queries:.1f}':>9}"
+            )
+        for row in rows[:-1]:
+            unexpected = {status: count for status, count in row['statuses'].items() if not status.startswith('2')}
+            if unexpected:
+                self.stdout.write(self.style.WARNING(f"{row['name']}: non-2xx responses {unexpected}"))
@@ -0,0 +1,111 @@
+"""
+Profile worker startup imports with ``python -X importtime``.
+
+A child interpreter sets Django up and resolves the URLconf (importing
+every view, as a worker does on its first request). Self import times
+are summed per project app and per third-party package, and can be
+compared against a saved baseline to catch startup regressions.
+"""
+import os
+import sys
+import json
+import subprocess
+from collections import defaultdict
+from django.core.management.base import BaseCommand, CommandError
+
+STARTUP_SCRIPT = (
+    'import django; django.setup(); '
+    'from django.urls import get_resolver; get_resolver().url_patterns'
+)
+
+
+def group_for(module):
+    """``apps.etymology.views`` -> ``apps.etymology``; ``openai._client`` -> ``openai``."""
+    parts = module.split('.')
+    if parts[0] == 'apps' and len(parts) > 1:
+        return '.'.join(parts[:2])
+    return parts[0]
+
+
+def parse_importtime(output):
+    """Sum self import time (microseconds) per group from ``-X importtime`` stderr."""
+    totals = defaultdict(int)
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, _, module = line[len('import time:'):].split('|', 2)
+        totals[group_for(module.strip())] += int(self_us)
+    return dict(totals)
+
+
+class Command(BaseCommand):
+    help = 'Measure startup import time per app/package and compare it with a baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=25, help='Groups to list')
+        parser.add_argument('--runs', type=int, default=3, help='Runs to take the minimum of')
+        parser.add_argument('--baseline', help='JSON baseline to compare against')
+        parser.add_argument('--save-baseline', help='Write the measured totals to this JSON file')
+        parser.add_argument(
+            '--max-regression',
+            type=float,
+            default=20.0,
+            help='Fail when a group or the total is this many percent slower than the baseline'
+        )
+        parser.add_argument(
+            '--min-ms',
+            type=float,
+            default=5.0,
+            help='Ignore regressions of groups below this many milliseconds'
+        )
+
+    def handle(self, *args, **options):
+        runs = [self._measure() for _ in range(max(options['runs'], 1))]
+        # The minimum per group filters out disk cache and scheduling noise
+        groups = {group for run in runs for group in run}
+        totals = {group: min(run.get(group, 0) for run in runs) for group in groups}
+        total_us = sum(totals.values())
+
+        self.stdout.write(f"Startup imports: {total_us / 1000:.1f}ms total (min of {len(runs)} runs)")
+        for group, self_us in sorted(totals.items(), key=lambda item: -item[1])[:options['top']]:
+            self.stdout.write(f"  {self_us / 1000:8.1f}ms  {group}")
+
+        if options['save_baseline']:
+            with open(options['save_baseline'], 'w') as baseline_file:
+                json.dump({'total_us': total_us, 'groups': totals}, baseline_file, indent=2, sort_keys=True)
+            self.stdout.write(f"Baseline written to {options['save_baseline']}")
+
+        if options['baseline']:
+            self._compare(options['baseline'], total_us, totals, options['max_regression'], options['min_ms'])
+
+    def _measure(self):
+        env = {**os.environ, 'PYTHONDONTWRITEBYTECODE': '1'}
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', STARTUP_SCRIPT],
+            capture_output=True,
+            text=True,
+            env=env,
+        )
+        if result.returncode != 0:
+            raise CommandError(f"Startup failed:\n{result.stderr[-2000:]}")
+        return parse_importtime(result.stderr)
+
+    def _compare(self, baseline_path, total_us, totals, max_regression, min_ms):
+        with open(baseline_path) as baseline_file:
+            baseline = json.load(baseline_file)
+
+        regressions = []
+        checks = [('TOTAL', baseline['total_us'], total_us)] + [
+            (group, baseline['groups'].get(group, 0), self_us) for group, self_us in totals.items()
+        ]
+        for group, before, after in checks:
+            if after / 1000 < min_ms:
+                continue
+            if before == 0 or (after - before) / before * 100 > max_regression:
+                regressions.append(
+                    f"{group}: {before / 1000:.1f}ms -> {after / 1000:.1f}ms"
+                )
+
+        if regressions:
+            raise CommandError("Startup import regressions:\n  " + "\n  ".join(regressions))
+        self.stdout.write(self.style.SUCCESS(f"No regressions above {max_regression:.0f}% vs {baseline_path}"))
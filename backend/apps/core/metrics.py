@@ -0,0 +1,181 @@
+"""
+Prometheus metrics, served at ``/metrics``.
+
+Gunicorn runs several worker processes, each with its own counters. When
+``PROMETHEUS_MULTIPROC_DIR`` is set (gunicorn.conf.py sets it before the
+application is imported) every process writes its samples to files in that
+directory and a scrape merges them, so any worker can answer ``/metrics``
+with totals for the whole server. Without it (``runserver``, tests) the
+in-process registry is served.
+
+Cache hit ratios are ``cache_requests_total{result="hit"}`` over all
+``cache_requests_total`` for a namespace; with the two-tier cache,
+``cache_tier_requests_total`` splits them into the local LRU and the
+shared Redis tier (which only sees local misses). Celery queue depth is
+read from the broker at scrape time.
+"""
+import os
+import re
+import time
+import logging
+from django.conf import settings
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest, multiprocess
+from prometheus_client.core import GaugeMetricFamily
+from apps.core import profiling
+
+logger = logging.getLogger(__name__)
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds',
+    'Request latency by route pattern, method and status',
+    ['route', 'method', 'status'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+REQUEST_QUERIES = Histogram(
+    'http_request_db_queries',
+    'Database queries per request by route pattern',
+    ['route'],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89),
+)
+PROVIDER_LATENCY = Histogram(
+    'provider_request_duration_seconds',
+    'Latency of completed calls to Gemini, OpenAI, DALL-E and Unsplash',
+    ['provider', 'model', 'outcome'],
+    buckets=(0.1, 0.25, 0.5, 1, 2, 3, 5, 8, 13, 20, 30, 60),
+)
+PROVIDER_ERRORS = Counter('provider_errors_total', 'Failed provider calls', ['provider', 'model'])
+PROVIDER_TOKENS = Counter('provider_tokens_total', 'Tokens used by provider calls', ['provider', 'model'])
+PROVIDER_COST = Counter('provider_cost_usd_total', 'Estimated provider spend in USD', ['provider', 'model'])
+PROMPT_TOKENS = Histogram(
+    'prompt_tokens',
+    'Estimated tokens of rendered prompts by template and version',
+    ['template', 'version'],
+    buckets=(50, 100, 150, 200, 300, 400, 600, 800, 1200, 2000),
+)
+CACHE_REQUESTS = Counter('cache_requests_total', 'Cache lookups by key namespace and result', ['namespace', 'result'])
+CACHE_TIER_REQUESTS = Counter(
+    'cache_tier_requests_total',
+    'Two-tier cache lookups by tier (local LRU or shared Redis), key namespace and result',
+    ['tier', 'namespace', 'result'],
+)
+DB_REPLICA_LAG = Gauge(
+    'db_replica_lag_seconds',
+    'Replication lag of each read replica at its last health check',
+    ['replica'],
+    multiprocess_mode='max',
+)
+
+# Leading letters and underscores of a key: "auth_user:12:0" -> "auth_user",
+# "rate_limit_10.0.0.1" -> "rate_limit"; keeps label values bounded
+_NAMESPACE = re.compile(r'[A-Za-z_]*[A-Za-z]')
+_METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+
+
+def cache_namespace(key):
+    match = _NAMESPACE.match(str(key))
+    return match.group(0) if match else 'other'
+
+
+def observe_cache(key, hit):
+    CACHE_REQUESTS.labels(cache_namespace(key), 'hit' if hit else 'miss').inc()
+
+
+def observe_cache_tier(key, tier, hit):
+    CACHE_TIER_REQUESTS.labels(tier, cache_namespace(key), 'hit' if hit else 'miss').inc()
+
+
+def observe_request(route, method, status, seconds, queries=None):
+    method = method if method in _METHODS else 'other'
+    REQUEST_LATENCY.labels(route, method, str(status)).observe(seconds)
+    if queries is not None:
+        REQUEST_QUERIES.labels(route).observe(queries)
+
+
+def observe_provider_call(provider, model, seconds, error=False, tokens=0, cost=0.0):
+    """Record one finished provider call (cancelled hedge losers are not calls)."""
+    PROVIDER_LATENCY.labels(provider, model, 'error' if error else 'success').observe(seconds)
+    if error:
+        PROVIDER_ERRORS.labels(provider, model).inc()
+    if tokens:
+        PROVIDER_TOKENS.labels(provider, model).inc(tokens)
+    if cost:
+        PROVIDER_COST.labels(provider, model).inc(cost)
+
+
+class provider_call:
+    """
+    Time a provider call in a ``with`` block. Set ``tokens``/``cost`` on
+    it as they become known and ``error`` for failed responses; an
+    exception leaving the block counts as an error.
+    """
+
+    def __init__(self, provider, model=''):
+        self.provider = provider
+        self.model = model
+        self.tokens = 0
+        self.cost = 0.0
+        self.error = False
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.start
+        profiling.add('provider', seconds)
+        # A cancelled task (BaseException) is not a provider failure
+        failed = self.error or (exc_type is not None and issubclass(exc_type, Exception))
+        if exc_type is None or failed:
+            observe_provider_call(
+                self.provider,
+                self.model,
+                seconds,
+                error=failed,
+                tokens=self.tokens,
+                cost=self.cost,
+            )
+        return False
+
+
+class CeleryQueueCollector:
+    """Pending tasks per Celery queue, read from the Redis broker on each scrape."""
+
+    def __init__(self):
+        self._client = None
+
+    def _broker(self):
+        if self._client is None:
+            import redis
+            self._client = redis.Redis.from_url(
+                settings.CELERY_BROKER_URL,
+                socket_timeout=1,
+                socket_connect_timeout=1,
+            )
+        return self._client
+
+    def collect(self):
+        depth = GaugeMetricFamily('celery_queue_depth', 'Tasks waiting in the Celery broker', labels=['queue'])
+        if not settings.CELERY_BROKER_URL.startswith(('redis://', 'rediss://')):
+            return
+        try:
+            broker = self._broker()
+            for queue in settings.CELERY_METRICS_QUEUES:
+                depth.add_metric([queue], broker.llen(queue))
+        except Exception as e:
+            logger.warning(f"Celery queue depth unavailable: {str(e)}")
+            return
+        yield depth
+
+
+_broker_registry = CollectorRegistry()
+_broker_registry.register(CeleryQueueCollector())
+
+
+def render():
+    """The exposition text for every process, plus the broker gauges."""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry) + generate_latest(_broker_registry)
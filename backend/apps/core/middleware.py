@@ -1,15 +1,38 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
 from django.http import JsonResponse
 from django.core.cache import cache
+from django.utils.cache import patch_vary_headers
+from apps.core import compression, db_router, metrics, profiling
+from apps.core.queries import count_queries, install_query_counter
+import os
+import re
 import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
 
 
 class RateLimitMiddleware:
-    """Simple rate limiting middleware."""
+    """
+    Simple rate limiting middleware.
+    
+    Async-capable, so under ASGI the async views are not pushed onto a
+    thread by a sync middleware in the chain.
+    """
+    sync_capable = True
+    async_capable = True
     
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        
         # Get client IP
         client_ip = self.get_client_ip(request)
         
@@ -18,10 +41,7 @@ class RateLimitMiddleware:
         requests = cache.get(cache_key, 0)
         
         if requests >= 100:  # 100 requests per minute
-            return JsonResponse(
-                {'error': 'Rate limit exceeded'}, 
-                status=429
-            )
+            return self.limit_exceeded()
         
         # Increment counter
         cache.set(cache_key, requests + 1, 60)  # 1 minute
@@ -29,10 +49,254 @@ class RateLimitMiddleware:
         response = self.get_response(request)
         return response
     
+    async def __acall__(self, request):
+        cache_key = f"rate_limit_{self.get_client_ip(request)}"
+        requests = await cache.aget(cache_key, 0)
+        
+        if requests >= 100:
+            return self.limit_exceeded()
+        
+        await cache.aset(cache_key, requests + 1, 60)
+        return await self.get_response(request)
+    
+    def limit_exceeded(self):
+        return JsonResponse(
+            {'error': 'Rate limit exceeded'}, 
+            status=429
+        )
+    
     def get_client_ip(self, request):
         x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
         if x_forwarded_for:
             ip = x_forwarded_for.split(',')[0]
         else:
             ip = request.META.get('REMOTE_ADDR')
-        return ip
\ No newline at end of file
+        return ip
+
+
+class MetricsMiddleware:
+    """
+    Record request latency by route pattern, method and status, and the
+    database queries each request makes, for ``/metrics``.
+    
+    Goes first in MIDDLEWARE so the time spent in the rest of the chain
+    (and requests it rejects) is included.
+    """
+    sync_capable = True
+    async_capable = True
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+        install_query_counter()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+    
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        
+        start = time.perf_counter()
+        with count_queries() as queries:
+            response = self.get_response(request)
+        self.observe(request, response, time.perf_counter() - start, queries.count)
+        return response
+    
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        with count_queries() as queries:
+            response = await self.get_response(request)
+        self.observe(request, response, time.perf_counter() - start, queries.count)
+        return response
+    
+    def observe(self, request, response, seconds, queries):
+        # The URL pattern, not the path, keeps label values bounded
+        match = getattr(request, 'resolver_match', None)
+        route = match.route if match is not None else 'unresolved'
+        metrics.observe_request(route, request.method, response.status_code, seconds, queries)
+
+
+class ReplicaPinningMiddleware:
+    """
+    Track the database writes of each request, for the replica router
+    (``apps.core.db_router``): after a write, the user's reads stay on the
+    primary for ``REPLICA_ROUTING['STICKY_SECONDS']``.
+    
+    The user is read when the response comes back, once the view has
+    authenticated the request.
+    """
+    sync_capable = True
+    async_capable = True
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+    
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        
+        with db_router.activate(db_router.RequestRouting()) as routing:
+            response = self.get_response(request)
+        if routing.wrote and settings.DATABASE_REPLICAS:
+            self.pin(request)
+        return response
+    
+    async def __acall__(self, request):
+        with db_router.activate(db_router.RequestRouting()) as routing:
+            response = await self.get_response(request)
+        if routing.wrote and settings.DATABASE_REPLICAS:
+            # A session user is loaded lazily, with a query
+            await sync_to_async(self.pin)(request)
+        return response
+    
+    def pin(self, request):
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            db_router.pin_to_primary(user.pk)
+
+
+class RequestProfilingMiddleware:
+    """
+    Break each request's time down into SQL, cache and provider time.
+    
+    The breakdown goes out as a ``Server-Timing`` header (browser dev
+    tools show it) when ``SERVER_TIMING`` is on, and requests over
+    ``REQUEST_BUDGET`` are logged with their most repeated SQL. Staff
+    sending ``X-Profile: 1`` get the header in any case, and the request's
+    stacks sampled into a folded-stack file in ``PROFILER['DIR']`` for a
+    flame graph; its name comes back in ``X-Profile-File``.
+    """
+    sync_capable = True
+    async_capable = True
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+        install_query_counter()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+    
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        
+        sampler = None
+        if self.profiling_requested(request) and self.profiling_allowed(request):
+            # WSGI: the request runs on this thread only
+            sampler = self.start_sampler(thread_ids={threading.get_ident()})
+        with count_queries() as queries, profiling.activate(profiling.RequestProfile(queries)) as profile:
+            response = self.get_response(request)
+        return self.finish(request, response, profile, sampler)
+    
+    async def __acall__(self, request):
+        sampler = None
+        if self.profiling_requested(request) and await sync_to_async(self.profiling_allowed)(request):
+            sampler = self.start_sampler()
+        with count_queries() as queries, profiling.activate(profiling.RequestProfile(queries)) as profile:
+            response = await self.get_response(request)
+        return self.finish(request, response, profile, sampler)
+    
+    def profiling_requested(self, request):
+        return request.headers.get(settings.PROFILER['HEADER'], '') not in ('', '0')
+    
+    def profiling_allowed(self, request):
+        if settings.DEBUG:
+            return True
+        from rest_framework.exceptions import AuthenticationFailed
+        from apps.core.async_api import _authenticate
+        try:
+            user = _authenticate(request)
+        except AuthenticationFailed:
+            return False
+        return user is not None and user.is_staff
+    
+    def start_sampler(self, thread_ids=None):
+        return profiling.StackSampler(settings.PROFILER['INTERVAL_MS'] / 1000, thread_ids).start()
+    
+    def finish(self, request, response, profile, sampler):
+        elapsed = profile.elapsed()
+        timing = profile.server_timing()
+        if settings.SERVER_TIMING or sampler is not None:
+            response['Server-Timing'] = timing
+        
+        budget = settings.REQUEST_BUDGET
+        # Provider calls have their own latency metrics and budget
+        provider_seconds = profile.spans['provider'][1] if 'provider' in profile.spans else 0.0
+        if (
+            profile.queries.count > budget['MAX_QUERIES']
+            or (elapsed - provider_seconds) * 1000 > budget['MAX_LATENCY_MS']
+        ):
+            repeated = ' | '.join(f"{count}x {sql[:200]}" for count, sql in profile.repeated_sql())
+            logger.warning(
+                f"Request over budget: {request.method} {request.path} -> {response.status_code} "
+                f"({timing}); repeated SQL: {repeated or 'none'}"
+            )
+        
+        if sampler is not None:
+            sampler.stop()
+            slug = re.sub(r'[^A-Za-z0-9]+', '-', request.path).strip('-') or 'root'
+            path = sampler.dump(
+                settings.PROFILER['DIR'],
+                f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{request.method}-{slug}"
+            )
+            response['X-Profile-File'] = os.path.basename(path)
+            logger.info(f"Profiled {request.method} {request.path}: {sampler.samples} samples -> {path}")
+        return response
+
+
+class CompressionMiddleware:
+    """
+    Compress response bodies with brotli or gzip, whichever the client
+    prefers in ``Accept-Encoding`` (brotli on ties).
+    
+    Only text and JSON bodies of at least ``COMPRESSION['MIN_SIZE']`` bytes
+    are compressed: below that the headers outweigh the savings. Streaming
+    responses (exports, static files) are left alone, and so are the
+    ``COMPRESSION['EXCLUDE_PATHS']``, whose bodies carry tokens next to
+    user input (BREACH).
+    """
+    sync_capable = True
+    async_capable = True
+    
+    COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript', 'image/svg+xml')
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+    
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.compress(request, self.get_response(request))
+    
+    async def __acall__(self, request):
+        return self.compress(request, await self.get_response(request))
+    
+    def compress(self, request, response):
+        config = settings.COMPRESSION
+        if (
+            response.streaming
+            or response.has_header('Content-Encoding')
+            or len(response.content) < config['MIN_SIZE']
+            or not response.get('Content-Type', '').startswith(self.COMPRESSIBLE_TYPES)
+            or request.path.startswith(tuple(config['EXCLUDE_PATHS']))
+        ):
+            return response
+        
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = compression.negotiate(request.headers.get('Accept-Encoding', ''))
+        if encoding is None:
+            return response
+        content = compression.compress(response.content, encoding)
+        if len(content) >= len(response.content):
+            return response
+        
+        response.content = content
+        response['Content-Length'] = str(len(content))
+        response['Content-Encoding'] = encoding
+        # The compressed body is not byte-identical to the uncompressed one
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
\ No newline at end of file
@@ -31,4 +31,71 @@ class WordOrigin(TimestampedModel):
         return self.word
     
     class Meta:
-        ordering = ['word']
\ No newline at end of file
+        ordering = ['word']
+
+
+class APIUsage(TimestampedModel):
+    """Log of external API calls for monitoring, billing and hedging stats."""
+    service = models.CharField(max_length=50, db_index=True)
+    endpoint = models.CharField(max_length=100)
+    model_name = models.CharField(max_length=100, blank=True)
+    request_data = models.JSONField(default=dict, blank=True)
+    response_data = models.JSONField(default=dict, blank=True)
+    tokens_used = models.PositiveIntegerField(default=0)
+    cost_usd = models.DecimalField(max_digits=10, decimal_places=6, default=0)
+    response_time_ms = models.PositiveIntegerField(default=0)
+    success = models.BooleanField(default=True)
+    error_message = models.TextField(blank=True)
+    
+    # Hedging: whether this call was raced (a primary that got a hedge, or the
+    # hedge itself), and whether its answer was used
+    hedged = models.BooleanField(default=False)
+    won = models.BooleanField(default=False)
+    cancelled = models.BooleanField(default=False)
+    
+    LATENCY_BUCKETS_MS = [250, 500, 1000, 2000, 4000, 8000, 15000, 30000]
+    
+    def __str__(self):
+        return f"{self.service}/{self.model_name or self.endpoint} ({self.response_time_ms}ms)"
+    
+    @classmethod
+    def latency_histogram(cls, model_name, since=None):
+        """Count calls of a model per latency bucket (upper bound in ms, None = overflow)."""
+        queryset = cls.objects.filter(model_name=model_name, cancelled=False)
+        if since:
+            queryset = queryset.filter(created_at__gte=since)
+        
+        aggregates = {}
+        lower = 0
+        for upper in cls.LATENCY_BUCKETS_MS:
+            aggregates[f'le_{upper}'] = models.Count(
+                'id', filter=models.Q(response_time_ms__gte=lower, response_time_ms__lt=upper)
+            )
+            lower = upper
+        aggregates['overflow'] = models.Count('id', filter=models.Q(response_time_ms__gte=lower))
+        counts = queryset.aggregate(**aggregates)
+        
+        histogram = [(upper, counts[f'le_{upper}']) for upper in cls.LATENCY_BUCKETS_MS]
+        histogram.append((None, counts['overflow']))
+        return histogram
+    
+    @classmethod
+    def win_rates(cls, endpoint, since=None):
+        """Share of raced calls (primary or hedge) each model won, per model name."""
+        queryset = cls.objects.filter(endpoint=endpoint, hedged=True)
+        if since:
+            queryset = queryset.filter(created_at__gte=since)
+        rows = queryset.values('model_name').annotate(
+            calls=models.Count('id'),
+            wins=models.Count('id', filter=models.Q(won=True)),
+        )
+        return {
+            row['model_name']: row['wins'] / row['calls']
+            for row in rows if row['calls']
+        }
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['model_name', 'created_at']),
+        ]
\ No newline at end of file
@@ -0,0 +1,148 @@
+"""
+Per-request profiling: where did the time go?
+
+``RequestProfilingMiddleware`` opens a ``RequestProfile`` for each request.
+SQL is counted and timed by the query counter (``apps.core.queries``);
+cache round trips (``apps.core.cache_backends``) and provider calls
+(``apps.etymology.hedging``, image providers) add timed spans. The
+totals go out as a ``Server-Timing`` header and requests over the
+``REQUEST_BUDGET`` are logged with their most repeated SQL.
+
+``StackSampler`` is the opt-in sampling profiler: it records the stacks
+of running threads every few milliseconds and writes them in the folded
+format read by ``flamegraph.pl``, speedscope and inferno.
+"""
+import os
+import sys
+import time
+import threading
+import contextvars
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+_active_profile = contextvars.ContextVar('active_request_profile', default=None)
+_open_spans = contextvars.ContextVar('open_profile_spans', default=frozenset())
+
+
+class RequestProfile:
+    def __init__(self, queries):
+        self.queries = queries
+        self.start = time.perf_counter()
+        self.spans = defaultdict(lambda: [0, 0.0])  # name -> [calls, seconds]
+
+    def add(self, name, seconds, calls=1):
+        span = self.spans[name]
+        span[0] += calls
+        span[1] += seconds
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def repeated_sql(self, top=3):
+        """The ``top`` statements run more than once, as ``(count, sql)``."""
+        return [(count, sql) for sql, count in self.queries.statements.most_common(top) if count > 1]
+
+    def server_timing(self):
+        """``Server-Timing`` entries, in milliseconds."""
+        entries = [f'db;dur={self.queries.time * 1000:.1f};desc="{self.queries.count} queries"']
+        for name in ('cache', 'provider'):
+            if name in self.spans:
+                calls, seconds = self.spans[name]
+                entries.append(f'{name};dur={seconds * 1000:.1f};desc="{calls} calls"')
+        entries.append(f'total;dur={self.elapsed() * 1000:.1f}')
+        return ', '.join(entries)
+
+
+@contextmanager
+def activate(profile):
+    token = _active_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _active_profile.reset(token)
+
+
+def add(name, seconds, calls=1):
+    """Add time to the current request's ``name`` span, if it is profiled."""
+    profile = _active_profile.get()
+    if profile is not None:
+        profile.add(name, seconds, calls)
+
+
+@contextmanager
+def span(name):
+    """
+    Time a block into the current request's ``name`` span. Nested spans
+    of the same name (``get_many`` calling ``get``) count once.
+    """
+    profile = _active_profile.get()
+    opened = _open_spans.get()
+    if profile is None or name in opened:
+        yield
+        return
+    token = _open_spans.set(opened | {name})
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add(name, time.perf_counter() - start)
+        _open_spans.reset(token)
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{frame.f_globals.get('__name__', '?')}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+class StackSampler:
+    """
+    Sample thread stacks every ``interval`` seconds from a background thread.
+
+    With ``thread_ids`` only those threads are sampled; otherwise every
+    thread is, each under a root frame named after it (under ASGI a
+    request's code runs on the event loop and in executor threads shared
+    with other requests, so their stacks show up too).
+    """
+
+    def __init__(self, interval=0.005, thread_ids=None):
+        self.interval = interval
+        self.thread_ids = thread_ids
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id or (self.thread_ids and thread_id not in self.thread_ids):
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def folded(self):
+        """One ``frame;frame;frame count`` line per distinct stack."""
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def dump(self, directory, name):
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{name}.folded")
+        with open(path, 'w') as stacks_file:
+            stacks_file.write(self.folded())
+        return path
@@ -0,0 +1,66 @@
+"""
+Count and time the database queries made while handling a request.
+
+An execute wrapper on every connection updates the counters active in
+the current context. The counters travel in a context variable, which
+``sync_to_async`` copies into the threads that run sync views, and they
+nest: a load test counting around a request and the metrics middleware
+counting inside it both see every query.
+"""
+import time
+import contextvars
+from collections import Counter
+from contextlib import contextmanager
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+_active_counter = contextvars.ContextVar('active_query_counter', default=None)
+
+
+class QueryCounter:
+    def __init__(self, parent=None):
+        self.count = 0
+        self.time = 0.0
+        # SQL with placeholders, so a query repeated for each row of a list
+        # (an N+1) shows up as one statement with a high count
+        self.statements = Counter()
+        self.parent = parent
+
+
+def _count_query(execute, sql, params, many, context):
+    counter = _active_counter.get()
+    if counter is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - start
+        while counter is not None:
+            counter.count += 1
+            counter.time += elapsed
+            counter.statements[sql] += 1
+            counter = counter.parent
+
+
+def _install_counter(sender, connection, **kwargs):
+    if _count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_query)
+
+
+def install_query_counter():
+    """Wrap every current and future connection, in every thread."""
+    connection_created.connect(_install_counter, dispatch_uid='query_counter')
+    for connection in connections.all():
+        _install_counter(None, connection)
+
+
+@contextmanager
+def count_queries():
+    """Yield a ``QueryCounter`` that tracks each query run in this context."""
+    counter = QueryCounter(_active_counter.get())
+    token = _active_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _active_counter.reset(token)
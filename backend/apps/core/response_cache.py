@@ -0,0 +1,95 @@
+"""
+Response-level cache of encoded, pre-compressed JSON bodies.
+
+A hit for a popular resource skips serializers, JSON encoding and
+compression: the cache holds the final bytes of every representation
+variant of the resource in every content encoding, and the view only
+picks one. Per-user parts of a response are variants (``is_bookmarked``
+true or false), so the shared entry serves every user.
+
+Entries are dropped when their model instance is saved or deleted
+(``invalidate_on_change``); writes that bypass signals (``bulk_create``,
+``QuerySet.update``) must call ``invalidate`` themselves.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from apps.core import compression
+from apps.core.renderers import dumps
+
+
+def cache_key(resource, identifier):
+    # Namespaced per resource in the cache hit/miss metrics
+    return f"{resource}_response:{identifier}"
+
+
+def encode(representations):
+    """
+    ``{variant: data}`` -> ``{variant: {encoding: bytes}}``; bodies below
+    ``COMPRESSION['MIN_SIZE']`` or that do not shrink are kept identity only.
+    """
+    entry = {}
+    for variant, data in representations.items():
+        content = dumps(data)
+        bodies = {'identity': content}
+        if len(content) >= settings.COMPRESSION['MIN_SIZE']:
+            for encoding in compression.available_encodings():
+                compressed = compression.compress(content, encoding)
+                if len(compressed) < len(content):
+                    bodies[encoding] = compressed
+        entry[variant] = bodies
+    return entry
+
+
+def respond(request, bodies):
+    """The ``HttpResponse`` for one cached variant, in the client's encoding."""
+    encoding = compression.negotiate(request.headers.get('Accept-Encoding', ''))
+    content = bodies.get(encoding) if encoding else None
+    response = HttpResponse(content or bodies['identity'], content_type='application/json')
+    if len(bodies) > 1:
+        patch_vary_headers(response, ('Accept-Encoding',))
+    if content is not None:
+        # Already compressed: CompressionMiddleware leaves it alone
+        response['Content-Encoding'] = encoding
+    return response
+
+
+async def aget_or_build(resource, identifier, build):
+    """
+    The cached entry of ``resource`` ``identifier``, built on a miss by
+    ``build()`` (a sync callable returning ``{variant: data}``, or None for
+    a missing resource, which is not cached).
+    """
+    key = cache_key(resource, identifier)
+    entry = await cache.aget(key)
+    if entry is None:
+        representations = await sync_to_async(build)()
+        if representations is None:
+            return None
+        entry = encode(representations)
+        await cache.aset(key, entry, settings.CACHE_TTL['RESPONSE'])
+    return entry
+
+
+def invalidate(resource, identifiers):
+    cache.delete_many([cache_key(resource, identifier) for identifier in identifiers])
+
+
+def invalidate_on_change(model, resource, identifier=lambda instance: instance.pk):
+    """
+    Drop the cached responses of ``model`` instances when they are saved or
+    deleted. The delete runs after commit: a request that rebuilds the
+    entry while the write is uncommitted would otherwise cache the old row
+    for the whole TTL.
+    """
+    def receiver(sender, instance, **kwargs):
+        keys = [identifier(instance)]
+        transaction.on_commit(lambda: invalidate(resource, keys))
+
+    dispatch_uid = f'response_cache:{resource}'
+    post_save.connect(receiver, sender=model, weak=False, dispatch_uid=dispatch_uid)
+    post_delete.connect(receiver, sender=model, weak=False, dispatch_uid=dispatch_uid)
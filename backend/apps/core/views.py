@@ -1,7 +1,11 @@
-from django.http import JsonResponse
+import secrets
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from prometheus_client import CONTENT_TYPE_LATEST
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from apps.core import metrics
 
 
 class HealthCheckView(APIView):
@@ -11,4 +15,18 @@ class HealthCheckView(APIView):
         return Response({
             'status': 'ok',
             'message': 'Veritas Radix API is running'
-        }, status=status.HTTP_200_OK)
\ No newline at end of file
+        }, status=status.HTTP_200_OK)
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint, aggregated over every worker process.
+    Outside DEBUG it is only served with ``METRICS_TOKEN`` set.
+    """
+    if not settings.METRICS_TOKEN and not settings.DEBUG:
+        return HttpResponse('Set METRICS_TOKEN to enable /metrics', status=403, content_type='text/plain')
+    if settings.METRICS_TOKEN:
+        expected = f'Bearer {settings.METRICS_TOKEN}'
+        if not secrets.compare_digest(request.headers.get('Authorization', '').encode(), expected.encode()):
+            return HttpResponse(status=401)
+    return HttpResponse(metrics.render(), content_type=CONTENT_TYPE_LATEST)
\ No newline at end of file
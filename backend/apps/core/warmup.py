@@ -0,0 +1,108 @@
+"""
+Per-process warm-up run before a worker accepts traffic.
+
+Each step opens something the first request would otherwise pay for:
+the database connection, the cache client, the URL resolver, the
+knowledge base pages and the LLM provider clients. Failures are logged
+and never stop the worker from starting.
+
+``warm_analyses`` is the periodic counterpart for data: it pre-analyses
+the week's most searched words at warming priority, so the token budget
+sheds it before any interactive request has to wait.
+"""
+import time
+import logging
+import importlib
+from django.core.cache import cache
+from django.db import connection
+from django.urls import resolve
+
+logger = logging.getLogger(__name__)
+
+
+def _database():
+    connection.ensure_connection()
+
+
+def _cache():
+    cache.get('warmup:ping')
+
+
+def _urls():
+    resolve('/health/')
+
+
+def _knowledge_base():
+    from apps.etymology import knowledge_base
+    knowledge_base.lookup('palavra')
+
+
+def _providers():
+    from apps.etymology.hedging import get_etymology_generator
+    get_etymology_generator()
+
+
+# Heavy SDKs imported lazily by the provider layer; the gunicorn master
+# imports them once so forked workers share the pages
+PRELOAD_MODULES = ['google.generativeai', 'openai', 'requests']
+
+WARMUP_STEPS = [
+    ('database', _database),
+    ('cache', _cache),
+    ('urls', _urls),
+    ('knowledge_base', _knowledge_base),
+    ('providers', _providers),
+]
+
+
+def warm_up():
+    """Run every warm-up step and return ``{step: milliseconds}``."""
+    timings = {}
+    for name, step in WARMUP_STEPS:
+        start_time = time.monotonic()
+        try:
+            step()
+        except Exception as e:
+            logger.warning(f"Warm-up step '{name}' failed: {str(e)}")
+        timings[name] = (time.monotonic() - start_time) * 1000
+    return timings
+
+
+def warm_analyses(limit=20):
+    """
+    Analyse and store this week's most searched words that have neither a
+    knowledge base entry nor a completed analysis yet. Stops at the first
+    call the token budget sheds. Returns the number of analyses stored.
+    """
+    from apps.analytics import word_stats
+    from apps.etymology import knowledge_base
+    from apps.etymology.budget import PRIORITY_WARMING
+    from apps.etymology.models import EtymologyAnalysis
+    from apps.etymology.services import GeminiEtymologyService
+
+    words = [row['word'] for row in word_stats.top_words(word_stats.week_start(), limit)]
+    analyzed = set(
+        EtymologyAnalysis.objects.filter(word__in=words, status='completed').values_list('word', flat=True)
+    )
+    service = GeminiEtymologyService()
+    stored = 0
+    for word in words:
+        if word in analyzed or knowledge_base.lookup(word) is not None:
+            continue
+        result = service.analyze_etymology(word, priority=PRIORITY_WARMING)
+        if 'retry_after' in result:
+            logger.info(f"Analysis warming shed after {stored} words: token budget busy")
+            break
+        if result['success']:
+            service.save_analysis(word, result)
+            stored += 1
+    return stored
+
+
+def preload_modules():
+    """Import PRELOAD_MODULES, skipping any that are not installed."""
+    for module in PRELOAD_MODULES:
+        try:
+            importlib.import_module(module)
+        except ImportError as e:
+            logger.warning(f"Could not preload {module}: {str(e)}")
@@ -3,4 +3,16 @@ from django.apps import AppConfig
 
 class EtymologyConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'apps.etymology'
\ No newline at end of file
+    name = 'apps.etymology'
+
+    def ready(self):
+        # Open the offline knowledge base once per worker process
+        from . import knowledge_base
+        knowledge_base.load()
+
+        # Drop cached detail responses when their rows change
+        from apps.core import response_cache
+        from apps.core.models import WordOrigin
+        from .models import EtymologyAnalysis
+        response_cache.invalidate_on_change(EtymologyAnalysis, 'etymology_analysis')
+        response_cache.invalidate_on_change(WordOrigin, 'word_origin', lambda origin: origin.word)
\ No newline at end of file
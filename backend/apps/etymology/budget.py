@@ -0,0 +1,185 @@
+"""
+Distributed token budget for LLM providers.
+
+Usage is counted in the shared cache in one-minute windows, so every
+gunicorn worker and Celery process draws from the same provider quota.
+"""
+import math
+import time
+import asyncio
+import logging
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from .prompts import count_tokens
+
+logger = logging.getLogger(__name__)
+
+WINDOW_SECONDS = 60
+
+PRIORITY_INTERACTIVE = 'interactive'
+PRIORITY_BATCH = 'batch'
+PRIORITY_WARMING = 'warming'
+
+
+class TokenBudget:
+    """
+    Admission controller for tokens/minute and requests/minute quotas.
+
+    Lower priorities may only use a share of each window, so warming and
+    batch work is shed before interactive requests start queueing. A call
+    that does not fit waits for the next window for up to its priority's
+    ``LLM_PRIORITY_MAX_WAIT``, then is rejected with a ``retry_after``.
+    """
+
+    def __init__(self, provider='gemini'):
+        config = settings.LLM_TOKEN_BUDGET.get(provider, {})
+        self.provider = provider
+        self.tokens_per_minute = config.get('TOKENS_PER_MINUTE', 32000)
+        self.requests_per_minute = config.get('REQUESTS_PER_MINUTE', 60)
+        self.expected_output_tokens = config.get('EXPECTED_OUTPUT_TOKENS', 800)
+
+    def _key(self, name, window=None):
+        if window is None:
+            return f"llm_budget:{self.provider}:{name}"
+        return f"llm_budget:{self.provider}:{name}:{window}"
+
+    def correction_factor(self):
+        """Ratio between observed and raw estimated tokens (EWMA)."""
+        return cache.get(self._key('correction'), 1.0)
+
+    def raw_estimate(self, prompt):
+        """Estimate prompt plus completion tokens before any correction."""
+        return count_tokens(prompt) + self.expected_output_tokens
+
+    def estimate_tokens(self, prompt):
+        """Estimate the token cost of a prompt, corrected by past usage."""
+        return math.ceil(self.raw_estimate(prompt) * self.correction_factor())
+
+    def acquire(self, prompt, priority=PRIORITY_INTERACTIVE):
+        """
+        Reserve budget for a prompt, waiting up to the priority's max wait.
+
+        Returns a ticket dict; ``ticket['admitted']`` tells whether the call
+        may proceed and ``ticket['retry_after']`` when to try again if not.
+        """
+        raw_tokens = self.raw_estimate(prompt)
+        estimated_tokens = math.ceil(raw_tokens * self.correction_factor())
+        deadline = time.monotonic() + settings.LLM_PRIORITY_MAX_WAIT.get(priority, 0)
+        while True:
+            ticket, wait = self._attempt(priority, raw_tokens, estimated_tokens, deadline)
+            if ticket is not None:
+                return ticket
+            time.sleep(wait)
+
+    async def aacquire(self, prompt, priority=PRIORITY_INTERACTIVE):
+        """``acquire`` for async callers: waits on the event loop, not a thread."""
+        raw_tokens = self.raw_estimate(prompt)
+        estimated_tokens = math.ceil(raw_tokens * await sync_to_async(self.correction_factor)())
+        deadline = time.monotonic() + settings.LLM_PRIORITY_MAX_WAIT.get(priority, 0)
+        while True:
+            ticket, wait = await sync_to_async(self._attempt, thread_sensitive=False)(
+                priority, raw_tokens, estimated_tokens, deadline
+            )
+            if ticket is not None:
+                return ticket
+            await asyncio.sleep(wait)
+
+    def _attempt(self, priority, raw_tokens, estimated_tokens, deadline):
+        """
+        One reservation try: ``(ticket, None)`` once admitted or out of time,
+        otherwise ``(None, seconds to wait before the next try)``.
+        """
+        share = settings.LLM_PRIORITY_SHARE.get(priority, 1.0)
+        window = int(time.time() // WINDOW_SECONDS)
+        admitted = self._try_reserve(window, estimated_tokens, share)
+        retry_after = WINDOW_SECONDS - (time.time() % WINDOW_SECONDS)
+
+        # None means the cache backend cannot count (e.g. DummyCache): fail open
+        if admitted is None or admitted:
+            return self._ticket(True, priority, window, raw_tokens, estimated_tokens, 0), None
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            logger.warning(
+                f"LLM budget exhausted for {self.provider}, shedding {priority} request "
+                f"({estimated_tokens} estimated tokens)"
+            )
+            return self._ticket(False, priority, window, raw_tokens, estimated_tokens, retry_after), None
+        return None, min(remaining, retry_after, 1.0)
+
+    def _try_reserve(self, window, tokens, share):
+        """
+        Atomically add the reservation to the window counters.
+
+        Returns True/False for admitted/rejected, or None when the cache
+        backend does not support counters.
+        """
+        tokens_key = self._key('tokens', window)
+        requests_key = self._key('requests', window)
+        timeout = WINDOW_SECONDS * 2
+
+        try:
+            cache.add(tokens_key, 0, timeout)
+            cache.add(requests_key, 0, timeout)
+            used_tokens = cache.incr(tokens_key, tokens)
+            used_requests = cache.incr(requests_key)
+        except ValueError:
+            return None
+
+        if (used_tokens <= self.tokens_per_minute * share
+                and used_requests <= self.requests_per_minute * share):
+            return True
+
+        # Roll back the optimistic reservation
+        cache.decr(tokens_key, tokens)
+        cache.decr(requests_key)
+        return False
+
+    def _ticket(self, admitted, priority, window, raw_tokens, estimated_tokens, retry_after):
+        return {
+            'admitted': admitted,
+            'priority': priority,
+            'window': window,
+            'raw_tokens': raw_tokens,
+            'estimated_tokens': estimated_tokens,
+            'retry_after': math.ceil(retry_after),
+        }
+
+    def record_usage(self, ticket, tokens_used):
+        """
+        Feed the actual ``tokens_used`` back into the budget.
+
+        Adjusts the reserved window by the estimation error and moves the
+        correction factor towards the observed ratio.
+        """
+        if not ticket or not ticket['admitted'] or not tokens_used:
+            return
+
+        delta = tokens_used - ticket['estimated_tokens']
+        try:
+            tokens_key = self._key('tokens', ticket['window'])
+            if delta > 0:
+                cache.incr(tokens_key, delta)
+            elif delta < 0:
+                cache.decr(tokens_key, -delta)
+        except ValueError:
+            pass
+
+        alpha = settings.LLM_TOKEN_ESTIMATE_SMOOTHING
+        observed_ratio = tokens_used / max(ticket['raw_tokens'], 1)
+        factor = (1 - alpha) * self.correction_factor() + alpha * observed_ratio
+        cache.set(self._key('correction'), factor, None)
+
+    def release(self, ticket):
+        """
+        Return the token reservation of a failed call.
+
+        The request itself still counts against requests/minute.
+        """
+        if not ticket or not ticket['admitted']:
+            return
+        try:
+            cache.decr(self._key('tokens', ticket['window']), ticket['estimated_tokens'])
+        except ValueError:
+            pass
@@ -0,0 +1,350 @@
+"""
+Hedged text generation across models and providers.
+
+The primary model is called first. If it has not answered after a
+percentile of its recent latency, a secondary model is fired as well and
+whichever finishes first wins; the loser is cancelled.
+
+Each attempt carries its own budget ticket (the caller's for the primary,
+one acquired here for the hedge), reconciled against that attempt's own
+token usage once the race is over: a cancelled or failed attempt has its
+reservation released.
+
+``generate`` races threads for sync callers; ``agenerate`` races asyncio
+tasks over the providers' non-blocking clients for the async views.
+"""
+import time
+import asyncio
+import logging
+import threading
+from asgiref.sync import sync_to_async
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from django.conf import settings
+from django.core.cache import cache
+from apps.core import metrics, profiling
+from apps.core.models import APIUsage
+from .budget import TokenBudget, PRIORITY_INTERACTIVE
+from .providers import get_provider, GenerationCancelled
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(
+    max_workers=settings.ETYMOLOGY_HEDGING['MAX_WORKERS'],
+    thread_name_prefix='llm-hedge',
+)
+
+
+class LatencyTracker:
+    """
+    Recent latency samples per model, kept in the shared cache.
+    """
+    max_samples = 200
+
+    def _key(self, model_name):
+        return f"llm_latency:{model_name}"
+
+    def record(self, model_name, latency_ms):
+        samples = cache.get(self._key(model_name), [])
+        samples.append(latency_ms)
+        cache.set(self._key(model_name), samples[-self.max_samples:], None)
+
+    def percentile(self, model_name, percentile, min_samples=20):
+        """Return the latency percentile in ms, or None without enough samples."""
+        samples = cache.get(self._key(model_name), [])
+        if len(samples) < min_samples:
+            return None
+        samples = sorted(samples)
+        index = min(int(len(samples) * percentile / 100), len(samples) - 1)
+        return samples[index]
+
+
+class HedgedGenerator:
+    """
+    Race a primary and a secondary provider for the same prompt.
+    """
+
+    def __init__(self, primary, secondary=None):
+        config = settings.ETYMOLOGY_HEDGING
+        self.primary = primary
+        self.secondary = secondary
+        self.percentile = config['PERCENTILE']
+        self.default_delay_ms = config['DEFAULT_DELAY_MS']
+        self.min_delay_ms = config['MIN_DELAY_MS']
+        self.tracker = LatencyTracker()
+
+    def hedge_delay(self):
+        """Seconds to wait for the primary before firing the secondary."""
+        delay_ms = self.tracker.percentile(self.primary.model_name, self.percentile)
+        if delay_ms is None:
+            delay_ms = self.default_delay_ms
+        return max(delay_ms, self.min_delay_ms) / 1000
+
+    def generate(self, prompt, endpoint, request_data=None, ticket=None):
+        """
+        Generate text, hedging with the secondary provider when configured.
+
+        ``ticket`` is the primary's budget reservation; the generator
+        reconciles it, so callers must not record usage or release it. The
+        hedge is admitted at the ticket's priority.
+
+        Returns a dict with ``text``, ``tokens_used`` (of the winner),
+        ``model``, ``hedged`` and ``attempts`` (``model``/``tokens_used``/
+        ``won`` of every attempt); raises the primary's exception if every
+        attempt failed.
+        """
+        request_data = request_data or {}
+        attempts = {}
+        started = time.perf_counter()
+        primary = self._submit(self.primary, prompt, hedged=False, attempts=attempts, ticket=ticket)
+        done, _ = wait([primary], timeout=self.hedge_delay() if self.secondary else None)
+
+        secondary = None
+        if self.secondary and (not done or primary.exception()):
+            hedge_ticket = TokenBudget(self.secondary.service).acquire(prompt, priority=self._priority(ticket))
+            if hedge_ticket['admitted']:
+                secondary = self._submit(
+                    self.secondary, prompt, hedged=True, attempts=attempts, ticket=hedge_ticket
+                )
+                attempts[primary]['hedged'] = True
+            else:
+                logger.info(f"Skipping hedge for {self.secondary.model_name}: budget exhausted")
+
+        pending = {f for f in (primary, secondary) if f is not None}
+        winner = None
+        while pending and winner is None:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    winner = future
+                    break
+        profiling.add('provider', time.perf_counter() - started)
+
+        for future in (primary, secondary):
+            if future is not None and future is not winner:
+                self._cancel(future, attempts)
+        if winner is not None:
+            attempts[winner]['won'] = True
+
+        for attempt in attempts.values():
+            self._record(attempt, endpoint, request_data)
+
+        if winner is None:
+            raise primary.exception()
+
+        return self._result(winner, attempts)
+
+    async def agenerate(self, prompt, endpoint, request_data=None, ticket=None):
+        """Async counterpart of ``generate``; same ticket, result and failure contract."""
+        request_data = request_data or {}
+        attempts = {}
+        started = time.perf_counter()
+        primary = self._submit_task(self.primary, prompt, hedged=False, attempts=attempts, ticket=ticket)
+        secondary = None
+        winner = None
+        try:
+            hedge_delay = await sync_to_async(self.hedge_delay)() if self.secondary else None
+            done, _ = await asyncio.wait([primary], timeout=hedge_delay)
+
+            if self.secondary and (not done or primary.exception()):
+                hedge_ticket = await TokenBudget(self.secondary.service).aacquire(
+                    prompt, priority=self._priority(ticket)
+                )
+                if hedge_ticket['admitted']:
+                    secondary = self._submit_task(
+                        self.secondary, prompt, hedged=True, attempts=attempts, ticket=hedge_ticket
+                    )
+                    attempts[primary]['hedged'] = True
+                else:
+                    logger.info(f"Skipping hedge for {self.secondary.model_name}: budget exhausted")
+
+            pending = {task for task in (primary, secondary) if task is not None}
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        winner = task
+                        break
+        finally:
+            profiling.add('provider', time.perf_counter() - started)
+            # Also reached when the request itself is cancelled (client disconnect)
+            losers = [task for task in attempts if task is not winner]
+            for task in losers:
+                attempts[task]['cancelled'] = not task.done()
+                task.cancel()
+            await asyncio.gather(*losers, return_exceptions=True)
+            if winner is not None:
+                attempts[winner]['won'] = True
+            for attempt in attempts.values():
+                await sync_to_async(self._record)(attempt, endpoint, request_data)
+
+        if winner is None:
+            raise primary.exception()
+
+        return self._result(winner, attempts)
+
+    def _priority(self, ticket):
+        # The hedge is admitted at the priority of the call it backs up
+        return ticket['priority'] if ticket else PRIORITY_INTERACTIVE
+
+    def _result(self, winner, attempts):
+        result = winner.result()
+        return {
+            'text': result['text'],
+            'tokens_used': result['tokens_used'],
+            'model': attempts[winner]['provider'].model_name,
+            'hedged': len(attempts) > 1,
+            'attempts': [
+                {
+                    'model': attempt['provider'].model_name,
+                    'tokens_used': attempt['tokens_used'],
+                    'won': attempt['won'],
+                }
+                for attempt in attempts.values()
+            ],
+        }
+
+    def _submit_task(self, provider, prompt, hedged, attempts, ticket=None):
+        task = asyncio.ensure_future(self._timed_agenerate(provider, prompt))
+        attempts[task] = {
+            'provider': provider,
+            'future': task,
+            'hedged': hedged,
+            'won': False,
+            'cancelled': False,
+            'ticket': ticket,
+            'tokens_used': 0,
+        }
+        return task
+
+    async def _timed_agenerate(self, provider, prompt):
+        start_time = time.time()
+        try:
+            result = await provider.agenerate(prompt)
+        except asyncio.CancelledError:
+            # Surface as a finished attempt so _record can log how long it ran
+            cancelled = GenerationCancelled(provider.model_name)
+            cancelled.elapsed_ms = int((time.time() - start_time) * 1000)
+            raise cancelled from None
+        except Exception as e:
+            e.elapsed_ms = int((time.time() - start_time) * 1000)
+            raise
+        result['elapsed_ms'] = int((time.time() - start_time) * 1000)
+        return result
+
+    def _submit(self, provider, prompt, hedged, attempts, ticket=None):
+        cancel_event = threading.Event()
+        future = _executor.submit(self._timed_generate, provider, prompt, cancel_event)
+        attempts[future] = {
+            'provider': provider,
+            'future': future,
+            'cancel_event': cancel_event,
+            'hedged': hedged,
+            'won': False,
+            'cancelled': False,
+            'ticket': ticket,
+            'tokens_used': 0,
+        }
+        return future
+
+    def _timed_generate(self, provider, prompt, cancel_event):
+        start_time = time.time()
+        try:
+            result = provider.generate(prompt, cancel_event=cancel_event)
+        except Exception as e:
+            e.elapsed_ms = int((time.time() - start_time) * 1000)
+            raise
+        result['elapsed_ms'] = int((time.time() - start_time) * 1000)
+        return result
+
+    def _cancel(self, future, attempts):
+        attempt = attempts[future]
+        attempt['cancel_event'].set()
+        # Not started yet: drop it entirely; in flight: the stream stops at the next chunk
+        attempt['cancelled'] = future.cancel() or not future.done()
+
+    def _record(self, attempt, endpoint, request_data):
+        """Log the attempt in APIUsage and feed its latency to the tracker."""
+        provider = attempt['provider']
+        future = attempt['future']
+        if future.cancelled():
+            elapsed_ms, tokens_used, error = 0, 0, 'cancelled before start'
+        elif not future.done():
+            # Still streaming after cancellation; its latency is not representative
+            elapsed_ms, tokens_used, error = 0, 0, 'cancelled in flight'
+        elif future.exception() is not None:
+            exception = future.exception()
+            elapsed_ms = getattr(exception, 'elapsed_ms', 0)
+            tokens_used = 0
+            error = '' if isinstance(exception, GenerationCancelled) else str(exception)
+        else:
+            result = future.result()
+            elapsed_ms, tokens_used, error = result['elapsed_ms'], result['tokens_used'], ''
+
+        cost_usd = (tokens_used / 1000) * provider.cost_per_1k_tokens
+        if elapsed_ms and not attempt['cancelled']:
+            self.tracker.record(provider.model_name, elapsed_ms)
+            metrics.observe_provider_call(
+                provider.service,
+                provider.model_name,
+                elapsed_ms / 1000,
+                error=bool(error),
+                tokens=tokens_used,
+                cost=cost_usd,
+            )
+        attempt['tokens_used'] = tokens_used
+        if attempt['ticket']:
+            # Each ticket against its own attempt; nothing counted means
+            # the attempt failed or was cancelled, so free the reservation
+            budget = TokenBudget(provider.service)
+            if tokens_used:
+                budget.record_usage(attempt['ticket'], tokens_used)
+            else:
+                budget.release(attempt['ticket'])
+
+        try:
+            APIUsage.objects.create(
+                service=provider.service,
+                endpoint=endpoint,
+                model_name=provider.model_name,
+                request_data=request_data,
+                response_data={},
+                tokens_used=tokens_used,
+                cost_usd=cost_usd,
+                response_time_ms=elapsed_ms,
+                success=not error,
+                error_message=error,
+                hedged=attempt['hedged'],
+                won=attempt['won'],
+                cancelled=attempt['cancelled'],
+            )
+        except Exception as e:
+            logger.error(f"Failed to log API usage: {str(e)}")
+
+
+_generator = None
+_generator_lock = threading.Lock()
+
+
+def get_etymology_generator():
+    """
+    Return the process-wide generator for etymology analysis, built from
+    ``ETYMOLOGY_HEDGING`` on first use so provider clients are reused.
+    """
+    global _generator
+    if _generator is None:
+        with _generator_lock:
+            if _generator is None:
+                _generator = _build_generator()
+    return _generator
+
+
+def _build_generator():
+    config = settings.ETYMOLOGY_HEDGING
+    primary = get_provider(config['PRIMARY'])
+    secondary = None
+    if config['ENABLED'] and config['SECONDARY']:
+        try:
+            secondary = get_provider(config['SECONDARY'])
+        except ValueError as e:
+            logger.warning(f"Hedging disabled: {str(e)}")
+    return HedgedGenerator(primary, secondary)
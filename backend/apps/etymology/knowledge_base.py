@@ -0,0 +1,188 @@
+"""
+Offline etymology knowledge base.
+
+A read-only SQLite file built from validated analyses, word origins and
+imported public dictionaries. It is opened memory-mapped at worker start
+and answers lookups before any LLM provider is called.
+"""
+import os
+import json
+import sqlite3
+import logging
+import threading
+import unicodedata
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+ENTRY_FIELDS = [
+    'original_language', 'original_form', 'transliteration',
+    'prefix', 'prefix_meaning', 'root', 'root_meaning',
+    'suffix', 'suffix_meaning', 'etymology_explanation',
+    'historical_context', 'modern_usage', 'related_words', 'confidence_score',
+]
+
+
+def normalize_word(word):
+    """Normalize a word for lookups: NFC, stripped and lower-cased."""
+    return unicodedata.normalize('NFC', word).strip().lower()
+
+
+class KnowledgeBase:
+    """
+    Read-only lookups over a knowledge base file.
+
+    Each thread gets its own connection; the file is opened immutable so
+    SQLite skips locking and serves pages straight from the mmap.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(
+                f'file:{self.path}?mode=ro&immutable=1',
+                uri=True,
+                check_same_thread=False,
+            )
+            connection.execute(f'PRAGMA mmap_size = {settings.ETYMOLOGY_KNOWLEDGE_BASE_MMAP_SIZE}')
+            self._local.connection = connection
+        return connection
+
+    def lookup(self, word):
+        """Return the stored entry for a word, or None."""
+        row = self._connection().execute(
+            'SELECT source, payload FROM entries WHERE word = ?',
+            (normalize_word(word),)
+        ).fetchone()
+        if row is None:
+            return None
+        entry = json.loads(row[1])
+        entry['word'] = word
+        entry['source'] = row[0]
+        return entry
+
+    def __len__(self):
+        return self._connection().execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+
+
+_knowledge_base = None
+
+
+def load(path=None):
+    """Open the knowledge base file, if it exists. Called at app startup."""
+    global _knowledge_base
+    path = path or settings.ETYMOLOGY_KNOWLEDGE_BASE_PATH
+    if not path or not os.path.exists(path):
+        logger.info(f"Etymology knowledge base not found at {path}; skipping")
+        _knowledge_base = None
+        return None
+
+    _knowledge_base = KnowledgeBase(path)
+    return _knowledge_base
+
+
+def lookup(word):
+    """Look a word up in the loaded knowledge base; None when absent or not loaded."""
+    if _knowledge_base is None:
+        return None
+    try:
+        return _knowledge_base.lookup(word)
+    except sqlite3.Error as e:
+        logger.error(f"Knowledge base lookup failed for '{word}': {str(e)}")
+        return None
+
+
+def _analysis_entries():
+    from .models import EtymologyAnalysis
+
+    queryset = (
+        EtymologyAnalysis.objects
+        .filter(is_validated=True, status__in=['completed', 'cached'])
+        .order_by('word', '-confidence_score', '-updated_at')
+        .values('word', *ENTRY_FIELDS)
+    )
+    for row in queryset.iterator(chunk_size=2000):
+        yield row.pop('word'), row
+
+
+def _word_origin_entries():
+    from apps.core.models import WordOrigin
+
+    queryset = WordOrigin.objects.values('word', 'language', 'definition', 'etymology_summary')
+    for row in queryset.iterator(chunk_size=2000):
+        yield row['word'], {
+            'original_language': row['language'],
+            'etymology_explanation': row['etymology_summary'],
+            'modern_usage': row['definition'],
+            'confidence_score': 0.8,
+        }
+
+
+def _dictionary_entries(path):
+    """Read a JSONL dictionary: one object per line with ``word`` plus entry fields."""
+    with open(path, encoding='utf-8') as dictionary:
+        for line in dictionary:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            word = record.pop('word', None)
+            if word:
+                yield word, {key: value for key, value in record.items() if key in ENTRY_FIELDS}
+
+
+def build(output_path, dictionary_paths=()):
+    """
+    Build the knowledge base file from the database and dictionaries.
+
+    The file is written next to ``output_path`` and swapped in atomically,
+    so running workers keep reading the old file until they reload.
+    Returns the number of entries written.
+    """
+    tmp_path = f'{output_path}.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+
+    connection = sqlite3.connect(tmp_path)
+    connection.execute('PRAGMA journal_mode = OFF')
+    connection.execute('PRAGMA synchronous = OFF')
+    connection.execute(
+        'CREATE TABLE entries (word TEXT PRIMARY KEY, source TEXT NOT NULL, payload TEXT NOT NULL) '
+        'WITHOUT ROWID'
+    )
+
+    # Earlier sources win: INSERT OR IGNORE never overwrites an existing word
+    sources = [
+        ('validated_analysis', _analysis_entries()),
+        ('word_origin', _word_origin_entries()),
+    ] + [('dictionary', _dictionary_entries(path)) for path in dictionary_paths]
+
+    for source, entries in sources:
+        connection.executemany(
+            'INSERT OR IGNORE INTO entries (word, source, payload) VALUES (?, ?, ?)',
+            (
+                (normalize_word(word), source, json.dumps(_complete(entry), ensure_ascii=False))
+                for word, entry in entries
+            )
+        )
+        connection.commit()
+
+    count = connection.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+    connection.execute('VACUUM')
+    connection.close()
+    os.replace(tmp_path, output_path)
+    return count
+
+
+def _complete(entry):
+    """Fill missing fields so entries match the parsed analysis shape."""
+    completed = {field: '' for field in ENTRY_FIELDS}
+    completed['related_words'] = []
+    completed['confidence_score'] = 0.5
+    completed.update({key: value for key, value in entry.items() if value not in (None, '')})
+    return completed
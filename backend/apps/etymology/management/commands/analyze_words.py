@@ -0,0 +1,45 @@
+"""
+Analyse a word list in bulk and store the results as public analyses.
+"""
+import time
+from django.core.management.base import BaseCommand, CommandError
+from apps.etymology.budget import PRIORITY_BATCH
+from apps.etymology.services import GeminiEtymologyService
+
+
+class Command(BaseCommand):
+    help = 'Analyse words at batch priority (shed before interactive requests) and store the analyses'
+
+    def add_arguments(self, parser):
+        parser.add_argument('words', nargs='*', help='Words to analyse')
+        parser.add_argument('--file', help='Text file with one word per line')
+
+    def handle(self, *args, **options):
+        words = list(options['words'])
+        if options['file']:
+            with open(options['file'], encoding='utf-8') as word_list:
+                words.extend(line.strip() for line in word_list if line.strip())
+        if not words:
+            raise CommandError('Give words as arguments or with --file')
+
+        start_time = time.time()
+        service = GeminiEtymologyService()
+        stored = failed = 0
+        for word in words:
+            result = service.analyze_etymology(word, priority=PRIORITY_BATCH)
+            if 'retry_after' in result:
+                # Batch work is shed while the budget is busy: wait for the next window
+                time.sleep(result['retry_after'])
+                result = service.analyze_etymology(word, priority=PRIORITY_BATCH)
+            if not result['success']:
+                failed += 1
+                self.stderr.write(f"{word}: {result['error']}")
+            elif 'prompt_version' in result:
+                # Knowledge base answers are already stored offline
+                service.save_analysis(word, result)
+                stored += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Stored {stored} analyses ({failed} failed) of {len(words)} words "
+            f"in {time.time() - start_time:.1f}s"
+        ))
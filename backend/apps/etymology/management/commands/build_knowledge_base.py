@@ -0,0 +1,32 @@
+"""
+Build the offline etymology knowledge base file.
+"""
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from apps.etymology import knowledge_base
+
+
+class Command(BaseCommand):
+    help = 'Build the read-only etymology knowledge base from validated data and dictionaries'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            default=settings.ETYMOLOGY_KNOWLEDGE_BASE_PATH,
+            help='Path of the knowledge base file to write'
+        )
+        parser.add_argument(
+            '--dictionary',
+            action='append',
+            default=[],
+            help='JSONL dictionary to import (one {"word": ...} object per line); repeatable'
+        )
+
+    def handle(self, *args, **options):
+        start_time = time.time()
+        count = knowledge_base.build(options['output'], options['dictionary'])
+        elapsed = time.time() - start_time
+        self.stdout.write(self.style.SUCCESS(
+            f"Knowledge base written to {options['output']}: {count} entries in {elapsed:.1f}s"
+        ))
@@ -0,0 +1,182 @@
+"""
+Stream a dictionary dump into WordOrigin with batched upserts.
+"""
+import os
+import csv
+import gzip
+import json
+import time
+from itertools import islice
+from xml.etree.ElementTree import iterparse
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from apps.core import response_cache
+from apps.core.models import WordOrigin
+from apps.etymology.knowledge_base import normalize_word
+
+IMPORT_FIELDS = ['language', 'definition', 'etymology_summary']
+
+
+def _truncate(value, field):
+    """Cut ``value`` to the column's max_length: one over-long value would fail the whole upsert."""
+    max_length = WordOrigin._meta.get_field(field).max_length
+    return value[:max_length] if max_length else value
+
+
+def _open(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8', newline='')
+    return open(path, encoding='utf-8', newline='')
+
+
+def read_jsonl(path, skip=0, **kwargs):
+    with _open(path) as dump:
+        # Skipped lines are never parsed, so resuming is cheap
+        for line in islice(dump, skip, None):
+            line = line.strip()
+            try:
+                yield json.loads(line) if line else None
+            except ValueError:
+                # Not an object: the command counts and skips it
+                yield line
+
+
+def read_csv(path, skip=0, **kwargs):
+    with _open(path) as dump:
+        yield from islice(csv.DictReader(dump), skip, None)
+
+
+def read_xml(path, skip=0, xml_tag='entry', **kwargs):
+    """
+    Yield ``<entry>`` elements as dicts of their child tags. The root is
+    cleared after each one: a cleared entry is still an (empty) child of
+    the root, so clearing only the entry keeps memory growing.
+    """
+    with _open(path) as dump:
+        seen = 0
+        root = None
+        for event, element in iterparse(dump, events=('start', 'end')):
+            if root is None:
+                root = element
+            if event != 'end' or element.tag != xml_tag:
+                continue
+            seen += 1
+            if seen > skip:
+                yield {child.tag: (child.text or '').strip() for child in element}
+            root.clear()
+
+
+READERS = {
+    'jsonl': read_jsonl,
+    'csv': read_csv,
+    'xml': read_xml,
+}
+
+
+class Command(BaseCommand):
+    help = 'Import a JSONL/CSV/XML dictionary dump into WordOrigin using batched upserts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Dump file (optionally .gz)')
+        parser.add_argument('--format', choices=READERS.keys(), help='Defaults to the file extension')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--xml-tag', default='entry', help='Element holding one XML entry')
+        parser.add_argument('--checkpoint', help='Checkpoint file (default: <path>.checkpoint)')
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='Skip the records already imported according to the checkpoint'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f"File not found: {path}")
+
+        dump_format = options['format'] or self._detect_format(path)
+        checkpoint_path = options['checkpoint'] or f'{path}.checkpoint'
+        skip = self._read_checkpoint(checkpoint_path) if options['resume'] else 0
+        if skip:
+            self.stdout.write(f"Resuming after {skip} records")
+
+        reader = READERS[dump_format](path, skip=skip, xml_tag=options['xml_tag'])
+        batch_size = options['batch_size']
+        start_time = time.time()
+        consumed = skip
+        imported = 0
+        skipped = 0
+        batch = {}
+
+        for record in reader:
+            consumed += 1
+            if record is not None and not isinstance(record, dict):
+                skipped += 1
+                continue
+            word = _truncate(normalize_word(record.get('word') or ''), 'word') if record else ''
+            if word:
+                # Duplicates within one upsert are rejected by Postgres; last one wins
+                batch[word] = WordOrigin(
+                    word=word,
+                    **{field: _truncate(str(record.get(field) or ''), field) for field in IMPORT_FIELDS}
+                )
+
+            if len(batch) >= batch_size:
+                imported += self._flush(batch, consumed, checkpoint_path)
+                self._report(imported, consumed, start_time)
+
+        if batch:
+            imported += self._flush(batch, consumed, checkpoint_path)
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+
+        elapsed = time.time() - start_time
+        if skipped:
+            self.stderr.write(f"Skipped {skipped:,} records that are not JSON objects")
+        self.stdout.write(self.style.SUCCESS(
+            f"Upserted {imported:,} rows from {consumed - skip:,} records in {elapsed:.1f}s "
+            f"({imported / max(elapsed, 0.001):,.0f} rows/s). "
+            f"Run build_knowledge_base to refresh the offline index."
+        ))
+
+    def _flush(self, batch, consumed, checkpoint_path):
+        with transaction.atomic():
+            WordOrigin.objects.bulk_create(
+                batch.values(),
+                update_conflicts=True,
+                unique_fields=['word'],
+                update_fields=IMPORT_FIELDS + ['updated_at'],
+            )
+        # bulk_create sends no post_save, so drop cached responses here
+        response_cache.invalidate('word_origin', batch.keys())
+        self._write_checkpoint(checkpoint_path, consumed)
+        count = len(batch)
+        batch.clear()
+        return count
+
+    def _report(self, imported, consumed, start_time):
+        elapsed = time.time() - start_time
+        self.stdout.write(
+            f"{imported:,} rows upserted ({consumed:,} records read), "
+            f"{imported / max(elapsed, 0.001):,.0f} rows/s"
+        )
+
+    def _detect_format(self, path):
+        name = path[:-3] if path.endswith('.gz') else path
+        extension = os.path.splitext(name)[1].lstrip('.').lower()
+        if extension == 'json':
+            extension = 'jsonl'
+        if extension not in READERS:
+            raise CommandError(f"Cannot detect format of {path}; use --format")
+        return extension
+
+    def _read_checkpoint(self, checkpoint_path):
+        if not os.path.exists(checkpoint_path):
+            return 0
+        with open(checkpoint_path) as checkpoint:
+            return json.load(checkpoint)['records']
+
+    def _write_checkpoint(self, checkpoint_path, consumed):
+        tmp_path = f'{checkpoint_path}.tmp'
+        with open(tmp_path, 'w') as checkpoint:
+            json.dump({'records': consumed}, checkpoint)
+        os.replace(tmp_path, checkpoint_path)
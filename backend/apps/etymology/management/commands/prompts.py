@@ -0,0 +1,51 @@
+"""
+List the prompt templates with their token cost and live traffic share.
+"""
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from apps.etymology import prompts
+from apps.etymology.models import EtymologyAnalysis
+from apps.core.models import APIUsage
+
+
+class Command(BaseCommand):
+    help = 'Show prompt template versions, their estimated tokens before/after compaction and A/B weights'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--word', default='filosofia', help='Word to render the templates with')
+        parser.add_argument('--show', metavar='NAME@VERSION', help='Print one rendered template')
+
+    def handle(self, *args, **options):
+        if options['show']:
+            name, _, version = options['show'].partition('@')
+            self.stdout.write(prompts.get(name, version).text.format(word=options['word']))
+            return
+
+        # Answered provider calls per template (the winning attempt of each)
+        answered = dict(
+            APIUsage.objects.filter(won=True, request_data__has_key='prompt_version')
+            .values_list('request_data__prompt_version')
+            .annotate(count=Count('id'))
+            .order_by()
+        )
+        stored = dict(
+            EtymologyAnalysis.objects.exclude(prompt_version='')
+            .values_list('prompt_version')
+            .annotate(count=Count('id'))
+            .order_by()
+        )
+        self.stdout.write(
+            f"{'template':<40}{'source':>8}{'sent':>7}{'saved':>8}{'live':>7}{'calls':>8}{'stored':>8}"
+        )
+        for template in prompts.templates():
+            live = dict(prompts.active_versions(template.name))
+            share = live.get(template.version, 0) / sum(live.values()) * 100
+            raw = prompts.count_tokens(template.source.format(word=options['word']))
+            sent = prompts.count_tokens(template.text.format(word=options['word']))
+            self.stdout.write(
+                f"{template.key:<40}{raw:>8}{sent:>7}{(raw - sent) / raw * 100:>7.0f}%"
+                f"{share:>6.0f}%{answered.get(template.key, 0):>8}{stored.get(template.key, 0):>8}"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            'Tokens are pre-send estimates; "source" is the template before compaction'
+        ))
@@ -54,6 +54,12 @@ class EtymologyAnalysis(TimestampedModel):
     
     # AI metadata
     model_used = models.CharField(max_length=100, default='gemini-pro')
+    prompt_version = models.CharField(
+        max_length=100,
+        blank=True,
+        db_index=True,
+        help_text="Prompt template that produced the analysis (name@version-fingerprint)"
+    )
     tokens_used = models.PositiveIntegerField(default=0)
     processing_time_ms = models.PositiveIntegerField(default=0)
     cost_usd = models.DecimalField(max_digits=8, decimal_places=6, default=0)
@@ -63,6 +69,9 @@ class EtymologyAnalysis(TimestampedModel):
     is_validated = models.BooleanField(default=False)
     validation_notes = models.TextField(blank=True)
     
+    # Visible to every user; otherwise only to its owner
+    is_public = models.BooleanField(default=False)
+    
     # Usage tracking
     view_count = models.PositiveIntegerField(default=0)
     last_viewed = models.DateTimeField(null=True, blank=True)
@@ -0,0 +1,211 @@
+"""
+Versioned prompt templates.
+
+Every prompt sent to a provider is a named, versioned template from this
+registry. Templates are compacted once when registered (indentation,
+blank lines and JSON skeleton line breaks cost tokens on every call) and
+identified by ``name@version-fingerprint``: the fingerprint is a hash of
+the compacted text, so editing a template without bumping its version
+still changes its key. Cached analyses are keyed by it, stored ones
+record it in ``EtymologyAnalysis.prompt_version`` and every provider
+call records it in ``APIUsage.request_data['prompt_version']``, so a
+prompt change only invalidates the results of that prompt.
+
+``settings.PROMPT_VERSIONS`` picks the live version of each template,
+or splits traffic between versions for an A/B test (``"v1=50,v2=50"``).
+A word always gets the same version, so its cached result stays valid.
+"""
+import re
+import math
+import zlib
+import hashlib
+import functools
+from django.conf import settings
+from apps.core import metrics
+
+_WHITESPACE = re.compile(r'[ \t]+')
+_TOKEN = re.compile(r'\w+|[^\w\s]|\n|[ \t]{2,}')
+
+_registry = {}
+
+
+def compact(text):
+    """
+    Strip indentation and blank lines and fold JSON skeletons onto one line;
+    instruction lines keep their line breaks.
+    """
+    lines = []
+    for line in text.strip().splitlines():
+        line = _WHITESPACE.sub(' ', line.strip())
+        if not line:
+            continue
+        previous = lines[-1] if lines else ''
+        if previous.count('{') + previous.count('[') > previous.count('}') + previous.count(']'):
+            # Inside an open JSON object/array
+            tight = previous.endswith(('{', '[')) or line.startswith(('}', ']'))
+            lines[-1] = previous + ('' if tight else ' ') + line
+        else:
+            lines.append(line)
+    return '\n'.join(lines)
+
+
+def count_tokens(text):
+    """
+    Estimate the tokens of ``text`` before sending it.
+
+    Subword tokenizers keep short words whole and split longer ones about
+    every four characters; punctuation and line breaks are tokens of their
+    own and runs of indentation take one per four characters. The token
+    budget corrects this estimate against the usage providers report.
+    """
+    return sum(max(1, math.ceil(len(token) / 4)) for token in _TOKEN.findall(text))
+
+
+class PromptTemplate:
+    def __init__(self, name, version, source):
+        self.name = name
+        self.version = version
+        self.source = source
+        self.text = compact(source)
+        self.fingerprint = hashlib.sha1(self.text.encode('utf-8')).hexdigest()[:8]
+        self.key = f"{name}@{version}-{self.fingerprint}"
+
+    def __repr__(self):
+        return f"<PromptTemplate {self.key}>"
+
+    def render(self, **values):
+        prompt = self.text.format(**values)
+        metrics.PROMPT_TOKENS.labels(self.name, self.version).observe(count_tokens(prompt))
+        return prompt
+
+
+def register(name, version, source):
+    template = PromptTemplate(name, version, source)
+    versions = _registry.setdefault(name, {})
+    if version in versions:
+        raise ValueError(f"Prompt {name}@{version} is already registered")
+    versions[version] = template
+    return template
+
+
+def get(name, version):
+    return _registry[name][version]
+
+
+def templates():
+    """Every registered template, by name then version."""
+    return [template for name in sorted(_registry) for _, template in sorted(_registry[name].items())]
+
+
+@functools.lru_cache(maxsize=None)
+def _weights(spec):
+    """``"v2"`` -> ``[("v2", 1)]``; ``"v1=30,v2=70"`` -> ``[("v1", 30), ("v2", 70)]``."""
+    weights = []
+    for part in spec.split(','):
+        version, _, weight = part.strip().partition('=')
+        weights.append((version, int(weight or 1)))
+    return weights
+
+
+def active_versions(name):
+    """``[(version, weight), ...]`` live for ``name``."""
+    weights = _weights(settings.PROMPT_VERSIONS[name])
+    for version, _ in weights:
+        if version not in _registry[name]:
+            raise ValueError(f"PROMPT_VERSIONS names unknown prompt {name}@{version}")
+    return weights
+
+
+def select(name, unit):
+    """
+    The version of ``name`` to use for ``unit`` (e.g. the normalized word).
+
+    Stable per unit: a hash of it picks a slot in the weight distribution.
+    """
+    weights = active_versions(name)
+    if len(weights) == 1:
+        return _registry[name][weights[0][0]]
+    slot = zlib.crc32(f"{name}:{unit}".encode('utf-8')) % sum(weight for _, weight in weights)
+    for version, weight in weights:
+        if slot < weight:
+            return _registry[name][version]
+        slot -= weight
+
+
+# Templates. Bump the version for any change worth comparing; the
+# fingerprint changes with the text either way.
+
+register('analysis_summary', 'v1', """
+        Analise a etimologia da palavra "{word}" em português, fornecendo:
+        1. Origem e evolução histórica
+        2. Raízes linguísticas (latim, grego, etc.)
+        3. Morfologia (prefixos, radicais, sufixos)
+        4. Palavras relacionadas
+        5. Significado atual e evolução semântica
+
+        Formate a resposta como JSON com as chaves: origem, raizes, morfologia, relacionadas, significado.
+        """)
+
+register('analysis_summary', 'v2', """
+    Analise a etimologia da palavra "{word}" em português.
+    Responda em JSON com as chaves: origem (origem e evolução histórica), raizes (raízes latinas, gregas etc.),
+    morfologia (prefixos, radicais, sufixos), relacionadas (lista de palavras relacionadas),
+    significado (sentido atual e evolução semântica).
+    """)
+
+register('analysis_detailed', 'v1', """
+        Como especialista em etimologia e linguística histórica, forneça uma análise detalhada da palavra "{word}" em português.
+
+        Estruture sua resposta exatamente no seguinte formato JSON:
+
+        {{
+            "word": "{word}",
+            "original_language": "nome da língua de origem (ex: Grego Antigo, Latim, etc.)",
+            "original_form": "forma original da palavra na língua de origem",
+            "transliteration": "transliteração se aplicável",
+            "prefix": "prefixo identificado ou vazio se não houver",
+            "prefix_meaning": "significado do prefixo",
+            "root": "raiz principal da palavra",
+            "root_meaning": "significado da raiz",
+            "suffix": "sufixo identificado ou vazio se não houver",
+            "suffix_meaning": "significado do sufixo",
+            "etymology_explanation": "explicação completa da etimologia em 2-3 parágrafos",
+            "historical_context": "contexto histórico e cultural da palavra",
+            "modern_usage": "como a palavra é usada atualmente",
+            "related_words": ["lista", "de", "palavras", "relacionadas"],
+            "confidence_score": 0.95
+        }}
+
+        IMPORTANTE:
+        - Seja preciso e academicamente rigoroso
+        - Se não tiver certeza sobre algo, indique isso na confidence_score (0.0 a 1.0)
+        - Para palavras compostas, identifique todos os elementos
+        - Inclua informações sobre mudanças semânticas ao longo do tempo
+        - Mencione cognatos em outras línguas quando relevante
+        - Use terminologia técnica apropriada da linguística
+        - Responda APENAS com o JSON, sem texto adicional
+        """)
+
+register('analysis_detailed', 'v2', """
+    Como especialista em etimologia e linguística histórica, analise a palavra "{word}" em português.
+    Responda APENAS com este JSON:
+    {{
+        "word": "{word}",
+        "original_language": "língua de origem (ex: Latim, Grego Antigo)",
+        "original_form": "forma original",
+        "transliteration": "transliteração, se aplicável",
+        "prefix": "prefixo ou vazio",
+        "prefix_meaning": "",
+        "root": "raiz principal",
+        "root_meaning": "",
+        "suffix": "sufixo ou vazio",
+        "suffix_meaning": "",
+        "etymology_explanation": "etimologia completa em 2-3 parágrafos",
+        "historical_context": "",
+        "modern_usage": "",
+        "related_words": [],
+        "confidence_score": 0.95
+    }}
+    Seja rigoroso e use terminologia linguística; confidence_score (0.0 a 1.0) reflete sua certeza.
+    Identifique todos os elementos de palavras compostas, mudanças semânticas e cognatos relevantes.
+    """)
@@ -0,0 +1,193 @@
+"""
+Text generation providers used by the etymology analysis path.
+
+Every provider exposes ``generate(prompt, cancel_event=None)`` and returns a
+dict with the generated ``text`` and ``tokens_used``. Responses are streamed
+so a losing hedged request can stop consuming tokens as soon as it is
+cancelled.
+
+Provider SDKs are imported when a provider is first built, so processes
+that never call an LLM (migrations, management commands, Celery beat) do
+not pay their import time and memory.
+
+``agenerate`` is the non-blocking counterpart used by the async views: it
+streams over a pooled ``httpx.AsyncClient`` so one process can hold many
+provider calls in flight.
+"""
+import json
+import asyncio
+import weakref
+from django.conf import settings
+from .prompts import count_tokens
+
+DEFAULT_GEMINI_API_BASE_URL = 'https://generativelanguage.googleapis.com'
+
+_async_http_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_http_client():
+    """
+    Pooled ``httpx.AsyncClient`` for the running event loop.
+
+    Clients are bound to the loop that created them, so each loop (one per
+    ASGI worker, one per request under WSGI) gets its own.
+    """
+    import httpx
+
+    loop = asyncio.get_running_loop()
+    client = _async_http_clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(
+            timeout=httpx.Timeout(settings.PROVIDER_HTTP_TIMEOUT, connect=5.0),
+            limits=httpx.Limits(max_connections=500, max_keepalive_connections=100),
+        )
+        _async_http_clients[loop] = client
+    return client
+
+
+class GenerationCancelled(Exception):
+    """Raised when a streaming generation is cancelled by the caller."""
+
+
+def estimate_tokens(prompt, text):
+    """Token usage of a call whose response reported none."""
+    return count_tokens(prompt + text)
+
+
+class GeminiProvider:
+    """
+    Google Gemini text generation.
+    """
+    service = 'gemini'
+    cost_per_1k_tokens = 0.000125
+
+    def __init__(self, model_name='gemini-pro'):
+        if not settings.GEMINI_API_KEY:
+            raise ValueError("Gemini API key not configured")
+
+        import google.generativeai as genai
+        if settings.GEMINI_API_BASE_URL == DEFAULT_GEMINI_API_BASE_URL:
+            genai.configure(api_key=settings.GEMINI_API_KEY)
+        else:
+            # Proxies and the load test fakes speak the REST API
+            genai.configure(
+                api_key=settings.GEMINI_API_KEY,
+                transport='rest',
+                client_options={'api_endpoint': settings.GEMINI_API_BASE_URL}
+            )
+        self.model_name = model_name
+        self.model = genai.GenerativeModel(model_name)
+
+    def generate(self, prompt, cancel_event=None):
+        response = self.model.generate_content(prompt, stream=True)
+        chunks = []
+        tokens_used = 0
+        for chunk in response:
+            if cancel_event is not None and cancel_event.is_set():
+                raise GenerationCancelled(self.model_name)
+            chunks.append(chunk.text)
+            # Newer SDKs report usage on the final chunk; the pinned 0.3 never does
+            usage = getattr(chunk, 'usage_metadata', None)
+            tokens_used = getattr(usage, 'total_token_count', 0) or tokens_used
+
+        text = ''.join(chunks)
+        return {'text': text, 'tokens_used': tokens_used or estimate_tokens(prompt, text)}
+
+    async def agenerate(self, prompt):
+        """Stream the REST ``streamGenerateContent`` endpoint (server-sent events)."""
+        url = f"{settings.GEMINI_API_BASE_URL}/v1beta/models/{self.model_name}:streamGenerateContent"
+        body = {'contents': [{'parts': [{'text': prompt}]}]}
+        chunks = []
+        tokens_used = 0
+        async with get_async_http_client().stream(
+            'POST', url, params={'alt': 'sse', 'key': settings.GEMINI_API_KEY}, json=body
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.startswith('data:'):
+                    continue
+                event = json.loads(line[len('data:'):])
+                for candidate in event.get('candidates', [])[:1]:
+                    for part in candidate.get('content', {}).get('parts', []):
+                        chunks.append(part.get('text', ''))
+                tokens_used = event.get('usageMetadata', {}).get('totalTokenCount', tokens_used)
+
+        text = ''.join(chunks)
+        return {'text': text, 'tokens_used': tokens_used or estimate_tokens(prompt, text)}
+
+
+class OpenAIChatProvider:
+    """
+    OpenAI chat completion, used as a secondary provider for hedging.
+    """
+    service = 'openai'
+    cost_per_1k_tokens = 0.0006
+
+    def __init__(self, model_name='gpt-4o-mini'):
+        if not settings.OPENAI_API_KEY:
+            raise ValueError("OpenAI API key not configured")
+
+        import openai
+        self.model_name = model_name
+        self.client = openai.OpenAI(api_key=settings.OPENAI_API_KEY, base_url=settings.OPENAI_BASE_URL)
+
+    def generate(self, prompt, cancel_event=None):
+        stream = self.client.chat.completions.create(
+            model=self.model_name,
+            messages=[{'role': 'user', 'content': prompt}],
+            stream=True,
+        )
+        chunks = []
+        try:
+            for chunk in stream:
+                if cancel_event is not None and cancel_event.is_set():
+                    raise GenerationCancelled(self.model_name)
+                if chunk.choices and chunk.choices[0].delta.content:
+                    chunks.append(chunk.choices[0].delta.content)
+        finally:
+            # Closing the stream drops the connection and stops generation
+            stream.response.close()
+
+        text = ''.join(chunks)
+        # Streamed chat completions carry no usage block; estimate it
+        return {'text': text, 'tokens_used': estimate_tokens(prompt, text)}
+
+    async def agenerate(self, prompt):
+        import openai
+
+        client = openai.AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            base_url=settings.OPENAI_BASE_URL,
+            http_client=get_async_http_client(),
+        )
+        stream = await client.chat.completions.create(
+            model=self.model_name,
+            messages=[{'role': 'user', 'content': prompt}],
+            stream=True,
+        )
+        chunks = []
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    chunks.append(chunk.choices[0].delta.content)
+        finally:
+            # Also runs on task cancellation: drops the connection mid-stream
+            await stream.response.aclose()
+
+        text = ''.join(chunks)
+        return {'text': text, 'tokens_used': estimate_tokens(prompt, text)}
+
+
+PROVIDERS = {
+    'gemini': GeminiProvider,
+    'openai': OpenAIChatProvider,
+}
+
+
+def get_provider(spec):
+    """
+    Build a provider from a ``"service:model"`` spec, e.g. ``"gemini:gemini-pro"``.
+    """
+    service, _, model_name = spec.partition(':')
+    provider_class = PROVIDERS[service]
+    return provider_class(model_name) if model_name else provider_class()
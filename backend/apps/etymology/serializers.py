@@ -9,7 +9,7 @@ from .models import (
     PopularSearch,
     FeaturedWord
 )
-from apps.core.models import WordOrigin, EtymologyImage
+from apps.core.models import WordOrigin
 
 class EtymologyAnalysisSerializer(serializers.ModelSerializer):
     """
@@ -43,23 +43,9 @@ class EtymologyAnalysisSerializer(serializers.ModelSerializer):
         return False
     
     def get_images(self, obj):
-        """Get related images for the word."""
-        if obj.word_origin:
-            images = obj.word_origin.images.filter(is_active=True)[:3]
-            return EtymologyImageSerializer(images, many=True).data
+        """Images are generated on demand and not stored yet."""
         return []
 
-class EtymologyImageSerializer(serializers.ModelSerializer):
-    """
-    Serializer for etymology images.
-    """
-    class Meta:
-        model = EtymologyImage
-        fields = [
-            'id', 'image_url', 'thumbnail_url', 'alt_text', 'source',
-            'photographer_name', 'photographer_url', 'usage_count'
-        ]
-
 class EtymologyBookmarkSerializer(serializers.ModelSerializer):
     """
     Serializer for etymology bookmarks.
@@ -100,22 +86,9 @@ class WordOriginSerializer(serializers.ModelSerializer):
     """
     Serializer for word origins.
     """
-    related_words_count = serializers.SerializerMethodField()
-    images = EtymologyImageSerializer(many=True, read_only=True)
-    
     class Meta:
         model = WordOrigin
-        fields = [
-            'id', 'word', 'language', 'original_form', 'transliteration',
-            'meaning', 'definition', 'prefix', 'prefix_meaning', 'root',
-            'root_meaning', 'suffix', 'suffix_meaning', 'historical_context',
-            'first_recorded_use', 'evolution_notes', 'difficulty_level',
-            'search_count', 'is_featured', 'related_words_count', 'images'
-        ]
-    
-    def get_related_words_count(self, obj):
-        """Get count of related words."""
-        return obj.related_words.count()
+        fields = ['id', 'word', 'language', 'definition', 'etymology_summary']
 
 class FeaturedWordSerializer(serializers.ModelSerializer):
     """
@@ -1,120 +1,131 @@
 """
 Etymology services for external API integrations.
 """
-import google.generativeai as genai
-import openai
-import requests
 import time
 import json
 from django.conf import settings
 from django.core.cache import cache
+from apps.core import metrics
 from apps.core.models import APIUsage
+from .budget import TokenBudget, PRIORITY_INTERACTIVE
+from .hedging import get_etymology_generator
+from .models import EtymologyAnalysis
+from .providers import get_async_http_client
+from . import knowledge_base, prompts
 import logging
 
 logger = logging.getLogger(__name__)
 
+DALLE_MODEL = 'dall-e-3'
+DALLE_IMAGE_COST_USD = 0.04  # standard quality, 1024x1024
+
 class GeminiEtymologyService:
     """
     Service for etymology analysis using Google Gemini AI.
     """
     
     def __init__(self):
-        if not settings.GEMINI_API_KEY:
-            raise ValueError("Gemini API key not configured")
-        
-        genai.configure(api_key=settings.GEMINI_API_KEY)
-        self.model = genai.GenerativeModel('gemini-pro')
+        self.generator = get_etymology_generator()
+        self.budget = TokenBudget(self.generator.primary.service)
         
-    def analyze_etymology(self, word):
+    def analyze_etymology(self, word, priority=PRIORITY_INTERACTIVE):
         """
         Analyze the etymology of a word using Gemini AI.
+        
+        Calls are admitted through the shared token budget; warming and
+        batch callers pass a lower ``priority`` so they are shed first.
+        Slow primary calls are hedged with the secondary model, and every
+        attempt is logged in APIUsage by the generator.
+        
+        Words found in the offline knowledge base are answered without any
+        provider call. The result's ``prompt_version`` is the template key
+        to store in ``EtymologyAnalysis.prompt_version`` (``save_analysis``).
         """
         start_time = time.time()
+        entry = knowledge_base.lookup(word)
+        if entry is not None:
+            return {
+                'success': True,
+                'data': entry,
+                'raw_response': '',
+                'model_used': f"knowledge_base:{entry['source']}",
+                'tokens_used': 0,
+                'processing_time_ms': int((time.time() - start_time) * 1000)
+            }
+        
+        template = prompts.select('analysis_detailed', knowledge_base.normalize_word(word))
+        prompt = template.render(word=word)
+        ticket = self.budget.acquire(prompt, priority=priority)
+        
+        if not ticket['admitted']:
+            return {
+                'success': False,
+                'error': 'LLM token budget exhausted',
+                'retry_after': ticket['retry_after']
+            }
         
         try:
-            prompt = self._build_etymology_prompt(word)
-            
             # Generate response
-            response = self.model.generate_content(prompt)
+            response = self.generator.generate(
+                prompt,
+                endpoint='etymology_analysis',
+                request_data={'word': word, 'prompt_version': template.key},
+                ticket=ticket
+            )
             
             processing_time_ms = int((time.time() - start_time) * 1000)
+            tokens_used = response['tokens_used']
             
             # Parse and structure the response
-            parsed_data = self._parse_etymology_response(response.text, word)
-            
-            # Log API usage
-            self._log_api_usage(
-                endpoint='etymology_analysis',
-                request_data={'word': word, 'prompt': prompt},
-                response_data={'text': response.text},
-                tokens_used=getattr(response, 'usage_metadata', {}).get('total_token_count', 0),
-                processing_time_ms=processing_time_ms,
-                success=True
-            )
+            parsed_data = self._parse_etymology_response(response['text'], word)
             
             return {
                 'success': True,
                 'data': parsed_data,
-                'raw_response': response.text,
-                'tokens_used': getattr(response, 'usage_metadata', {}).get('total_token_count', 0),
+                'raw_response': response['text'],
+                'model_used': response['model'],
+                'prompt_version': template.key,
+                'tokens_used': tokens_used,
                 'processing_time_ms': processing_time_ms
             }
             
         except Exception as e:
-            processing_time_ms = int((time.time() - start_time) * 1000)
             logger.error(f"Gemini etymology analysis failed for '{word}': {str(e)}")
             
-            # Log failed API usage
-            self._log_api_usage(
-                endpoint='etymology_analysis',
-                request_data={'word': word},
-                response_data={},
-                processing_time_ms=processing_time_ms,
-                success=False,
-                error_message=str(e)
-            )
-            
             return {
                 'success': False,
                 'error': str(e)
             }
     
-    def _build_etymology_prompt(self, word):
-        """
-        Build a comprehensive prompt for etymology analysis.
+    def save_analysis(self, word, result, user=None):
         """
-        return f"""
-        Como especialista em etimologia e linguística histórica, forneça uma análise detalhada da palavra "{word}" em português. 
-
-        Estruture sua resposta exatamente no seguinte formato JSON:
-
-        {{
-            "word": "{word}",
-            "original_language": "nome da língua de origem (ex: Grego Antigo, Latim, etc.)",
-            "original_form": "forma original da palavra na língua de origem",
-            "transliteration": "transliteração se aplicável",
-            "prefix": "prefixo identificado ou vazio se não houver",
-            "prefix_meaning": "significado do prefixo",
-            "root": "raiz principal da palavra",
-            "root_meaning": "significado da raiz",
-            "suffix": "sufixo identificado ou vazio se não houver",
-            "suffix_meaning": "significado do sufixo",
-            "etymology_explanation": "explicação completa da etimologia em 2-3 parágrafos",
-            "historical_context": "contexto histórico e cultural da palavra",
-            "modern_usage": "como a palavra é usada atualmente",
-            "related_words": ["lista", "de", "palavras", "relacionadas"],
-            "confidence_score": 0.95
-        }}
-
-        IMPORTANTE:
-        - Seja preciso e academicamente rigoroso
-        - Se não tiver certeza sobre algo, indique isso na confidence_score (0.0 a 1.0)
-        - Para palavras compostas, identifique todos os elementos
-        - Inclua informações sobre mudanças semânticas ao longo do tempo
-        - Mencione cognatos em outras línguas quando relevante
-        - Use terminologia técnica apropriada da linguística
-        - Responda APENAS com o JSON, sem texto adicional
+        Store a successful provider result of ``analyze_etymology`` as a
+        completed analysis, traced to the prompt version that produced it.
         """
+        data = result['data']
+        fields = {}
+        for name in knowledge_base.ENTRY_FIELDS:
+            if name not in data:
+                continue
+            value = data[name]
+            max_length = EtymologyAnalysis._meta.get_field(name).max_length
+            if max_length and isinstance(value, str):
+                value = value[:max_length]
+            fields[name] = value
+        return EtymologyAnalysis.objects.create(
+            word=word,
+            user=user,
+            status='completed',
+            raw_response={'text': result['raw_response']},
+            processed_data=data,
+            model_used=result['model_used'],
+            prompt_version=result['prompt_version'],
+            tokens_used=result['tokens_used'],
+            processing_time_ms=result['processing_time_ms'],
+            # Nobody owns an analysis stored without a user, so everyone sees it
+            is_public=user is None,
+            **fields
+        )
     
     def _parse_etymology_response(self, response_text, word):
         """
@@ -179,37 +190,6 @@ class GeminiEtymologyService:
                 'related_words': [],
                 'confidence_score': 0.1
             }
-    
-    def _log_api_usage(self, endpoint, request_data, response_data, tokens_used=0, 
-                      processing_time_ms=0, success=True, error_message=''):
-        """
-        Log API usage for monitoring and billing.
-        """
-        try:
-            APIUsage.objects.create(
-                service='gemini',
-                endpoint=endpoint,
-                request_data=request_data,
-                response_data=response_data,
-                tokens_used=tokens_used,
-                cost_usd=self._calculate_cost(tokens_used),
-                response_time_ms=processing_time_ms,
-                success=success,
-                error_message=error_message
-            )
-        except Exception as e:
-            logger.error(f"Failed to log API usage: {str(e)}")
-    
-    def _calculate_cost(self, tokens_used):
-        """
-        Calculate estimated cost based on tokens used.
-        Gemini Pro pricing: approximately $0.000125 per 1K tokens
-        """
-        if tokens_used == 0:
-            return 0.0
-        
-        cost_per_1k_tokens = 0.000125
-        return (tokens_used / 1000) * cost_per_1k_tokens
 
 class ImageGenerationService:
     """
@@ -219,7 +199,9 @@ class ImageGenerationService:
     def __init__(self):
         self.openai_client = None
         if settings.OPENAI_API_KEY:
+            import openai  # heavy SDK, loaded only when images are generated
             openai.api_key = settings.OPENAI_API_KEY
+            openai.base_url = settings.OPENAI_BASE_URL.rstrip('/') + '/'  # module client joins paths as-is
             self.openai_client = openai
     
     def generate_etymology_image(self, word, etymology_context=''):
@@ -245,6 +227,98 @@ class ImageGenerationService:
                 'error': str(e)
             }
     
+    async def agenerate_etymology_image(self, word, etymology_context=''):
+        """
+        Async counterpart of ``generate_etymology_image`` for the async
+        view: DALL-E and Unsplash are called over non-blocking HTTP.
+        """
+        try:
+            if self.openai_client:
+                result = await self._agenerate_with_dalle(word, etymology_context)
+                if result['success']:
+                    return result
+            
+            return await self._aget_unsplash_image(word)
+            
+        except Exception as e:
+            logger.error(f"Image generation failed for '{word}': {str(e)}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
+    
+    async def _agenerate_with_dalle(self, word, etymology_context):
+        try:
+            prompt = self._build_image_prompt(word, etymology_context)
+            client = self.openai_client.AsyncOpenAI(
+                api_key=settings.OPENAI_API_KEY,
+                base_url=settings.OPENAI_BASE_URL,
+                http_client=get_async_http_client(),
+            )
+            with metrics.provider_call('dalle', DALLE_MODEL) as call:
+                response = await client.images.generate(
+                    model=DALLE_MODEL,
+                    prompt=prompt,
+                    size="1024x1024",
+                    quality="standard",
+                    n=1,
+                )
+                call.cost = DALLE_IMAGE_COST_USD
+            
+            image_url = response.data[0].url
+            await self._alog_api_usage(
+                endpoint='image_generation',
+                request_data={'word': word, 'prompt': prompt},
+                response_data={'url': image_url},
+                success=True
+            )
+            
+            return {
+                'success': True,
+                'image_url': image_url,
+                'source': 'dalle',
+                'metadata': {
+                    'prompt': prompt,
+                    'model': DALLE_MODEL
+                }
+            }
+            
+        except Exception as e:
+            logger.error(f"DALL-E generation failed for '{word}': {str(e)}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
+    
+    async def _aget_unsplash_image(self, word):
+        try:
+            if settings.UNSPLASH_ACCESS_KEY:
+                with metrics.provider_call('unsplash') as call:
+                    response = await get_async_http_client().get(
+                        f"{settings.UNSPLASH_API_URL}/search/photos",
+                        params={
+                            'query': self._unsplash_query(word),
+                            'per_page': 1,
+                            'orientation': 'landscape'
+                        },
+                        headers={
+                            'Authorization': f'Client-ID {settings.UNSPLASH_ACCESS_KEY}'
+                        },
+                        timeout=10
+                    )
+                    call.error = response.status_code != 200
+                
+                if response.status_code == 200:
+                    data = response.json()
+                    if data['results']:
+                        return self._unsplash_result(data['results'][0])
+            
+            return self._get_fallback_image(word)
+            
+        except Exception as e:
+            logger.error(f"Unsplash image fetch failed for '{word}': {str(e)}")
+            return self._get_fallback_image(word)
+    
     def _generate_with_dalle(self, word, etymology_context):
         """
         Generate image using DALL-E.
@@ -252,13 +326,15 @@ class ImageGenerationService:
         try:
             prompt = self._build_image_prompt(word, etymology_context)
             
-            response = self.openai_client.images.generate(
-                model="dall-e-3",
-                prompt=prompt,
-                size="1024x1024",
-                quality="standard",
-                n=1,
-            )
+            with metrics.provider_call('dalle', DALLE_MODEL) as call:
+                response = self.openai_client.images.generate(
+                    model=DALLE_MODEL,
+                    prompt=prompt,
+                    size="1024x1024",
+                    quality="standard",
+                    n=1,
+                )
+                call.cost = DALLE_IMAGE_COST_USD
             
             image_url = response.data[0].url
             
@@ -276,7 +352,7 @@ class ImageGenerationService:
                 'source': 'dalle',
                 'metadata': {
                     'prompt': prompt,
-                    'model': 'dall-e-3'
+                    'model': DALLE_MODEL
                 }
             }
             
@@ -292,22 +368,11 @@ class ImageGenerationService:
         Get image from Unsplash as fallback.
         """
         try:
-            # Define search queries for common etymology words
-            search_queries = {
-                'filosofia': 'ancient greek philosophy marble statue',
-                'democracia': 'ancient greek agora columns democracy',
-                'biblioteca': 'ancient library alexandria scrolls books',
-                'psicologia': 'human brain psychology mind consciousness',
-                'tecnologia': 'ancient tools craftsmanship engineering',
-                'nostalgia': 'vintage sepia memories old photographs'
-            }
-            
-            query = search_queries.get(word.lower(), f'ancient manuscript {word.lower()}')
-            
             if settings.UNSPLASH_ACCESS_KEY:
-                url = f"https://api.unsplash.com/search/photos"
+                import requests
+                url = f"{settings.UNSPLASH_API_URL}/search/photos"
                 params = {
-                    'query': query,
+                    'query': self._unsplash_query(word),
                     'per_page': 1,
                     'orientation': 'landscape'
                 }
@@ -315,23 +380,14 @@ class ImageGenerationService:
                     'Authorization': f'Client-ID {settings.UNSPLASH_ACCESS_KEY}'
                 }
                 
-                response = requests.get(url, params=params, headers=headers, timeout=10)
+                with metrics.provider_call('unsplash') as call:
+                    response = requests.get(url, params=params, headers=headers, timeout=10)
+                    call.error = response.status_code != 200
                 
                 if response.status_code == 200:
                     data = response.json()
                     if data['results']:
-                        photo = data['results'][0]
-                        return {
-                            'success': True,
-                            'image_url': photo['urls']['regular'],
-                            'thumbnail_url': photo['urls']['small'],
-                            'source': 'unsplash',
-                            'attribution': {
-                                'photographer': photo['user']['name'],
-                                'username': photo['user']['username'],
-                                'profile_url': photo['user']['links']['html']
-                            }
-                        }
+                        return self._unsplash_result(data['results'][0])
             
             # Final fallback to static images
             return self._get_fallback_image(word)
@@ -340,6 +396,31 @@ class ImageGenerationService:
             logger.error(f"Unsplash image fetch failed for '{word}': {str(e)}")
             return self._get_fallback_image(word)
     
+    def _unsplash_query(self, word):
+        # Define search queries for common etymology words
+        search_queries = {
+            'filosofia': 'ancient greek philosophy marble statue',
+            'democracia': 'ancient greek agora columns democracy',
+            'biblioteca': 'ancient library alexandria scrolls books',
+            'psicologia': 'human brain psychology mind consciousness',
+            'tecnologia': 'ancient tools craftsmanship engineering',
+            'nostalgia': 'vintage sepia memories old photographs'
+        }
+        return search_queries.get(word.lower(), f'ancient manuscript {word.lower()}')
+    
+    def _unsplash_result(self, photo):
+        return {
+            'success': True,
+            'image_url': photo['urls']['regular'],
+            'thumbnail_url': photo['urls']['small'],
+            'source': 'unsplash',
+            'attribution': {
+                'photographer': photo['user']['name'],
+                'username': photo['user']['username'],
+                'profile_url': photo['user']['links']['html']
+            }
+        }
+    
     def _get_fallback_image(self, word):
         """
         Get fallback static image.
@@ -403,5 +484,18 @@ class ImageGenerationService:
                 success=success,
                 error_message=error_message
             )
+        except Exception as e:
+            logger.error(f"Failed to log API usage: {str(e)}")
+    
+    async def _alog_api_usage(self, endpoint, request_data, response_data, success=True, error_message=''):
+        try:
+            await APIUsage.objects.acreate(
+                service='openai',
+                endpoint=endpoint,
+                request_data=request_data,
+                response_data=response_data,
+                success=success,
+                error_message=error_message
+            )
         except Exception as e:
             logger.error(f"Failed to log API usage: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,15 @@
+"""
+Periodic etymology jobs, scheduled in ``veritas_radix.celery``.
+"""
+import logging
+from celery import shared_task
+from apps.core.warmup import warm_analyses
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def warm_popular_analyses():
+    stored = warm_analyses()
+    logger.info(f"Warmed {stored} etymology analyses")
+    return stored
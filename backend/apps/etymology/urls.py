@@ -1,27 +1,22 @@
 """
 Etymology URLs for Veritas Radix application.
 """
-from django.urls import path, include
-from rest_framework.routers import DefaultRouter
+from django.urls import path
 from .views import (
-    EtymologyAnalysisViewSet,
-    ImageGenerationViewSet,
-    BookmarkViewSet,
     analyze_etymology,
-    featured_words
+    generate_image,
+    featured_words,
+    bookmarks,
+    analysis_detail,
+    word_origin_detail
 )
 
-# Create router and register viewsets
-router = DefaultRouter()
-router.register(r'analyses', EtymologyAnalysisViewSet, basename='etymology-analysis')
-router.register(r'images', ImageGenerationViewSet, basename='image-generation')
-router.register(r'bookmarks', BookmarkViewSet, basename='bookmarks')
-
 urlpatterns = [
     # Custom endpoints for frontend compatibility
     path('analyze/', analyze_etymology, name='analyze-etymology'),
+    path('generate-image/', generate_image, name='generate-image'),
     path('featured/', featured_words, name='featured-words'),
-    
-    # Include router URLs
-    path('', include(router.urls)),
-]
\ No newline at end of file
+    path('bookmarks/', bookmarks, name='bookmarks'),
+    path('analyses/<int:pk>/', analysis_detail, name='analysis-detail'),
+    path('words/<str:word>/', word_origin_detail, name='word-origin-detail'),
+]
@@ -2,101 +2,261 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
-import google.generativeai as genai
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef, Q
+from django.shortcuts import get_object_or_404
 from django.utils.html import escape
+from apps.analytics.events import record_activity
+from apps.core import response_cache
+from apps.core.async_api import async_api_view
+from apps.core.db_router import replica_reads
+from apps.core.models import WordOrigin
+from apps.core.renderers import JsonResponse
+from .budget import TokenBudget, PRIORITY_INTERACTIVE
+from .hedging import get_etymology_generator
+from .models import EtymologyAnalysis, EtymologyBookmark
+from .serializers import EtymologyAnalysisSerializer, WordOriginSerializer
+from .services import ImageGenerationService
+from . import knowledge_base, prompts
 import json
 import re
 
 
-@api_view(['POST'])
-@permission_classes([IsAuthenticated])
-def analyze_etymology(request):
-    """Analyze word etymology using Gemini API."""
-    word = request.data.get('word', '').strip()
+def _clean_word(data):
+    """Return ``(word, error)`` for the ``word`` field of a request body."""
+    word = str(data.get('word', '')).strip()
     
     if not word:
-        return Response(
-            {'error': 'Word parameter required'}, 
-            status=status.HTTP_400_BAD_REQUEST
-        )
+        return None, 'Word parameter required'
     
     # Sanitize and validate input
     word = escape(word)
     if not re.match(r'^[a-zA-ZÀ-ſ\s-]{1,50}$', word):
-        return Response(
-            {'error': 'Invalid word format'}, 
-            status=status.HTTP_400_BAD_REQUEST
+        return None, 'Invalid word format'
+    return word, None
+
+
+def _analysis_cache_key(word, template):
+    # Per prompt version: a new prompt never serves answers to the old one
+    return f"etymology_analysis:{template.key}:{knowledge_base.normalize_word(word)}"
+
+
+@async_api_view(['POST'], throttle_scope='gemini_api')
+async def analyze_etymology(request):
+    """
+    Analyze word etymology using Gemini API.
+    
+    Async so a worker can hold many slow provider calls at once: providers
+    stream over non-blocking HTTP and the cache is accessed asynchronously.
+    """
+    word, error = _clean_word(request.data)
+    if error:
+        return JsonResponse({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+    
+    # Offline knowledge base first: no provider call for known words
+    entry = knowledge_base.lookup(word)
+    if entry is not None:
+        await sync_to_async(record_activity)(
+            request.user, 'analysis_completed', {'word': word, 'source': 'knowledge_base'}
         )
+        return JsonResponse({
+            'success': True,
+            'data': {
+                'word': word,
+                **_analysis_from_entry(entry)
+            },
+            'source': 'knowledge_base'
+        })
+    
+    template = prompts.select('analysis_summary', knowledge_base.normalize_word(word))
+    cache_key = _analysis_cache_key(word, template)
+    cached = await cache.aget(cache_key)
+    if cached is not None:
+        await sync_to_async(record_activity)(
+            request.user, 'analysis_completed', {'word': word, 'source': 'cache'}
+        )
+        return JsonResponse(cached)
     
     try:
-        # Configure Gemini
-        genai.configure(api_key=settings.GEMINI_API_KEY)
-        model = genai.GenerativeModel('gemini-pro')
-        
-        prompt = f"""
-        Analise a etimologia da palavra "{word}" em português, fornecendo:
-        1. Origem e evolução histórica
-        2. Raízes linguísticas (latim, grego, etc.)
-        3. Morfologia (prefixos, radicais, sufixos)
-        4. Palavras relacionadas
-        5. Significado atual e evolução semântica
+        generator = get_etymology_generator()
+        prompt = template.render(word=word)
         
-        Formate a resposta como JSON com as chaves: origem, raizes, morfologia, relacionadas, significado.
-        """
+        budget = TokenBudget(generator.primary.service)
+        ticket = await budget.aacquire(prompt, priority=PRIORITY_INTERACTIVE)
+        if not ticket['admitted']:
+            return JsonResponse(
+                {'error': 'Service busy, please try again shortly'},
+                status=status.HTTP_429_TOO_MANY_REQUESTS,
+                headers={'Retry-After': str(ticket['retry_after'])}
+            )
         
-        response = model.generate_content(prompt)
-        
-        # Try to parse as JSON, fallback to structured text
-        try:
-            raw_analysis = json.loads(response.text)
-        except:
-            raw_analysis = {
-                'origem': response.text[:200] + '...',
-                'raizes': 'Análise em desenvolvimento',
-                'morfologia': 'Análise morfológica em desenvolvimento',
-                'relacionadas': ['palavras', 'relacionadas'],
-                'significado': 'Significado atual da palavra'
-            }
-        
-        # Convert to frontend-expected format
-        analysis = {
-            'etymology': {
-                'origin': raw_analysis.get('origem', ''),
-                'originalForm': raw_analysis.get('raizes', ''),
-                'meaning': raw_analysis.get('significado', ''),
-                'evolution': raw_analysis.get('origem', '')
-            },
-            'morphology': {
-                'prefix': '',
-                'root': raw_analysis.get('raizes', ''),
-                'suffix': '',
-                'explanation': raw_analysis.get('morfologia', '')
-            },
-            'relatedWords': [
-                {'word': w, 'relationship': 'related', 'explanation': ''} 
-                for w in (raw_analysis.get('relacionadas', []) if isinstance(raw_analysis.get('relacionadas'), list) else [])
-            ],
-            'historicalContext': raw_analysis.get('origem', ''),
-            'curiosities': [raw_analysis.get('significado', '')]
-        }
+        # The generator reconciles the ticket, also on failure or disconnect
+        response = await generator.agenerate(
+            prompt,
+            endpoint='analyze_etymology',
+            request_data={'word': word, 'prompt_version': template.key},
+            ticket=ticket
+        )
         
-        return Response({
+        payload = {
             'success': True,
             'data': {
                 'word': word,
-                **analysis
+                **_analysis_from_response(response['text'])
             },
-            'rawResponse': response.text
-        })
+            'rawResponse': response['text']
+        }
+        await cache.aset(cache_key, payload, settings.CACHE_TTL['ETYMOLOGY_ANALYSIS'])
+        
+        await sync_to_async(record_activity)(
+            request.user, 'analysis_completed', {'word': word, 'source': response['model']}
+        )
+        return JsonResponse(payload)
         
     except Exception as e:
-        return Response(
+        return JsonResponse(
             {'error': f'Error analyzing word: {str(e)}'}, 
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
 
+def _analysis_from_response(text):
+    """Convert a provider response to the frontend-expected format."""
+    # Try to parse as JSON, fallback to structured text
+    try:
+        raw_analysis = json.loads(text)
+    except:
+        raw_analysis = {
+            'origem': text[:200] + '...',
+            'raizes': 'Análise em desenvolvimento',
+            'morfologia': 'Análise morfológica em desenvolvimento',
+            'relacionadas': ['palavras', 'relacionadas'],
+            'significado': 'Significado atual da palavra'
+        }
+    
+    return {
+        'etymology': {
+            'origin': raw_analysis.get('origem', ''),
+            'originalForm': raw_analysis.get('raizes', ''),
+            'meaning': raw_analysis.get('significado', ''),
+            'evolution': raw_analysis.get('origem', '')
+        },
+        'morphology': {
+            'prefix': '',
+            'root': raw_analysis.get('raizes', ''),
+            'suffix': '',
+            'explanation': raw_analysis.get('morfologia', '')
+        },
+        'relatedWords': [
+            {'word': w, 'relationship': 'related', 'explanation': ''} 
+            for w in (raw_analysis.get('relacionadas', []) if isinstance(raw_analysis.get('relacionadas'), list) else [])
+        ],
+        'historicalContext': raw_analysis.get('origem', ''),
+        'curiosities': [raw_analysis.get('significado', '')]
+    }
+
+
+@async_api_view(['POST'], throttle_scope='dalle_api')
+async def generate_image(request):
+    """Generate (or find) an illustration for a word's etymology."""
+    word, error = _clean_word(request.data)
+    if error:
+        return JsonResponse({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+    
+    context = str(request.data.get('context', ''))[:500]
+    result = await ImageGenerationService().agenerate_etymology_image(word, context)
+    if not result['success']:
+        return JsonResponse(
+            {'error': f"Error generating image: {result['error']}"},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+    return JsonResponse(result)
+
+
+def _analysis_from_entry(entry):
+    """Convert a knowledge base entry to the frontend-expected format."""
+    return {
+        'etymology': {
+            'origin': entry['original_language'],
+            'originalForm': entry['original_form'],
+            'meaning': entry['root_meaning'],
+            'evolution': entry['etymology_explanation']
+        },
+        'morphology': {
+            'prefix': entry['prefix'],
+            'root': entry['root'],
+            'suffix': entry['suffix'],
+            'explanation': entry['etymology_explanation']
+        },
+        'relatedWords': [
+            {'word': w, 'relationship': 'related', 'explanation': ''}
+            for w in entry['related_words']
+        ],
+        'historicalContext': entry['historical_context'],
+        'curiosities': [entry['modern_usage']] if entry['modern_usage'] else []
+    }
+
+
+def _analysis_representations(pk):
+    """Both ``is_bookmarked`` variants of a completed analysis, or None."""
+    analysis = EtymologyAnalysis.objects.filter(pk=pk, status='completed').first()
+    if analysis is None:
+        return None
+    # Serialized once without a request; the per-user bit is set per variant
+    data = EtymologyAnalysisSerializer(analysis).data
+    return {bookmarked: {**data, 'is_bookmarked': bookmarked} for bookmarked in (False, True)}
+
+
+@async_api_view(['GET'])
+async def analysis_detail(request, pk):
+    """
+    A completed analysis of the user's own or a public one, served from
+    the response cache.
+    
+    A hit costs one query (access check plus bookmark lookup) and one cache
+    read: the encoded and compressed bodies are shared by every user.
+    """
+    bookmarked = await (
+        EtymologyAnalysis.objects
+        .filter(Q(user=request.user) | Q(is_public=True), pk=pk, status='completed')
+        .annotate(bookmarked=Exists(
+            EtymologyBookmark.objects.filter(user=request.user, analysis=OuterRef('pk'))
+        ))
+        .values_list('bookmarked', flat=True)
+        .afirst()
+    )
+    if bookmarked is None:
+        return JsonResponse({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+    
+    entry = await response_cache.aget_or_build(
+        'etymology_analysis', pk, lambda: _analysis_representations(pk)
+    )
+    if entry is None:
+        return JsonResponse({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+    return response_cache.respond(request, entry[bookmarked])
+
+
+def _word_origin_representations(word):
+    origin = WordOrigin.objects.filter(word=word).first()
+    if origin is None:
+        return None
+    return {'default': WordOriginSerializer(origin).data}
+
+
+@async_api_view(['GET'])
+async def word_origin_detail(request, word):
+    """A dictionary entry, served from the response cache."""
+    word = knowledge_base.normalize_word(word)
+    entry = await response_cache.aget_or_build(
+        'word_origin', word, lambda: _word_origin_representations(word)
+    )
+    if entry is None:
+        return JsonResponse({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+    return response_cache.respond(request, entry['default'])
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def featured_words(request):
@@ -119,4 +279,49 @@ def featured_words(request):
         }
     ]
     
-    return Response({'featured_words': words})
\ No newline at end of file
+    return Response({'featured_words': words})
+
+
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated])
+@replica_reads
+def bookmarks(request):
+    """List the user's bookmarked analyses, or bookmark one."""
+    if request.method == 'POST':
+        try:
+            analysis_id = int(request.data.get('analysis_id'))
+        except (TypeError, ValueError):
+            return Response(
+                {'error': 'analysis_id must be an integer'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        analysis = get_object_or_404(EtymologyAnalysis, pk=analysis_id)
+        bookmark, created = EtymologyBookmark.objects.get_or_create(
+            user=request.user,
+            analysis=analysis,
+            defaults={'notes': str(request.data.get('notes', ''))}
+        )
+        return Response(
+            _bookmark_payload(bookmark),
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        )
+    
+    queryset = EtymologyBookmark.objects.filter(user=request.user).select_related('analysis')
+    return Response({'bookmarks': [_bookmark_payload(bookmark) for bookmark in queryset]})
+
+
+BOOKMARK_ANALYSIS_FIELDS = [
+    'id', 'word', 'status', 'original_language', 'original_form', 'root',
+    'root_meaning', 'etymology_explanation', 'related_words', 'confidence_score',
+    'created_at'
+]
+
+
+def _bookmark_payload(bookmark):
+    return {
+        'id': bookmark.id,
+        'notes': bookmark.notes,
+        'created_at': bookmark.created_at,
+        'analysis': {field: getattr(bookmark.analysis, field) for field in BOOKMARK_ANALYSIS_FIELDS},
+    }
\ No newline at end of file
@@ -0,0 +1,41 @@
+"""
+Per-request middleware cost.
+"""
+import itertools
+import pytest
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory
+from apps.core.middleware import RateLimitMiddleware
+
+CLIENTS = 250
+
+
+@pytest.fixture
+def middleware():
+    cache.clear()
+    return RateLimitMiddleware(lambda request: HttpResponse())
+
+
+def bench_rate_limit_allowed(benchmark, middleware):
+    request = RequestFactory().get('/api/etymology/featured/')
+    counter = itertools.count()
+
+    def call():
+        # Rotate addresses and reset now and then: stays under the limit and
+        # below the cache's cull threshold, so every call takes the same path
+        index = next(counter) % CLIENTS
+        if index == 0:
+            cache.clear()
+        request.META['REMOTE_ADDR'] = f'10.0.{index >> 8}.{index & 255}'
+        return middleware(request)
+
+    assert benchmark(call).status_code == 200
+
+
+def bench_rate_limit_rejected(benchmark, middleware):
+    request = RequestFactory().get('/api/etymology/featured/', REMOTE_ADDR='10.0.0.1')
+    for _ in range(100):
+        middleware(request)
+
+    assert benchmark(middleware, request).status_code == 429
@@ -0,0 +1,29 @@
+"""
+Provider response parsing and the analyze view's response-shape conversion.
+"""
+import pytest
+from apps.etymology.services import GeminiEtymologyService
+from apps.etymology.views import _analysis_from_entry, _analysis_from_response
+
+
+@pytest.fixture
+def service():
+    # Parsing needs no provider client; skip building the generator
+    return GeminiEtymologyService.__new__(GeminiEtymologyService)
+
+
+@pytest.mark.parametrize('shape', ['plain', 'fenced', 'invalid'])
+def bench_parse_etymology_response(benchmark, service, gemini_responses, shape):
+    result = benchmark(service._parse_etymology_response, gemini_responses[shape], 'filosofia')
+    assert result['word'] == 'filosofia'
+
+
+@pytest.mark.parametrize('shape', ['json', 'text'])
+def bench_analysis_from_response(benchmark, analyze_responses, shape):
+    result = benchmark(_analysis_from_response, analyze_responses[shape])
+    assert 'etymology' in result
+
+
+def bench_analysis_from_entry(benchmark, knowledge_base_entry):
+    result = benchmark(_analysis_from_entry, knowledge_base_entry)
+    assert result['morphology']['root'] == 'sophia'
@@ -0,0 +1,45 @@
+"""
+Response rendering and compression: serialization CPU and bytes on the wire.
+
+Each renderer runs on the same payloads, DRF's ``JSONRenderer`` being the
+"before"; ``benchmark.extra_info['bytes']`` records the body size, which
+``manage.py benchmark`` reports next to the timings.
+"""
+import pytest
+from rest_framework.renderers import JSONRenderer
+from apps.core import compression
+from apps.core.renderers import OrjsonRenderer
+from apps.etymology.serializers import EtymologyAnalysisSerializer
+from .conftest import KNOWLEDGE_BASE_ENTRY
+
+RENDERERS = {'drf': JSONRenderer, 'orjson': OrjsonRenderer}
+
+
+@pytest.fixture
+def analysis_list_data(analysis_list, authenticated_request):
+    _, analyses = analysis_list
+    return EtymologyAnalysisSerializer(analyses, many=True, context={'request': authenticated_request}).data
+
+
+@pytest.mark.parametrize('renderer', list(RENDERERS))
+def bench_render_analysis(benchmark, renderer):
+    content = benchmark(RENDERERS[renderer]().render, KNOWLEDGE_BASE_ENTRY)
+    benchmark.extra_info['bytes'] = len(content)
+
+
+@pytest.mark.parametrize('renderer', list(RENDERERS))
+def bench_render_analysis_list(benchmark, analysis_list_data, renderer):
+    content = benchmark(RENDERERS[renderer]().render, analysis_list_data)
+    benchmark.extra_info['bytes'] = len(content)
+
+
+@pytest.mark.parametrize('encoding', ['identity', 'gzip', 'br'])
+def bench_compress_analysis_list(benchmark, analysis_list_data, encoding):
+    if encoding != 'identity' and encoding not in compression.available_encodings():
+        pytest.skip(f'{encoding} is not available')
+    content = OrjsonRenderer().render(analysis_list_data)
+    if encoding == 'identity':
+        compressed = benchmark(bytes, content)
+    else:
+        compressed = benchmark(compression.compress, content, encoding)
+    benchmark.extra_info['bytes'] = len(compressed)
@@ -0,0 +1,19 @@
+"""
+Analysis list serialization, including the per-item bookmark lookups.
+"""
+import pytest
+from apps.etymology.serializers import EtymologyAnalysisSerializer
+
+
+@pytest.mark.parametrize('size', [20, 100])
+def bench_analysis_serializer_list(benchmark, analysis_list, authenticated_request, size):
+    _, analyses = analysis_list
+    analyses = analyses[:size]
+
+    def serialize():
+        return EtymologyAnalysisSerializer(
+            analyses, many=True, context={'request': authenticated_request}
+        ).data
+
+    data = benchmark(serialize)
+    assert len(data) == size
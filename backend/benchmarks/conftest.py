@@ -0,0 +1,95 @@
+"""
+Fixed fixtures for the micro-benchmarks.
+
+Everything is built deterministically so runs on the same machine are
+comparable with the stored baseline (``manage.py benchmark``).
+"""
+import json
+import pytest
+from rest_framework.test import APIRequestFactory, force_authenticate
+from apps.authentication.models import User
+from apps.etymology.models import EtymologyAnalysis, EtymologyBookmark
+
+ANALYSIS_COUNT = 100
+
+GEMINI_ANALYSIS = {
+    'word': 'filosofia',
+    'original_language': 'Grego Antigo',
+    'original_form': 'φιλοσοφία',
+    'transliteration': 'philosophía',
+    'prefix': 'philo-',
+    'prefix_meaning': 'amigo, amante',
+    'root': 'sophia',
+    'root_meaning': 'sabedoria',
+    'suffix': '-ia',
+    'suffix_meaning': 'qualidade, estado',
+    'etymology_explanation': 'Composto de philos (amigo) e sophia (sabedoria). ' * 12,
+    'historical_context': 'Termo atribuído a Pitágoras, difundido por Platão. ' * 8,
+    'modern_usage': 'Disciplina que investiga questões fundamentais. ' * 4,
+    'related_words': ['filósofo', 'filosófico', 'sofisma', 'sofista', 'filantropia', 'filologia'],
+    'confidence_score': 0.95,
+}
+
+ANALYZE_RESPONSE = {
+    'origem': 'Do grego philosophía, pelo latim philosophia. ' * 6,
+    'raizes': 'philo- (amor) + sophia (sabedoria)',
+    'morfologia': 'Prefixo philo-, raiz soph-, sufixo -ia',
+    'relacionadas': ['filósofo', 'filosófico', 'sofisma', 'filantropia'],
+    'significado': 'Estudo das questões fundamentais da existência.',
+}
+
+KNOWLEDGE_BASE_ENTRY = {
+    **GEMINI_ANALYSIS,
+    'source': 'analysis',
+}
+
+
+@pytest.fixture
+def gemini_responses():
+    """Provider outputs in the shapes the parser meets: plain, fenced and broken JSON."""
+    text = json.dumps(GEMINI_ANALYSIS, ensure_ascii=False, indent=2)
+    return {
+        'plain': text,
+        'fenced': f"```json\n{text}\n```",
+        'invalid': text[:len(text) // 2],
+    }
+
+
+@pytest.fixture
+def analyze_responses():
+    text = json.dumps(ANALYZE_RESPONSE, ensure_ascii=False)
+    return {'json': text, 'text': text.replace('{', '').replace('}', '')}
+
+
+@pytest.fixture
+def knowledge_base_entry():
+    return dict(KNOWLEDGE_BASE_ENTRY)
+
+
+@pytest.fixture
+def analysis_list(db):
+    """A user with ``ANALYSIS_COUNT`` completed analyses, every other one bookmarked."""
+    user = User.objects.create_user(email='bench@example.com', username='bench', password='bench')
+    EtymologyAnalysis.objects.bulk_create([
+        EtymologyAnalysis(
+            word=f'palavra{index:03d}',
+            user=user,
+            status='completed',
+            **{field: value for field, value in GEMINI_ANALYSIS.items() if field != 'word'},
+        )
+        for index in range(ANALYSIS_COUNT)
+    ])
+    analyses = list(EtymologyAnalysis.objects.filter(user=user).order_by('word'))
+    EtymologyBookmark.objects.bulk_create([
+        EtymologyBookmark(user=user, analysis=analysis) for analysis in analyses[::2]
+    ])
+    return user, analyses
+
+
+@pytest.fixture
+def authenticated_request(analysis_list):
+    user, _ = analysis_list
+    request = APIRequestFactory().get('/api/etymology/analyses/')
+    force_authenticate(request, user=user)
+    request.user = user
+    return request
@@ -0,0 +1,22 @@
+"""
+Settings for the micro-benchmarks.
+
+Local in-memory backends, so results depend only on the code under test.
+"""
+from veritas_radix.settings import *  # noqa: F401,F403
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    }
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Fixture users are created per test; real hashing would dominate setup
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
@@ -1,4 +1,6 @@
 #!/bin/bash
 pip install -r requirements.txt
 python manage.py collectstatic --noinput
-python manage.py migrate
\ No newline at end of file
+python manage.py migrate
+python manage.py manage_activity_partitions --convert
+python manage.py build_knowledge_base
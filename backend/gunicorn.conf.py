@@ -0,0 +1,83 @@
+"""
+Gunicorn configuration for production.
+
+The application is imported once in the master (``preload_app``), so workers
+fork with Django, the URLconf and the provider SDKs already loaded and share
+those pages copy-on-write. Each worker then opens its own connections and
+clients (``post_worker_init``) before it accepts traffic.
+
+Workers are uvicorn (ASGI) workers serving ``veritas_radix.asgi``: the async
+etymology views wait on providers on the event loop, and sync views run in
+a thread pool sized by ``ASGI_THREADS``.
+
+Prometheus metrics run in multiprocess mode: every worker writes samples to
+``PROMETHEUS_MULTIPROC_DIR`` and ``/metrics`` merges them. The directory is
+emptied when the master starts; files of recycled workers stay, so their
+counts are kept, and ``child_exit`` drops their live gauges.
+"""
+import os
+import time
+import shutil
+import tempfile
+import multiprocessing
+
+_boot_started = time.monotonic()  # this file is read before the app is imported
+
+# Must be set before prometheus_client is imported by the preloaded app
+_metrics_dir = os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'veritas-radix-metrics')
+)
+shutil.rmtree(_metrics_dir, ignore_errors=True)
+os.makedirs(_metrics_dir)
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+preload_app = True
+
+# LLM calls take seconds; an event loop holds hundreds of them per worker.
+# GUNICORN_WORKER_CLASS=gthread serves veritas_radix.wsgi the old way.
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'uvicorn.workers.UvicornWorker')
+workers = int(os.environ.get('WEB_CONCURRENCY', min(multiprocessing.cpu_count() * 2 + 1, 8)))
+threads = int(os.environ.get('GUNICORN_THREADS', '4'))  # gthread only
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '60'))
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers now and then to bound memory growth
+max_requests = 2000
+max_requests_jitter = 200
+
+accesslog = '-'
+errorlog = '-'
+
+
+def when_ready(server):
+    from apps.core.warmup import preload_modules
+    preload_modules()
+    server.log.info(f"Master ready in {time.monotonic() - _boot_started:.2f}s (application preloaded)")
+
+
+def post_fork(server, worker):
+    # Anything opened while preloading belongs to the master; never share sockets
+    from django.core.cache import caches
+    from django.db import connections
+    connections.close_all()
+    caches.close_all()
+    worker.forked_at = time.monotonic()
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def post_worker_init(worker):
+    if os.environ.get('WARMUP_ON_BOOT', 'True').lower() == 'true':
+        from apps.core.warmup import warm_up
+        timings = warm_up()
+        breakdown = ', '.join(f"{step}={ms:.0f}ms" for step, ms in timings.items())
+    else:
+        breakdown = 'warm-up disabled'
+    worker.log.info(
+        f"Worker {worker.pid} ready in {time.monotonic() - worker.forked_at:.2f}s after fork, "
+        f"{time.monotonic() - _boot_started:.2f}s after boot ({breakdown})"
+    )
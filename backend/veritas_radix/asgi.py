@@ -0,0 +1,18 @@
+"""
+ASGI config for veritas_radix project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Served by uvicorn workers under gunicorn, so the async etymology views can
+hold many slow provider calls per worker.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'veritas_radix.settings')
+
+application = get_asgi_application()
@@ -0,0 +1,39 @@
+"""
+Celery app for ``celery -A veritas_radix worker`` and ``beat``.
+
+Periodic maintenance runs from ``beat_schedule``; the tasks live in each
+app's ``tasks.py``. Web processes only enqueue roster imports, so they
+import the app when they do rather than on boot.
+"""
+import os
+from celery import Celery
+from celery.schedules import crontab
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'veritas_radix.settings')
+
+app = Celery('veritas_radix')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
+
+app.conf.beat_schedule = {
+    # Hourly counters expire from Redis after 48h without a flush
+    'flush-word-analytics': {
+        'task': 'apps.analytics.tasks.flush_word_analytics',
+        'schedule': crontab(minute=5),
+    },
+    # Repairs drift in the incrementally maintained class progress
+    'reconcile-turma-progress': {
+        'task': 'apps.authentication.tasks.reconcile_turma_progress',
+        'schedule': crontab(hour=3, minute=30),
+    },
+    # Creates the coming months' UserActivity partitions, drops expired ones
+    'manage-activity-partitions': {
+        'task': 'apps.analytics.tasks.manage_activity_partitions',
+        'schedule': crontab(day_of_month=1, hour=2, minute=0),
+    },
+    # Warming priority: shed by the token budget whenever interactive traffic needs it
+    'warm-popular-analyses': {
+        'task': 'apps.etymology.tasks.warm_popular_analyses',
+        'schedule': crontab(minute=20),
+    },
+}
@@ -2,6 +2,7 @@
 Django settings for Veritas Radix project.
 """
 import os
+import tempfile
 from pathlib import Path
 from datetime import timedelta
 import dj_database_url
@@ -56,9 +57,13 @@ LOCAL_APPS = [
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
 
 MIDDLEWARE = [
+    'apps.core.middleware.MetricsMiddleware',
+    'apps.core.middleware.RequestProfilingMiddleware',
+    'apps.core.middleware.CompressionMiddleware',
+    'apps.core.middleware.ReplicaPinningMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'apps.core.staticfiles.AsyncWhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -89,9 +94,19 @@ TEMPLATES = [
 WSGI_APPLICATION = 'veritas_radix.wsgi.application'
 
 # Database
+# Connections are closed after each request by default: under ASGI each
+# request runs its sync ORM code in its own thread context, so persistent
+# connections are never reused and pile up. Pool with pgbouncer (point
+# DATABASE_URL at it) instead of raising this.
+DB_CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', '0'))
+
 if os.environ.get('DATABASE_URL'):
     DATABASES = {
-        'default': dj_database_url.parse(os.environ.get('DATABASE_URL'))
+        'default': dj_database_url.parse(
+            os.environ.get('DATABASE_URL'),
+            conn_max_age=DB_CONN_MAX_AGE,
+            conn_health_checks=True
+        )
     }
 else:
     DATABASES = {
@@ -102,13 +117,48 @@ else:
             'PASSWORD': os.environ.get('DB_PASSWORD', 'postgres'),
             'HOST': os.environ.get('DB_HOST', 'localhost'),
             'PORT': os.environ.get('DB_PORT', '5432'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
         }
     }
 
+# Read replicas (comma-separated URLs) for list, search, leaderboard and
+# dashboard reads; see apps.core.db_router
+DATABASE_REPLICAS = []
+for index, url in enumerate(filter(None, os.environ.get('DATABASE_REPLICA_URLS', '').split(',')), start=1):
+    DATABASES[f'replica{index}'] = dj_database_url.parse(
+        url.strip(),
+        conn_max_age=DB_CONN_MAX_AGE,
+        conn_health_checks=True,
+        test_options={'MIRROR': 'default'}
+    )
+    if 'postgresql' in DATABASES[f'replica{index}']['ENGINE']:
+        # A replica that is down must fail fast, not hang the request
+        DATABASES[f'replica{index}'].setdefault('OPTIONS', {}).setdefault(
+            'connect_timeout', int(os.environ.get('REPLICA_CONNECT_TIMEOUT', '2'))
+        )
+    DATABASE_REPLICAS.append(f'replica{index}')
+DATABASE_ROUTERS = ['apps.core.db_router.ReplicaRouter']
+REPLICA_ROUTING = {
+    'MAX_LAG_SECONDS': float(os.environ.get('REPLICA_MAX_LAG_SECONDS', '5')),
+    'STICKY_SECONDS': int(os.environ.get('REPLICA_STICKY_SECONDS', '10')),  # primary reads after a user's write
+    'CHECK_INTERVAL_SECONDS': float(os.environ.get('REPLICA_CHECK_INTERVAL_SECONDS', '5')),
+}
+
 # Cache configuration
 if os.environ.get('REDIS_URL'):
     CACHES = {
         'default': {
+            'BACKEND': 'apps.core.cache_backends.TieredCache',  # per-process LRU in front of 'shared'
+            'LOCATION': 'shared',
+            'OPTIONS': {
+                'LOCAL_MAX_ENTRIES': int(os.environ.get('CACHE_LOCAL_MAX_ENTRIES', '2048')),
+                'LOCAL_TIMEOUT': int(os.environ.get('CACHE_LOCAL_TIMEOUT', '60')),  # seconds
+                # Counters, locks and latency samples shared between workers are always read from Redis
+                'LOCAL_EXCLUDE': ['rate_limit', 'llm_budget', 'last_activity', 'leaderboard', 'warmup', 'db_sticky', 'llm_latency'],
+            }
+        },
+        'shared': {
             'BACKEND': 'django_redis.cache.RedisCache',
             'LOCATION': os.environ.get('REDIS_URL'),
             'OPTIONS': {
@@ -117,9 +167,13 @@ if os.environ.get('REDIS_URL'):
         }
     }
 else:
+    # One cache per process: invalidations only reach the worker that made them
     CACHES = {
         'default': {
-            'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+            'BACKEND': 'apps.core.cache_backends.LocMemCache',
+            'OPTIONS': {
+                'MAX_ENTRIES': int(os.environ.get('CACHE_LOCAL_MAX_ENTRIES', '2048')),
+            }
         }
     }
 
@@ -160,14 +214,19 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.authentication.authentication.CachedJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'apps.core.renderers.OrjsonRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'apps.core.parsers.OrjsonParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
@@ -196,6 +255,16 @@ SIMPLE_JWT = {
     'BLACKLIST_AFTER_ROTATION': True,
 }
 
+# Authenticated users are resolved from cache; last_activity is written at most once per interval
+AUTH_USER_CACHE_TTL = 60 * 5  # 5 minutes
+LAST_ACTIVITY_UPDATE_INTERVAL = 60 * 5  # 5 minutes
+
+# Processes used to hash passwords in ``manage.py import_roster`` and the roster import task
+ROSTER_HASH_WORKERS = int(os.environ.get('ROSTER_HASH_WORKERS', str(os.cpu_count() or 1)))
+# Uploads up to this size hash on the request (~0.3s per password); larger ones go to Celery
+ROSTER_SYNC_MAX_ROWS = int(os.environ.get('ROSTER_SYNC_MAX_ROWS', '5'))
+ROSTER_MAX_ROWS = int(os.environ.get('ROSTER_MAX_ROWS', '100'))
+
 # CORS settings
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -219,6 +288,66 @@ GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
 OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY')
 UNSPLASH_ACCESS_KEY = os.environ.get('UNSPLASH_ACCESS_KEY')
 
+# Provider endpoints (overridable to point at proxies or local fakes)
+GEMINI_API_BASE_URL = os.environ.get('GEMINI_API_BASE_URL', 'https://generativelanguage.googleapis.com')
+OPENAI_BASE_URL = os.environ.get('OPENAI_BASE_URL', 'https://api.openai.com/v1')
+UNSPLASH_API_URL = os.environ.get('UNSPLASH_API_URL', 'https://api.unsplash.com')
+PROVIDER_HTTP_TIMEOUT = 60  # seconds per async provider call
+
+# LLM token budget shared by all web and worker processes (per provider quota)
+LLM_TOKEN_BUDGET = {
+    'gemini': {
+        'TOKENS_PER_MINUTE': int(os.environ.get('GEMINI_TOKENS_PER_MINUTE', '32000')),
+        'REQUESTS_PER_MINUTE': int(os.environ.get('GEMINI_REQUESTS_PER_MINUTE', '60')),
+        'EXPECTED_OUTPUT_TOKENS': 800,
+    },
+}
+
+# Share of each window a priority may use; lower priorities are shed first
+LLM_PRIORITY_SHARE = {
+    'interactive': 1.0,
+    'batch': 0.6,
+    'warming': 0.4,
+}
+
+# Seconds a request may queue for budget before being rejected
+LLM_PRIORITY_MAX_WAIT = {
+    'interactive': 5,
+    'batch': 0,
+    'warming': 0,
+}
+
+LLM_TOKEN_ESTIMATE_SMOOTHING = 0.2
+
+# Hedged etymology analysis: SECONDARY ("service:model") is fired when PRIMARY
+# has not answered within PERCENTILE of its recent latency
+ETYMOLOGY_HEDGING = {
+    'ENABLED': os.environ.get('ETYMOLOGY_HEDGING', 'True').lower() == 'true',
+    'PRIMARY': os.environ.get('ETYMOLOGY_PRIMARY_MODEL', 'gemini:gemini-pro'),
+    'SECONDARY': os.environ.get('ETYMOLOGY_SECONDARY_MODEL', 'gemini:gemini-1.5-flash'),
+    'PERCENTILE': int(os.environ.get('ETYMOLOGY_HEDGE_PERCENTILE', '95')),
+    'DEFAULT_DELAY_MS': 8000,
+    'MIN_DELAY_MS': 1000,
+    'MAX_WORKERS': 16,
+}
+
+# Live version of each prompt template (apps.etymology.prompts); "v1=50,v2=50" splits words between versions
+PROMPT_VERSIONS = {
+    'analysis_summary': os.environ.get('PROMPT_VERSIONS_ANALYSIS_SUMMARY', 'v1'),
+    'analysis_detailed': os.environ.get('PROMPT_VERSIONS_ANALYSIS_DETAILED', 'v1'),
+}
+
+# Offline etymology knowledge base (built with `manage.py build_knowledge_base`)
+ETYMOLOGY_KNOWLEDGE_BASE_PATH = os.environ.get(
+    'ETYMOLOGY_KNOWLEDGE_BASE_PATH', str(BASE_DIR / 'data' / 'etymology_kb.sqlite3')
+)
+ETYMOLOGY_KNOWLEDGE_BASE_MMAP_SIZE = 256 * 1024 * 1024  # 256MB
+
+# UserActivity ingestion and monthly partitions (`manage.py manage_activity_partitions`)
+ACTIVITY_BATCH_MAX_EVENTS = 500
+ACTIVITY_PARTITIONS_AHEAD = 3  # months
+ACTIVITY_RETENTION_MONTHS = int(os.environ.get('ACTIVITY_RETENTION_MONTHS', '13'))
+
 # Email configuration
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = os.environ.get('EMAIL_HOST', 'smtp.gmail.com')
@@ -284,6 +413,7 @@ CACHE_TTL = {
     'WORD_SEARCH': 60 * 60,  # 1 hour
     'USER_STATS': 60 * 15,  # 15 minutes
     'FEATURED_WORDS': 60 * 60 * 6,  # 6 hours
+    'RESPONSE': 60 * 60 * 24,  # encoded responses, dropped on save (apps.core.response_cache)
 }
 
 # File upload settings
@@ -301,4 +431,31 @@ CELERY_RESULT_BACKEND = os.environ.get('CELERY_RESULT_BACKEND', 'redis://localho
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
-CELERY_TIMEZONE = TIME_ZONE
\ No newline at end of file
+CELERY_TIMEZONE = TIME_ZONE
+CELERY_METRICS_QUEUES = os.environ.get('CELERY_METRICS_QUEUES', 'celery').split(',')  # reported by /metrics
+
+# Prometheus metrics (/metrics): scrapers must send "Authorization: Bearer <token>";
+# without a token the endpoint is only served in DEBUG
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# Request profiling (apps.core.middleware.RequestProfilingMiddleware)
+# Server-Timing reveals SQL/cache/provider time to anyone: on for everyone only in DEBUG,
+# otherwise only on staff requests profiled with X-Profile
+SERVER_TIMING = os.environ.get('SERVER_TIMING', str(DEBUG)).lower() == 'true'
+REQUEST_BUDGET = {
+    'MAX_QUERIES': int(os.environ.get('REQUEST_BUDGET_MAX_QUERIES', '30')),
+    'MAX_LATENCY_MS': int(os.environ.get('REQUEST_BUDGET_MAX_LATENCY_MS', '500')),  # provider time not counted
+}
+PROFILER = {
+    'HEADER': 'X-Profile',  # staff only (anyone with DEBUG)
+    'INTERVAL_MS': float(os.environ.get('PROFILER_INTERVAL_MS', '5')),
+    'DIR': os.environ.get('PROFILER_DIR', os.path.join(tempfile.gettempdir(), 'veritas-radix-profiles')),
+}
+
+# Response compression (apps.core.compression); brotli when installed, else gzip
+COMPRESSION = {
+    'MIN_SIZE': int(os.environ.get('COMPRESSION_MIN_SIZE', '1024')),  # bytes
+    'GZIP_LEVEL': int(os.environ.get('COMPRESSION_GZIP_LEVEL', '6')),
+    'BROTLI_QUALITY': int(os.environ.get('COMPRESSION_BROTLI_QUALITY', '4')),
+    'EXCLUDE_PATHS': ['/api/auth/'],  # tokens next to user input (BREACH)
+}
\ No newline at end of file
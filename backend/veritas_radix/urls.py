@@ -6,7 +6,8 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from rest_framework.routers import DefaultRouter
-from apps.core.views import HealthCheckView
+from apps.core.views import HealthCheckView, metrics_view
+from apps.analytics.views import admin_dashboard
 
 # Main router for API
 router = DefaultRouter()
@@ -18,10 +19,15 @@ urlpatterns = [
     # Health check
     path('', HealthCheckView.as_view(), name='home'),
     path('health/', HealthCheckView.as_view(), name='health-check'),
+    path('metrics', metrics_view, name='metrics'),
     
     # API routes
     path('api/', include([
         path('auth/', include('apps.authentication.urls')),
+        path('etymology/', include('apps.etymology.urls')),
+        path('challenges/', include('apps.challenges.urls')),
+        path('analytics/', include('apps.analytics.urls')),
+        path('admin/dashboard/', admin_dashboard, name='admin-dashboard'),
         path('', include(router.urls)),
     ])),
     